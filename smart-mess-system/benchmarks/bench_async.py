@@ -0,0 +1,110 @@
+# benchmarks/bench_async.py
+#
+# Requests/sec and p99 of the old sync (threadpool) request path
+# vs the async (AsyncSession) routers, at 500 concurrent clients.
+# Each app runs in its own uvicorn process on a throwaway DB.
+#
+# Run from smart-mess-system/ (needs uvicorn + httpx):
+#   python -m benchmarks.bench_async --clients 500 --requests 20
+
+import argparse
+import asyncio
+import json
+import tempfile
+
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import select, func
+
+from database import SessionLocal, init_db
+from models import Student, DietLog, MealType
+from schemas import StudentResponse, StudentSummaryResponse
+from benchmarks.load import run_load, serve
+
+
+# ---------------------------------------------------------
+# SYNC BASELINE (THE PRE-ASYNC ENDPOINTS)
+# ---------------------------------------------------------
+
+sync_app = FastAPI(title="Sync baseline")
+
+
+@sync_app.on_event("startup")
+def sync_startup():
+    init_db()
+
+
+@sync_app.get("/auth/student/{student_id}", response_model=StudentResponse)
+def sync_get_student(student_id: int):
+    db = SessionLocal()
+    try:
+        student = db.query(Student).filter(Student.id == student_id).first()
+        if not student:
+            raise HTTPException(status_code=404, detail="Student not found")
+        return StudentResponse.model_validate(student)
+    finally:
+        db.close()
+
+
+@sync_app.get("/dashboard/student-summary/{student_id}", response_model=StudentSummaryResponse)
+def sync_student_summary(student_id: int):
+    db = SessionLocal()
+    try:
+        def count(*filters):
+            return db.scalar(select(func.count(DietLog.id)).where(
+                DietLog.student_id == student_id, *filters
+            ))
+
+        return StudentSummaryResponse(
+            student_id=student_id,
+            total_meals=count(),
+            breakfast_count=count(DietLog.meal_type == MealType.breakfast),
+            lunch_count=count(DietLog.meal_type == MealType.lunch),
+            dinner_count=count(DietLog.meal_type == MealType.dinner)
+        )
+    finally:
+        db.close()
+
+
+ENDPOINTS = {
+    "student": lambda client_no, i: ("GET", f"/auth/student/{client_no % 5 + 1}", None),
+    "student-summary": lambda client_no, i: ("GET", f"/dashboard/student-summary/{client_no % 5 + 1}", None),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = []
+    for mode, app_path in (("sync", "benchmarks.bench_async:sync_app"), ("async", "main:app")):
+        workdir = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+        process = serve(app_path, args.port, workdir)
+        try:
+            for endpoint, make_request in ENDPOINTS.items():
+                stats = asyncio.run(run_load(
+                    f"http://127.0.0.1:{args.port}",
+                    make_request,
+                    args.clients,
+                    args.requests
+                ))
+                results.append({"mode": mode, "endpoint": endpoint, **stats})
+        finally:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<6} {'endpoint':<16} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['endpoint']:<16} {r['rps']:>8} "
+              f"{r['p50_ms']:>8} {r['p99_ms']:>8} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
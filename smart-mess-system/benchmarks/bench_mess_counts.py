@@ -0,0 +1,175 @@
+# benchmarks/bench_mess_counts.py
+#
+# Compares the old per-mess loop (3N+1 queries) behind
+# /dashboard/mess-counts with the single GROUP BY aggregate.
+#
+# Run from smart-mess-system/:
+#   python -m benchmarks.bench_mess_counts --messes 50 --rows 1000000
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Mess, MealIntent, MealType, BookingStatus
+from services.capacity import get_meal_counts_by_mess, get_effective_capacity
+
+
+# ---------------------------------------------------------
+# SYNTHETIC DATA
+# ---------------------------------------------------------
+
+def build_database(path: str, messes: int, rows: int, seats: int = 200):
+    """
+    One row per student per meal per day, going back in time
+    until `rows` meal_intent rows exist.
+    """
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    students = messes * seats
+    meals = [m.value for m in MealType]
+    statuses = [s.value for s in BookingStatus]
+    today = date.today()
+    created = datetime.utcnow().isoformat(sep=" ")
+
+    def generate():
+        produced = 0
+        day = 0
+        while produced < rows:
+            current = (today - timedelta(days=day)).isoformat()
+            for meal in meals:
+                for student_id in range(1, students + 1):
+                    if produced >= rows:
+                        return
+                    yield (
+                        student_id,
+                        (student_id - 1) // seats + 1,
+                        meal,
+                        current,
+                        statuses[(student_id + day) % len(statuses)],
+                        created
+                    )
+                    produced += 1
+            day += 1
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO mess (id, name, allowed_year, max_capacity) VALUES (?, ?, ?, ?)",
+        [(i, f"Mess {i}", 1, seats) for i in range(1, messes + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO meal_intent (student_id, mess_id, meal_type, date, status, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        generate()
+    )
+    conn.commit()
+    conn.close()
+
+
+# ---------------------------------------------------------
+# IMPLEMENTATIONS UNDER TEST
+# ---------------------------------------------------------
+
+def _count(db, mess_id, meal_type, status):
+    return db.query(MealIntent).filter(
+        MealIntent.mess_id == mess_id,
+        MealIntent.meal_type == meal_type,
+        MealIntent.date == date.today(),
+        MealIntent.status == status
+    ).count()
+
+
+def legacy_mess_counts(db, meal_type):
+    """
+    The original loop: booked, attended and remaining per mess.
+    """
+
+    results = []
+    for mess in db.query(Mess).all():
+        booked = _count(db, mess.id, meal_type, BookingStatus.booked)
+        attended = _count(db, mess.id, meal_type, BookingStatus.attended)
+        remaining = get_effective_capacity(mess) - _count(
+            db, mess.id, meal_type, BookingStatus.booked
+        )
+        results.append((mess.id, mess.name, booked, attended, remaining))
+    return results
+
+
+def aggregate_mess_counts(db, meal_type):
+    return [
+        (row.id, row.name, row.booked, row.attended,
+         get_effective_capacity(row) - row.booked)
+        for row in get_meal_counts_by_mess(db, meal_type)
+    ]
+
+
+# ---------------------------------------------------------
+# RUNNER
+# ---------------------------------------------------------
+
+def measure(session_factory, engine, fn, repeat: int):
+    queries = [0]
+
+    def on_execute(*args):
+        queries[0] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    timings = []
+    try:
+        for _ in range(repeat):
+            db = session_factory()
+            try:
+                queries[0] = 0
+                start = time.perf_counter()
+                result = fn(db, MealType.lunch)
+                timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    return result, queries[0], timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messes", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--db", help="Reuse/keep this SQLite file instead of a temp one")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "bench_mess_counts.db")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        build_database(path, args.messes, args.rows)
+        print(f"Built {args.rows} meal_intent rows / {args.messes} messes "
+              f"in {time.perf_counter() - start:.1f}s ({path})")
+
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    expected = None
+    print(f"{'impl':<10} {'queries':>8} {'p50 ms':>10} {'max ms':>10}")
+    for name, fn in (("legacy", legacy_mess_counts), ("aggregate", aggregate_mess_counts)):
+        result, queries, timings = measure(session_factory, engine, fn, args.repeat)
+        if expected is None:
+            expected = result
+        assert result == expected, f"{name} returned different counts"
+        print(f"{name:<10} {queries:>8} {statistics.median(timings):>10.2f} {max(timings):>10.2f}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_peak.py
+#
+# Peak-hour benchmark: generates a synthetic campus, then replays
+# the booking rush, the scan storm and dashboard polling against
+# main:app (through benchmarks.server). Reports rps, p50/p95/p99
+# and DB queries per request for every endpoint.
+#
+# Run from smart-mess-system/ (needs uvicorn + httpx):
+#   python -m benchmarks.bench_peak --students 20000 --messes 30 --output peak.json
+#
+# The simulated day is tomorrow, so the real-clock no-show sweep
+# at startup never closes the meals being benchmarked.
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from benchmarks.load import APP_DIR, run_mixed_load, serve
+from benchmarks.profiles import PROFILES, load_roster
+
+
+def generate_dataset(workdir: str, args, bench_day: date):
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.datagen",
+         "--students", str(args.students),
+         "--messes", str(args.messes),
+         "--days", str(args.days),
+         "--until", bench_day.isoformat()],
+        cwd=workdir,
+        env=dict(os.environ, PYTHONPATH=APP_DIR),
+        check=True
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--messes", type=int, default=30)
+    parser.add_argument("--days", type=int, default=30, help="Days of history")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help="Comma-separated, from: " + ", ".join(PROFILES))
+    parser.add_argument("--workdir", help="Reuse (or keep) the dataset in this directory")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--write-behind", action="store_true", help="Serve with SCAN_WRITE_BEHIND on")
+    parser.add_argument("--no-admission", action="store_true", help="Serve with ADMISSION_CONTROL off")
+    parser.add_argument("--output", help="Write machine-readable results to this file")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    profiles = [name.strip() for name in args.profiles.split(",") if name.strip()]
+    unknown = [name for name in profiles if name not in PROFILES]
+    if unknown:
+        parser.error(f"Unknown profile(s): {', '.join(unknown)}")
+
+    bench_day = date.today() + timedelta(days=1)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_peak_")
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, "mess.db")
+
+    if not os.path.exists(db_path):
+        generate_dataset(workdir, args, bench_day)
+
+    roster = load_roster(db_path)
+
+    results = []
+    for name in profiles:
+        clock, build = PROFILES[name]
+        make_request = build(roster, args.requests)
+
+        env = {"BENCH_CLOCK": datetime.combine(bench_day, clock).isoformat()}
+        if args.write_behind:
+            env["BENCH_WRITE_BEHIND"] = "1"
+        if args.no_admission:
+            env["BENCH_NO_ADMISSION"] = "1"
+
+        process = serve("benchmarks.server:app", args.port, workdir, env=env)
+        try:
+            per_endpoint = asyncio.run(run_mixed_load(
+                f"http://127.0.0.1:{args.port}",
+                make_request,
+                args.clients,
+                args.requests
+            ))
+        finally:
+            process.terminate()
+            process.wait()
+
+        for endpoint, stats in sorted(per_endpoint.items()):
+            results.append({"profile": name, "endpoint": endpoint, **stats})
+
+    report = {
+        "run": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "students": len(roster["students"]),
+            "messes": sum(len(ids) for ids in roster["messes_by_year"].values()),
+            "days": args.days,
+            "clients": args.clients,
+            "requests_per_client": args.requests,
+            "write_behind": args.write_behind,
+            "admission_control": not args.no_admission,
+            "workdir": workdir,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'profile':<15} {'endpoint':<32} {'rps':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7} {'shed':>6}")
+    for r in results:
+        print(f"{r['profile']:<15} {r['endpoint']:<32} {r['rps']:>8} {r['p50_ms']:>8} "
+              f"{r['p95_ms']:>8} {r['p99_ms']:>8} {r.get('db_queries_avg', '-'):>8} {r['errors']:>7} {r['shed']:>6}")
+
+
+if __name__ == "__main__":
+    main()
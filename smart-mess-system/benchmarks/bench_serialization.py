@@ -0,0 +1,170 @@
+# benchmarks/bench_serialization.py
+#
+# CPU cost of encoding the hot responses, per route:
+#   stdlib  response_model -> dict -> json.dumps (FastAPI before
+#           its dump_json path, or any explicit response_class)
+#   native  FastAPI's own dump_json path (recent versions only)
+#   fast    FAST_SERIALIZATION mode (core/serialization.py)
+# Routes on a bare app, driven in-process over raw ASGI so no
+# network or database time is counted.
+#
+# Run from smart-mess-system/:
+#   python -m benchmarks.bench_serialization --requests 5000
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from models import MealType, BookingStatus
+from schemas import ScanResponse, BookingResponse, MessCountResponse, TrendPoint
+from core.serialization import json_response
+
+
+# ---------------------------------------------------------
+# PAYLOADS (SHAPED LIKE THE REAL ROUTES' RETURN VALUES)
+# ---------------------------------------------------------
+
+def scan_payload():
+    # /scan/entry builds a dict
+    return {
+        "message": "Attendance marked successfully.",
+        "status": BookingStatus.attended,
+        "meal_type": MealType.lunch,
+        "timestamp": datetime.now()
+    }
+
+
+def booking_payload():
+    # /booking/book returns the RETURNING row
+    return SimpleNamespace(
+        id=123456, student_id=4242, mess_id=7, meal_type=MealType.lunch,
+        date=date.today(), status=BookingStatus.booked, created_at=datetime.now()
+    )
+
+
+def mess_counts_payload(messes: int = 30):
+    # /dashboard/mess-counts builds one dict per mess
+    return [
+        {"mess_id": i, "mess_name": f"Hostel {i}", "booked": 150, "attended": 90, "remaining_capacity": 50}
+        for i in range(1, messes + 1)
+    ]
+
+
+def trends_payload(days: int = 365):
+    # /dashboard/trends returns aggregate rows
+    today = date.today()
+    return [
+        SimpleNamespace(period=today - timedelta(days=i), booked=5400, attended=5100, no_show=300, walk_in=40)
+        for i in range(days)
+    ]
+
+
+# (name, response type, payload factory)
+CASES = [
+    ("scan/entry", ScanResponse, scan_payload),
+    ("booking/book", BookingResponse, booking_payload),
+    ("dashboard/mess-counts", list[MessCountResponse], mess_counts_payload),
+    ("dashboard/trends", list[TrendPoint], trends_payload),
+]
+
+
+def add_routes(app: FastAPI, name: str, response_type, content):
+
+    @app.get(f"/stdlib/{name}", response_model=response_type, response_class=JSONResponse)
+    async def stdlib():
+        return content
+
+    @app.get(f"/native/{name}", response_model=response_type)
+    async def native():
+        return content
+
+    @app.get(f"/fast/{name}", response_model=response_type)
+    async def fast():
+        return json_response(response_type, content)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    for name, response_type, payload in CASES:
+        add_routes(app, name, response_type, payload())
+
+    return app
+
+
+# ---------------------------------------------------------
+# RAW ASGI DRIVER
+# ---------------------------------------------------------
+
+async def call(app: FastAPI, path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80)
+    }
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return len(body)
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> tuple:
+    """
+    (median CPU µs per request, response bytes).
+    """
+
+    size = await call(app, path)
+    for _ in range(min(requests, 200)):  # Warm up
+        await call(app, path)
+
+    samples = []
+    for _ in range(requests):
+        start = time.process_time()
+        await call(app, path)
+        samples.append(time.process_time() - start)
+
+    return statistics.median(samples) * 1e6, size
+
+
+async def run(requests: int):
+    app = build_app()
+
+    print(f"{'route':<24}{'bytes':>8}{'stdlib µs':>11}{'native µs':>11}{'fast µs':>9}{'saved µs':>10}")
+
+    for name, _, _ in CASES:
+        stdlib_us, size = await measure(app, f"/stdlib/{name}", requests)
+        native_us, _ = await measure(app, f"/native/{name}", requests)
+        fast_us, _ = await measure(app, f"/fast/{name}", requests)
+
+        print(
+            f"{name:<24}{size:>8}{stdlib_us:>11.1f}{native_us:>11.1f}{fast_us:>9.1f}"
+            f"{stdlib_us - fast_us:>10.1f}"
+        )
+
+    print("\nsaved = stdlib - fast, CPU per request (median).")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per route")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
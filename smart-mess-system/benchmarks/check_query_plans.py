@@ -0,0 +1,221 @@
+# benchmarks/check_query_plans.py
+#
+# Query-plan regression check for the hot queries.
+# Runs each one against the current schema, captures the SQL it
+# emits, and fails if EXPLAIN QUERY PLAN shows a full table scan.
+#
+# Run from smart-mess-system/:
+#   python -m benchmarks.check_query_plans            (fresh in-memory schema)
+#   python -m benchmarks.check_query_plans --db mess.db
+
+import argparse
+import sys
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Student, StudentMealStats, MealIntent, DietLog, MealType, BookingStatus
+from services.capacity import (
+    CapacityLedger,
+    get_meal_counts_by_mess,
+    get_attended_count
+)
+from services.validation import validate_scan_batch
+from services.history import _page_stmt
+from services.booking_engine import book_stmt
+from services.rollup import rollup_stmt, _trend_stmt, _mess_totals_stmt
+from services.archive import (
+    HOT_TABLES,
+    archive_cutoff,
+    archive_table_name,
+    _archive_table,
+    _archive_day_stmts,
+    _oldest_hot_day
+)
+
+
+# Tables that grow with every meal (or day); any SCAN on them fails
+LARGE_TABLES = {"meal_intent", "diet_logs", "meal_rollup"}
+
+
+# ---------------------------------------------------------
+# HOT QUERIES
+# ---------------------------------------------------------
+
+def _scheduler_sweep(db, catch_up=False):
+    today = date.today()
+    if catch_up:
+        day_filter = MealIntent.date.between(today - timedelta(days=7), today)
+    else:
+        day_filter = MealIntent.date == today
+    db.execute(
+        update(MealIntent).where(
+            day_filter,
+            MealIntent.meal_type == MealType.lunch,
+            MealIntent.status == BookingStatus.booked
+        ).values(status=BookingStatus.no_show)
+    )
+    db.execute(rollup_stmt(day_filter, MealIntent.meal_type == MealType.lunch))
+    db.rollback()
+
+
+def _dashboard_no_shows(db):
+    db.query(MealIntent).filter(
+        MealIntent.date == date.today(),
+        MealIntent.meal_type == MealType.lunch,
+        MealIntent.status == BookingStatus.no_show
+    ).all()
+
+
+def _student_summary(db):
+    db.get(StudentMealStats, 1)
+
+
+def _duplicate_booking(db):
+    db.query(MealIntent).filter(
+        MealIntent.student_id == 1,
+        MealIntent.meal_type == MealType.lunch,
+        MealIntent.date == date.today()
+    ).first()
+
+
+def _atomic_booking(db):
+    db.execute(book_stmt(1, 1, MealType.lunch, date.today(), datetime.utcnow())).all()
+    db.rollback()
+
+
+def _history_page(db):
+    db.execute(_page_stmt(
+        MealIntent.__table__, DietLog.__table__, 1, (date.today(), MealType.lunch), 20
+    )).all()
+
+
+def _archive(db):
+    day = archive_cutoff(date.today()) - timedelta(days=1)
+    for hot_name in HOT_TABLES:
+        _oldest_hot_day(db, hot_name)
+        table = _archive_table(hot_name, archive_table_name(hot_name, day))
+        table.create(bind=db.get_bind(), checkfirst=True)
+        for stmt in _archive_day_stmts(hot_name, table, day):
+            db.execute(stmt)
+    db.rollback()
+
+
+def _trends(db, bucket="day", **filters):
+    end = date.today()
+    db.execute(_trend_stmt(end - timedelta(days=180), end, bucket, **filters)).all()
+
+
+def _scan_batch(db):
+    scanned_at = datetime.combine(date.today(), time(12, 30))
+    validate_scan_batch(db, [
+        SimpleNamespace(student_id=1, mess_id=1, scanned_at=scanned_at)
+    ])
+    db.rollback()
+
+
+HOT_QUERIES = {
+    "capacity.ledger_rebuild": lambda db: CapacityLedger().rebuild(db),
+    "capacity.meal_counts_by_mess": lambda db: get_meal_counts_by_mess(db, MealType.lunch),
+    "capacity.attended_count": lambda db: get_attended_count(db, 1, MealType.lunch),
+    "scheduler.sweep": _scheduler_sweep,
+    "scheduler.sweep_catch_up": lambda db: _scheduler_sweep(db, catch_up=True),
+    "dashboard.no_shows": _dashboard_no_shows,
+    "dashboard.student_summary": _student_summary,
+    "validation.duplicate_booking": _duplicate_booking,
+    "booking_engine.book": _atomic_booking,
+    "validation.scan_batch": _scan_batch,
+    "archive.closed_days": _archive,
+    "history.page": _history_page,
+    "rollup.trend": _trends,
+    "rollup.trend_mess_meal": lambda db: _trends(db, "week", mess_id=1, meal_type=MealType.lunch),
+    "rollup.mess_totals": lambda db: db.execute(
+        _mess_totals_stmt(date.today() - timedelta(days=30), date.today())
+    ).all(),
+}
+
+
+# ---------------------------------------------------------
+# PLAN INSPECTION
+# ---------------------------------------------------------
+
+def is_full_scan(detail: str) -> bool:
+    if not detail.startswith("SCAN "):
+        return False
+
+    table = detail.split()[1]
+    return table in LARGE_TABLES or " USING " not in detail
+
+
+def capture(engine, session_factory, fn):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    db = session_factory()
+    try:
+        fn(db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    return statements
+
+
+def check(engine) -> list:
+    """
+    Returns (query name, plan detail) for every full scan found.
+    """
+
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    failures = []
+
+    for name, fn in HOT_QUERIES.items():
+        for statement, parameters in capture(engine, session_factory, fn):
+            with engine.connect() as conn:
+                plan = conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                ).fetchall()
+
+            for row in plan:
+                detail = row[-1]
+                status = "FAIL" if is_full_scan(detail) else "ok"
+                print(f"{status:<5} {name:<30} {detail}")
+                if status == "FAIL":
+                    failures.append((name, detail))
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="Check an existing SQLite file instead of a fresh schema")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}" if args.db else "sqlite://")
+
+    if not args.db:
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            db.add(Student(id=1, name="Plan Check", year=1, hostel="H1"))
+            db.commit()
+
+    failures = check(engine)
+    engine.dispose()
+
+    if failures:
+        print(f"\n{len(failures)} full table scan(s) in hot queries.")
+        sys.exit(1)
+
+    print("\nNo full table scans in hot queries.")
+
+
+if __name__ == "__main__":
+    main()
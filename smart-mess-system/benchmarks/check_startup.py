@@ -0,0 +1,87 @@
+# benchmarks/check_startup.py
+#
+# Worker startup budget check. Boots main:app's startup hook in
+# fresh processes against one database: the first boot applies the
+# migrations, every later boot is a worker (re)start and must stay
+# under STARTUP_BUDGET_SECONDS.
+#
+# Run from smart-mess-system/:
+#   python -m benchmarks.check_startup                       (scratch DB)
+#   python -m benchmarks.check_startup --students 20000      (synthetic campus)
+#   python -m benchmarks.check_startup --workdir /path/with/mess.db
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.load import APP_DIR
+from config import STARTUP_BUDGET_SECONDS
+
+
+# One worker boot: import the app, run its startup hook, stop
+BOOT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.startup_event()
+ready = time.perf_counter()
+main.stop_scheduler()
+print(json.dumps({"import_s": imported - start, "startup_s": ready - imported}))
+"""
+
+
+def boot(workdir: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", BOOT_SNIPPET],
+        cwd=workdir,
+        env=dict(os.environ, PYTHONPATH=APP_DIR),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workdir", help="Directory holding mess.db (default: scratch dir)")
+    parser.add_argument("--students", type=int, default=0,
+                        help="Generate a synthetic campus of this size first")
+    parser.add_argument("--messes", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=5, help="Warm boots to measure")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="mess_startup_")
+
+    if args.students:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.datagen",
+             "--students", str(args.students), "--messes", str(args.messes)],
+            cwd=workdir,
+            env=dict(os.environ, PYTHONPATH=APP_DIR),
+            check=True
+        )
+
+    first = boot(workdir)
+    print(f"first boot   import {first['import_s']:.2f} s  startup {first['startup_s'] * 1000:.0f} ms")
+
+    warm = []
+    for run in range(args.runs):
+        timing = boot(workdir)
+        warm.append(timing["startup_s"])
+        print(f"warm boot {run + 1}  import {timing['import_s']:.2f} s  startup {timing['startup_s'] * 1000:.0f} ms")
+
+    worst = max(warm)
+    if worst > STARTUP_BUDGET_SECONDS:
+        print(f"\nWarm startup {worst:.2f} s is over the {STARTUP_BUDGET_SECONDS} s budget.")
+        sys.exit(1)
+
+    print(f"\nWarm startup within budget: worst {worst * 1000:.0f} ms of {STARTUP_BUDGET_SECONDS * 1000:.0f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# benchmarks/datagen.py
+#
+# Synthetic campus for the benchmarks: a roster of students and
+# messes plus weeks of MealIntent / DietLog history.
+# Writes ./mess.db in the current directory (use a scratch dir).
+#
+# Run from a scratch directory with smart-mess-system on PYTHONPATH:
+#   python -m benchmarks.datagen --students 20000 --messes 30 --days 30
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from migrations import migrate
+from models import Student, Mess, MealIntent, DietLog, BookingStatus, MealType
+from config import MEAL_WINDOWS
+from services.student_stats import backfill_student_meal_stats
+from services.rollup import backfill_meal_rollups
+
+
+YEARS = (1, 2, 3, 4)
+
+# Share of students that book a given meal, and of those who turn up
+BOOKING_RATE = {
+    MealType.breakfast: 0.55,
+    MealType.lunch: 0.85,
+    MealType.dinner: 0.80,
+}
+ATTENDANCE_RATE = 0.88
+
+INSERT_CHUNK = 20000
+
+
+# ---------------------------------------------------------
+# ROSTER
+# ---------------------------------------------------------
+
+def make_roster(students: int, messes: int, rng: random.Random):
+    """
+    Messes are spread evenly over the years; every year gets at
+    least one. Capacity leaves ~15% headroom over that year's roster.
+    Returns (student_rows, mess_rows).
+    """
+
+    messes = max(messes, len(YEARS))
+
+    student_rows = []
+    per_year = {year: 0 for year in YEARS}
+    for student_id in range(1, students + 1):
+        year = rng.choice(YEARS)
+        per_year[year] += 1
+        student_rows.append({
+            "id": student_id,
+            "name": f"Student {student_id}",
+            "year": year,
+            "hostel": f"Hostel {rng.randint(1, messes)}",
+        })
+
+    mess_years = [YEARS[i % len(YEARS)] for i in range(messes)]
+    messes_per_year = {year: mess_years.count(year) for year in YEARS}
+
+    mess_rows = []
+    for mess_id, year in enumerate(mess_years, start=1):
+        share = per_year[year] / messes_per_year[year]
+        mess_rows.append({
+            "id": mess_id,
+            "name": f"Mess {mess_id}",
+            "allowed_year": year,
+            "max_capacity": max(10, int(share * 1.15)),
+        })
+
+    return student_rows, mess_rows
+
+
+def messes_by_year(mess_rows: list) -> dict:
+    by_year = {}
+    for mess in mess_rows:
+        by_year.setdefault(mess["allowed_year"], []).append(mess["id"])
+    return by_year
+
+
+# ---------------------------------------------------------
+# HISTORY (PAST DAYS ONLY, EVERY BOOKING RESOLVED)
+# ---------------------------------------------------------
+
+def iter_history(student_rows: list, mess_rows: list, days: int, until: date, rng: random.Random):
+    """
+    Yields (intent_row, log_row or None) for the `days` days before `until`.
+    Each student eats at one mess of their year ("home" mess).
+    """
+
+    by_year = messes_by_year(mess_rows)
+    home_mess = {s["id"]: rng.choice(by_year[s["year"]]) for s in student_rows}
+
+    for offset in range(days, 0, -1):
+        day = until - timedelta(days=offset)
+
+        for meal_type in MealType:
+            window = MEAL_WINDOWS[meal_type.value]
+            start = datetime.combine(day, window["start"])
+            window_seconds = int(
+                (datetime.combine(day, window["end"]) - start).total_seconds()
+            )
+
+            for student in student_rows:
+                if rng.random() > BOOKING_RATE[meal_type]:
+                    continue
+
+                mess_id = home_mess[student["id"]]
+                attended = rng.random() < ATTENDANCE_RATE
+
+                intent = {
+                    "student_id": student["id"],
+                    "mess_id": mess_id,
+                    "meal_type": meal_type,
+                    "date": day,
+                    "status": BookingStatus.attended if attended else BookingStatus.no_show,
+                    "created_at": start - timedelta(hours=3),
+                }
+
+                log = None
+                if attended:
+                    log = {
+                        "student_id": student["id"],
+                        "mess_id": mess_id,
+                        "meal_type": meal_type,
+                        "timestamp": start + timedelta(seconds=rng.randrange(window_seconds)),
+                    }
+
+                yield intent, log
+
+
+# ---------------------------------------------------------
+# WRITE
+# ---------------------------------------------------------
+
+def _insert_chunks(db, model, rows):
+    chunk = []
+    written = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK:
+            db.execute(insert(model), chunk)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(model), chunk)
+        written += len(chunk)
+    return written
+
+
+def generate(students: int, messes: int, days: int, until: date, seed: int = 42) -> dict:
+    """
+    Creates the schema (migrations.py) and fills it. Expects an
+    empty database. Returns row counts.
+    """
+
+    rng = random.Random(seed)
+
+    migrate()
+
+    student_rows, mess_rows = make_roster(students, messes, rng)
+
+    db = SessionLocal()
+
+    try:
+        db.execute(insert(Student), student_rows)
+        db.execute(insert(Mess), mess_rows)
+
+        intents = []
+        logs = []
+        intent_count = 0
+        log_count = 0
+
+        for intent, log in iter_history(student_rows, mess_rows, days, until, rng):
+            intents.append(intent)
+            if log:
+                logs.append(log)
+
+            if len(intents) >= INSERT_CHUNK:
+                intent_count += _insert_chunks(db, MealIntent, intents)
+                log_count += _insert_chunks(db, DietLog, logs)
+                intents, logs = [], []
+
+        intent_count += _insert_chunks(db, MealIntent, intents)
+        log_count += _insert_chunks(db, DietLog, logs)
+        db.commit()
+
+        backfill_student_meal_stats(db)
+        backfill_meal_rollups(db, until)
+
+    finally:
+        db.close()
+
+    return {
+        "students": len(student_rows),
+        "messes": len(mess_rows),
+        "meal_intents": intent_count,
+        "diet_logs": log_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--messes", type=int, default=30)
+    parser.add_argument("--days", type=int, default=30, help="Days of history")
+    parser.add_argument("--until", type=date.fromisoformat, default=date.today(),
+                        help="History ends the day before this date")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate(args.students, args.messes, args.days, args.until, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(", ".join(f"{v} {k}" for k, v in counts.items()) + f" in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/load.py
+#
+# Small asyncio load driver shared by the HTTP benchmarks.
+# Needs httpx (benchmark-only dependency).
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set by benchmarks.server on every response
+QUERY_COUNT_HEADER = "x-db-queries"
+
+
+# ---------------------------------------------------------
+# PERCENTILES
+# ---------------------------------------------------------
+
+def percentile(values: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of an unsorted list.
+    """
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: list, errors: int, elapsed_s: float, queries: list = None, shed: int = 0) -> dict:
+    total = len(latencies_ms) + errors
+
+    summary = {
+        "requests": total,
+        "errors": errors,
+        "shed": shed,  # 429s from admission control (counted in errors too)
+        "elapsed_s": round(elapsed_s, 3),
+        "rps": round(total / elapsed_s, 1) if elapsed_s else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+    }
+
+    if queries:
+        summary["db_queries_avg"] = round(sum(queries) / len(queries), 2)
+        summary["db_queries_max"] = max(queries)
+
+    return summary
+
+
+# ---------------------------------------------------------
+# CLOSED-LOOP CLIENTS
+# ---------------------------------------------------------
+
+async def run_load(
+    base_url: str,
+    make_request,
+    clients: int,
+    requests_per_client: int,
+    ok_statuses=(200,)
+) -> dict:
+    """
+    `clients` concurrent loops, each sending `requests_per_client`
+    requests back to back. make_request(client_no, i) returns
+    (method, path, json_body or None).
+    """
+
+    def labelled(client_no, i):
+        return ("all",) + make_request(client_no, i)
+
+    results = await run_mixed_load(base_url, labelled, clients, requests_per_client, ok_statuses)
+    return results["all"]
+
+
+async def run_mixed_load(
+    base_url: str,
+    make_request,
+    clients: int,
+    requests_per_client: int,
+    ok_statuses=(200,)
+) -> dict:
+    """
+    Like run_load, but make_request returns (label, method, path, body)
+    and results are summarized per label. Picks up per-request DB
+    query counts when the server sends QUERY_COUNT_HEADER.
+    """
+
+    import httpx
+
+    records = {}
+
+    async def client_loop(client, client_no):
+        for i in range(requests_per_client):
+            label, method, path, body = make_request(client_no, i)
+            latencies, errors, queries, shed = records.setdefault(label, ([], [0], [], [0]))
+
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+            except httpx.HTTPError:
+                errors[0] += 1
+                continue
+
+            if response.status_code in ok_statuses:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors[0] += 1
+                if response.status_code == 429:
+                    shed[0] += 1
+
+            if QUERY_COUNT_HEADER in response.headers:
+                queries.append(int(response.headers[QUERY_COUNT_HEADER]))
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, n) for n in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        label: summarize(latencies, errors[0], elapsed, queries, shed[0])
+        for label, (latencies, errors, queries, shed) in records.items()
+    }
+
+
+# ---------------------------------------------------------
+# SERVER PROCESS
+# ---------------------------------------------------------
+
+def serve(app_path: str, port: int, workdir: str, env: dict = None) -> subprocess.Popen:
+    """
+    Starts `app_path` under uvicorn in `workdir` (its ./mess.db)
+    and waits until it answers.
+    """
+
+    import httpx
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=dict(os.environ, PYTHONPATH=APP_DIR, **(env or {}))
+    )
+
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{app_path} exited with code {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError(f"{app_path} did not start")
@@ -0,0 +1,107 @@
+# benchmarks/profiles.py
+#
+# Peak-hour traffic profiles. Each profile pins the server clock
+# to the moment it models and builds make_request(client_no, i)
+# -> (label, method, path, json_body) for run_mixed_load.
+
+import sqlite3
+from datetime import date, datetime, time, timedelta
+
+from config import MEAL_WINDOWS, BOOKING_CUTOFF
+
+
+# ---------------------------------------------------------
+# ROSTER (READ FROM THE GENERATED DB)
+# ---------------------------------------------------------
+
+def load_roster(db_path: str) -> dict:
+    """
+    {"students": [(id, year)], "messes_by_year": {year: [mess ids]}}
+    """
+
+    connection = sqlite3.connect(db_path)
+    try:
+        students = connection.execute("SELECT id, year FROM students ORDER BY id").fetchall()
+        messes_by_year = {}
+        for mess_id, year in connection.execute("SELECT id, allowed_year FROM mess ORDER BY id"):
+            messes_by_year.setdefault(year, []).append(mess_id)
+    finally:
+        connection.close()
+
+    return {"students": students, "messes_by_year": messes_by_year}
+
+
+def _student_for(roster: dict, requests_per_client: int, client_no: int, i: int):
+    """
+    Every request gets a different student (wrapping if the roster
+    is smaller than the run), in the same order for every profile,
+    so the scan storm finds the bookings made by the booking rush.
+    """
+
+    students = roster["students"]
+    student_id, year = students[(client_no * requests_per_client + i) % len(students)]
+    messes = roster["messes_by_year"][year]
+    return student_id, messes[student_id % len(messes)]
+
+
+# ---------------------------------------------------------
+# PROFILES
+# ---------------------------------------------------------
+
+def booking_rush(roster: dict, requests_per_client: int):
+    """
+    Everyone books lunch in the half hour before BOOKING_CUTOFF.
+    """
+
+    def make_request(client_no, i):
+        student_id, mess_id = _student_for(roster, requests_per_client, client_no, i)
+        return ("POST /booking/book", "POST", "/booking/book",
+                {"student_id": student_id, "mess_id": mess_id})
+
+    return make_request
+
+
+def scan_storm(roster: dict, requests_per_client: int):
+    """
+    The turnstile queue the minute the lunch window opens.
+    """
+
+    def make_request(client_no, i):
+        student_id, mess_id = _student_for(roster, requests_per_client, client_no, i)
+        return ("POST /scan/entry", "POST", "/scan/entry",
+                {"student_id": student_id, "mess_id": mess_id})
+
+    return make_request
+
+
+def dashboard_poll(roster: dict, requests_per_client: int):
+    """
+    Staff dashboards and student apps refreshing mid-lunch:
+    half mess counts, 40% student summaries, 10% no-show lists.
+    """
+
+    students = roster["students"]
+
+    def make_request(client_no, i):
+        slot = (client_no + i) % 10
+        if slot < 5:
+            return ("GET /dashboard/mess-counts", "GET", "/dashboard/mess-counts", None)
+        if slot < 9:
+            student_id = students[(client_no * requests_per_client + i) % len(students)][0]
+            return ("GET /dashboard/student-summary", "GET",
+                    f"/dashboard/student-summary/{student_id}", None)
+        return ("GET /dashboard/no-shows", "GET", "/dashboard/no-shows", None)
+
+    return make_request
+
+
+def _shift(moment: time, minutes: int) -> time:
+    return (datetime.combine(date.min, moment) + timedelta(minutes=minutes)).time()
+
+
+# name -> (clock time, builder); run in this order
+PROFILES = {
+    "booking_rush": (_shift(BOOKING_CUTOFF["lunch"], -30), booking_rush),
+    "scan_storm": (_shift(MEAL_WINDOWS["lunch"]["start"], 1), scan_storm),
+    "dashboard_poll": (_shift(MEAL_WINDOWS["lunch"]["start"], 30), dashboard_poll),
+}
@@ -0,0 +1,89 @@
+# benchmarks/server.py
+#
+# main:app as the benchmarks run it: a pinned clock (so booking
+# and scan profiles hit the window they model) and an
+# x-db-queries header with the number of SQL statements per request.
+#
+#   BENCH_CLOCK=2026-01-01T12:01 uvicorn benchmarks.server:app
+#
+# BENCH_WRITE_BEHIND=1 turns on SCAN_WRITE_BEHIND.
+# BENCH_NO_ADMISSION=1 turns off ADMISSION_CONTROL.
+
+import contextvars
+import os
+from datetime import datetime
+
+from sqlalchemy import event
+
+import config
+import core.time_utils as time_utils
+
+
+# ---------------------------------------------------------
+# PINNED CLOCK + MODES (BEFORE THE APP IMPORTS ANYTHING)
+# ---------------------------------------------------------
+
+if os.environ.get("BENCH_CLOCK"):
+    time_utils.ENABLE_TIME_OVERRIDE = True
+    time_utils.SIMULATED_TIME = datetime.fromisoformat(os.environ["BENCH_CLOCK"])
+
+# Read by the routers at import time
+if os.environ.get("BENCH_WRITE_BEHIND"):
+    config.SCAN_WRITE_BEHIND = True
+if os.environ.get("BENCH_NO_ADMISSION"):
+    config.ADMISSION_CONTROL = False
+
+
+from database import engine, async_engine  # noqa: E402
+from benchmarks.load import QUERY_COUNT_HEADER  # noqa: E402
+import main  # noqa: E402
+
+
+# ---------------------------------------------------------
+# PER-REQUEST QUERY COUNTER
+# ---------------------------------------------------------
+
+# Holds a one-item list for the request being served
+_query_count = contextvars.ContextVar("bench_query_count", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+event.listen(engine, "before_cursor_execute", _count_query)
+event.listen(async_engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+class QueryCountMiddleware:
+    """
+    Plain ASGI middleware (runs the endpoint in the same context,
+    so the counter sees its queries).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        counter = [0]
+        token = _query_count.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.encode(), str(counter[0]).encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _query_count.reset(token)
+
+
+app = QueryCountMiddleware(main.app)
@@ -1,5 +1,6 @@
 # config.py
 
+import os
 from datetime import time
 
 
@@ -34,12 +35,92 @@ BOOKING_CUTOFF = {
 }
 
 
+# ---------------------------------------------------------
+# SCHEDULE OVERRIDES (WEEKENDS, HOSTEL-SPECIFIC HOURS)
+# ---------------------------------------------------------
+
+# Per weekday (0 = Monday ... 6 = Sunday), any of "start" / "end" / "cutoff"
+# Example: late Sunday breakfast
+# WEEKDAY_SCHEDULES = {
+#     6: {"breakfast": {"start": time(8, 0), "end": time(10, 30), "cutoff": time(7, 0)}},
+# }
+WEEKDAY_SCHEDULES = {}
+
+# Per mess id: "*" applies every day, a weekday number only that day
+# Example: mess 3 serves dinner an hour later
+# MESS_SCHEDULES = {
+#     3: {"*": {"dinner": {"start": time(20, 0), "end": time(22, 0)}}},
+# }
+MESS_SCHEDULES = {}
+
+
 # ---------------------------------------------------------
 # SCHEDULER SETTINGS
 # ---------------------------------------------------------
 
-# How often no-show check runs (in seconds)
-NO_SHOW_CHECK_INTERVAL = 600  # 10 minutes
+# No-show sweep runs once per meal, this long after its window ends
+# (the end time itself still allows entry)
+NO_SHOW_SWEEP_DELAY_SECONDS = 1
+
+# After a restart, missed sweeps are caught up this many days back
+NO_SHOW_CATCH_UP_DAYS = 7
+
+# Days older than this move from meal_intent / diet_logs into
+# per-month archive tables (services/archive.py), daily at ARCHIVE_RUN_AT
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_RUN_AT = time(3, 30)
+
+
+# ---------------------------------------------------------
+# DATABASE ENGINE SETTINGS
+# ---------------------------------------------------------
+
+# "wal"    -> pooled connections, WAL journal (readers don't block the writer)
+# "static" -> one shared connection (original hackathon setup)
+DB_ENGINE_PROFILE = "wal"
+
+# How long a writer waits for the SQLite lock before failing (ms)
+DB_BUSY_TIMEOUT_MS = 5000
+
+# Connections kept open per process (+ overflow under burst)
+DB_POOL_SIZE = 8
+DB_MAX_OVERFLOW = 8
+
+
+# ---------------------------------------------------------
+# MULTIPLE WORKERS (uvicorn --workers N)
+# ---------------------------------------------------------
+
+# Same as uvicorn --workers (startup warns on a mismatch). >1: no
+# ledger pre-check on bookings, and live streams resync from the DB
+# on each keepalive, since bookings on other workers aren't seen
+WEB_WORKERS = 1
+
+# Worker startup (main.py startup_event) slower than this logs a
+# warning; benchmarks/check_startup.py fails on it
+STARTUP_BUDGET_SECONDS = 1.0
+
+# One worker runs scheduler.py jobs, holding a lease row (services/leader.py)
+LEADER_LEASE_SECONDS = 30   # A leader that stops renewing is replaced after this
+LEADER_RENEW_SECONDS = 10   # Renew / take-over attempt interval
+
+
+# ---------------------------------------------------------
+# ADMISSION CONTROL (core/admission.py)
+# ---------------------------------------------------------
+
+# Over these limits requests get 429 + Retry-After right away
+ADMISSION_CONTROL = True
+
+# Per student, on /booking/book and /auth/login (each separately)
+STUDENT_RATE_PER_SECOND = 0.5      # Sustained rate
+STUDENT_BURST = 5                  # Back-to-back requests allowed
+ADMISSION_TRACKED_STUDENTS = 50000 # Buckets kept (least recent dropped)
+
+# Booking and scan writes, per worker (SQLite has one writer anyway)
+WRITE_CONCURRENCY = 16             # In flight
+WRITE_QUEUE_SIZE = 64              # Waiting for a slot, beyond that shed
+WRITE_QUEUE_TIMEOUT_SECONDS = 2    # Longest wait, well under DB_BUSY_TIMEOUT_MS
 
 
 # ---------------------------------------------------------
@@ -50,11 +131,67 @@ NO_SHOW_CHECK_INTERVAL = 600  # 10 minutes
 ALLOW_BUFFER = False
 BUFFER_PERCENTAGE = 0.10  # 10% extra capacity (if enabled)
 
+# Max scans accepted in one POST /scan/entries call
+SCAN_BATCH_MAX_SIZE = 1000
+
+# /scan/entry retries replay the original response for this long
+SCAN_RECEIPT_TTL_SECONDS = 600
+SCAN_RECEIPT_CACHE_SIZE = 20000
+SCAN_RETRY_WINDOW_SECONDS = 60  # Without an Idempotency-Key header
+
+# Write-behind /scan/entry: acknowledge after validation, write in
+# group commits (services/write_behind.py). Off = one commit per scan.
+SCAN_WRITE_BEHIND = False
+WRITE_BEHIND_FLUSH_MS = 50                 # Max wait before a flush
+WRITE_BEHIND_MAX_BATCH = 500               # Max scans per transaction
+WRITE_BEHIND_QUEUE_SIZE = 10000            # Queued scans before backpressure
+WRITE_BEHIND_ENQUEUE_TIMEOUT_SECONDS = 2   # Then 503 + Retry-After
+WRITE_BEHIND_RETRIES = 3                   # Whole-batch attempts per flush
+
+# Hot endpoints encode responses with pre-built TypeAdapters
+# (core/serialization.py). Off = FastAPI's response_model path.
+FAST_SERIALIZATION = True
+GZIP_MIN_BYTES = 4096  # Gzip JSON list responses this large (0 = never)
+GZIP_LEVEL = 5         # 1 fastest .. 9 smallest
+
+# Student / Mess lookup cache
+LOOKUP_CACHE_TTL_SECONDS = 300
+STUDENT_CACHE_SIZE = 50000
+MESS_CACHE_SIZE = 1000
+
+# /metrics instrumentation (stage timers, SQL + request histograms)
+METRICS_ENABLED = True
+
+# /booking/history page size (default, max)
+HISTORY_PAGE_SIZE = 20
+HISTORY_PAGE_MAX = 100
+
+# /dashboard/trends: default and max date range (days)
+TRENDS_DEFAULT_DAYS = 30
+TRENDS_MAX_DAYS = 366
+
+# /dashboard/export: rows per read transaction, rows per fetch (yield_per)
+EXPORT_CHUNK_ROWS = 20000
+EXPORT_BATCH_ROWS = 1000
+
+# Roster import (services/roster.py, /admin/roster)
+ROSTER_CHUNK_ROWS = 5000   # Rows per upsert transaction
+ROSTER_MAX_ERRORS = 100    # Rejected rows listed in the report
+
+# Live dashboard stream (/dashboard/stream)
+STREAM_KEEPALIVE_SECONDS = 15  # Comment ping + meal change check
+STREAM_QUEUE_SIZE = 100        # Pending deltas per client before oldest drop
+
 
 # ---------------------------------------------------------
 # DEBUG / DEMO SETTINGS
 # ---------------------------------------------------------
 
+# Create demo students, messes and history on startup (dev only;
+# production DBs are loaded with the roster import).
+# Also on with the SEED_DEMO_DATA=1 environment variable (README quick-start)
+SEED_DEMO_DATA = os.environ.get("SEED_DEMO_DATA") == "1"
+
 # For hackathon demo only
 # If True, system can override current time for simulation
 ENABLE_TIME_OVERRIDE = False
@@ -0,0 +1,280 @@
+# core/admission.py
+#
+# Admission control for booking-open rushes (ADMISSION_CONTROL):
+#   - per-student token bucket on /booking/book and /auth/login,
+#     so retry storms from one student can't crowd out the rest
+#   - at most WRITE_CONCURRENCY write requests in flight per worker;
+#     up to WRITE_QUEUE_SIZE more wait (WRITE_QUEUE_TIMEOUT_SECONDS
+#     at most) for a slot
+# Anything over those limits gets a 429 with Retry-After straight
+# away instead of piling up on the SQLite write lock. Outcomes are
+# counted in mess_admission_requests_total.
+#
+# State is per worker and per event loop, like the capacity ledger.
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from config import (
+    ADMISSION_CONTROL,
+    STUDENT_RATE_PER_SECOND,
+    STUDENT_BURST,
+    ADMISSION_TRACKED_STUDENTS,
+    WRITE_CONCURRENCY,
+    WRITE_QUEUE_SIZE,
+    WRITE_QUEUE_TIMEOUT_SECONDS
+)
+from core.metrics import registry
+
+
+# (method, path) -> where the student ID is
+RATE_LIMITED_ROUTES = {
+    ("POST", "/booking/book"): "body",
+    ("POST", "/auth/login"): "query",
+}
+
+# Requests that write to SQLite
+WRITE_ROUTES = {
+    ("POST", "/booking/book"),
+    ("POST", "/scan/entry"),
+    ("POST", "/scan/entries"),
+}
+
+# Bodies larger than this aren't parsed for a student ID
+MAX_PARSED_BODY_BYTES = 4096
+
+
+# ---------------------------------------------------------
+# PER-STUDENT TOKEN BUCKETS
+# ---------------------------------------------------------
+
+class StudentRateLimiter:
+    """
+    One bucket per (route, student): STUDENT_BURST tokens, refilled
+    at STUDENT_RATE_PER_SECOND. Least recently seen buckets are
+    dropped past ADMISSION_TRACKED_STUDENTS (they come back full).
+    """
+
+    def __init__(self, rate: float, burst: int, max_tracked: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_tracked = max_tracked
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def take(self, key) -> float:
+        """
+        0 if a token was taken, else seconds until one is available.
+        """
+
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_tracked:
+            self._buckets.popitem(last=False)
+
+        return wait
+
+    @property
+    def tracked(self) -> int:
+        return len(self._buckets)
+
+
+# ---------------------------------------------------------
+# WRITE CONCURRENCY LIMIT (BOUNDED WAIT QUEUE)
+# ---------------------------------------------------------
+
+class WriteLimiter:
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = None
+
+    async def acquire(self) -> Optional[str]:
+        """
+        None once a slot is held (call release()), else the reason
+        the request is shed: "queue_full" or "queue_timeout".
+        """
+
+        # Bound to the running event loop on first use
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                return "queue_full"
+
+            self.waiting += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                return "queue_timeout"
+            finally:
+                self.waiting -= 1
+                _wait_histogram().observe(time.perf_counter() - start)
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+student_limiter = StudentRateLimiter(STUDENT_RATE_PER_SECOND, STUDENT_BURST, ADMISSION_TRACKED_STUDENTS)
+write_limiter = WriteLimiter(WRITE_CONCURRENCY, WRITE_QUEUE_SIZE, WRITE_QUEUE_TIMEOUT_SECONDS)
+
+
+def _count(route: str, outcome: str):
+    registry.counter(
+        "mess_admission_requests_total",
+        "Requests through admission control, by outcome (admitted or why shed).",
+        route=route, outcome=outcome
+    ).inc()
+
+
+def _wait_histogram():
+    return registry.histogram(
+        "mess_admission_queue_wait_seconds",
+        "Time write requests waited for a concurrency slot."
+    )
+
+
+# ---------------------------------------------------------
+# ASGI MIDDLEWARE
+# ---------------------------------------------------------
+
+class AdmissionMiddleware:
+    """
+    Only RATE_LIMITED_ROUTES and WRITE_ROUTES are governed;
+    everything else passes straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL:
+            return await self.app(scope, receive, send)
+
+        route = (scope["method"], scope["path"])
+        id_source = RATE_LIMITED_ROUTES.get(route)
+        is_write = route in WRITE_ROUTES
+
+        if not id_source and not is_write:
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+
+        # 1️⃣ Per-student token bucket (cheap, before any waiting)
+        if id_source:
+            if id_source == "body":
+                body, receive = await _buffer_body(receive)
+                student_id = _student_from_body(body)
+            else:
+                student_id = _student_from_query(scope)
+
+            # No parsable ID: bucket per client address instead
+            key = (path, student_id if student_id is not None else _client(scope))
+            wait = student_limiter.take(key)
+
+            if wait:
+                _count(path, "rate_limited")
+                return await _shed(scope, receive, send, "Too many requests, slow down.", wait)
+
+        if not is_write:
+            _count(path, "admitted")
+            return await self.app(scope, receive, send)
+
+        # 2️⃣ Global write slots, bounded queue
+        reason = await write_limiter.acquire()
+        if reason:
+            _count(path, reason)
+            return await _shed(scope, receive, send, "Server busy, retry shortly.", 1)
+
+        _count(path, "admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            write_limiter.release()
+
+
+async def _buffer_body(receive) -> tuple:
+    """
+    Reads the request body; returns it and a receive() that
+    replays it to the app.
+    """
+
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":  # Client went away
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+def _student_from_body(body: bytes) -> Optional[int]:
+    if len(body) > MAX_PARSED_BODY_BYTES:
+        return None
+    try:
+        student_id = json.loads(body).get("student_id")
+    except (ValueError, AttributeError):
+        return None
+    return student_id if isinstance(student_id, int) else None
+
+
+def _student_from_query(scope) -> Optional[int]:
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("student_id")
+    try:
+        return int(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def _client(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _shed(scope, receive, send, detail: str, retry_after: float):
+    response = JSONResponse(
+        {"detail": detail},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+    await response(scope, receive, send)
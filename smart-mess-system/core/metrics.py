@@ -0,0 +1,361 @@
+# core/metrics.py
+#
+# In-process metrics, exposed as Prometheus text at /metrics:
+#   - stage timers on service functions and the current-meal lookup
+#     (@timed, stage_timer)
+#   - SQL statement count and duration, overall and per request
+#   - HTTP request latency per route
+#   - scheduler job durations (observe_job)
+# Everything is a plain counter / histogram behind one lock per
+# series, so recording costs a couple of microseconds.
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from config import METRICS_ENABLED
+
+
+# Seconds; covers sub-millisecond lookups up to slow commits
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Statements per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100)
+
+
+# ---------------------------------------------------------
+# SERIES
+# ---------------------------------------------------------
+
+class Counter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: str):
+        yield f"{name}{labels} {_number(self.value)}"
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name: str, labels: str):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            yield f"{name}_bucket{_with_label(labels, 'le', le)} {cumulative}"
+        yield f"{name}_sum{labels} {_number(total)}"
+        yield f"{name}_count{labels} {count}"
+
+
+# ---------------------------------------------------------
+# REGISTRY
+# ---------------------------------------------------------
+
+class MetricsRegistry:
+    """
+    name -> (type, help, {label string: series}).
+    Series are created on first use and live for the process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+        self._collectors = []
+
+    def _series(self, kind: str, name: str, help_text: str, labels: dict, factory):
+        key = _labels(labels)
+        family = self._families.get(name)
+        if family is None or key not in family[2]:
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help_text, {}))
+                family[2].setdefault(key, factory())
+        return family[2][key]
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        return self._series("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._series("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def register_collector(self, collect):
+        """
+        collect() -> [(name, type, help, {labels}, value)], read at scrape
+        time (cache stats, subscriber counts, ...).
+        """
+
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+
+        with self._lock:
+            families = sorted(
+                (name, kind, help_text, dict(series))
+                for name, (kind, help_text, series) in self._families.items()
+            )
+
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(series.items()):
+                lines.extend(metric.samples(name, labels))
+
+        collected = {}
+        for collect in self._collectors:
+            for name, kind, help_text, labels, value in collect():
+                collected.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+
+        for name, (kind, help_text, values) in sorted(collected.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items())
+    )
+    return "{" + inner + "}"
+
+
+def _with_label(labels: str, key: str, value: str) -> str:
+    extra = f'{key}="{value}"'
+    if not labels:
+        return "{" + extra + "}"
+    return labels[:-1] + "," + extra + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---------------------------------------------------------
+# STAGE TIMERS
+# ---------------------------------------------------------
+
+def _stage_histogram(stage: str) -> Histogram:
+    return registry.histogram(
+        "mess_stage_duration_seconds",
+        "Time spent in a service function or hot-path stage.",
+        stage=stage
+    )
+
+
+def timed(stage: str):
+    """
+    Decorator: records every call of a sync or async function
+    under mess_stage_duration_seconds{stage=...}.
+    """
+
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        histogram = _stage_histogram(stage)
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Times a block inside a function (e.g. one commit).
+    """
+
+    if not METRICS_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_histogram(stage).observe(time.perf_counter() - start)
+
+
+# ---------------------------------------------------------
+# SCHEDULER JOBS
+# ---------------------------------------------------------
+
+def observe_job(job: str, seconds: float, rows: int = 0):
+    if not METRICS_ENABLED:
+        return
+
+    registry.histogram(
+        "mess_scheduler_job_duration_seconds",
+        "Scheduler job run time.",
+        job=job
+    ).observe(seconds)
+    registry.counter(
+        "mess_scheduler_job_rows_total",
+        "Rows changed by scheduler jobs.",
+        job=job
+    ).inc(rows)
+
+
+def observe_startup(seconds: float):
+    if not METRICS_ENABLED:
+        return
+
+    registry.histogram(
+        "mess_worker_startup_seconds",
+        "Worker startup time (migrations check, ledger rebuild)."
+    ).observe(seconds)
+
+
+# ---------------------------------------------------------
+# SQL STATEMENTS (ENGINE EVENTS)
+# ---------------------------------------------------------
+
+# [statement count, seconds] for the HTTP request being served
+_request_sql = contextvars.ContextVar("request_sql", default=None)
+
+
+def instrument_engine(sync_engine, name: str):
+    """
+    Counts and times every statement on `sync_engine`
+    (for async engines pass .sync_engine).
+    """
+
+    if not METRICS_ENABLED:
+        return
+
+    histogram = registry.histogram(
+        "mess_sql_query_duration_seconds",
+        "SQL statement execution time.",
+        engine=name
+    )
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        histogram.observe(elapsed)
+
+        totals = _request_sql.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+# ---------------------------------------------------------
+# HTTP REQUESTS (ASGI MIDDLEWARE)
+# ---------------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Per-route latency plus SQL statements and SQL time per request.
+    Routes are labelled by their path template; unmatched paths
+    share one label so scans of random URLs can't blow up cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        totals = [0, 0.0]
+        token = _request_sql.set(totals)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_sql.reset(token)
+
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            registry.histogram(
+                "mess_http_request_duration_seconds",
+                "HTTP request latency.",
+                method=method, route=path, status=status[0]
+            ).observe(elapsed)
+            registry.histogram(
+                "mess_http_request_sql_queries",
+                "SQL statements issued per HTTP request.",
+                QUERY_COUNT_BUCKETS,
+                method=method, route=path
+            ).observe(totals[0])
+            registry.histogram(
+                "mess_http_request_sql_seconds",
+                "Total SQL time per HTTP request.",
+                method=method, route=path
+            ).observe(totals[1])
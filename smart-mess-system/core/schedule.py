@@ -0,0 +1,296 @@
+# core/schedule.py
+#
+# Compiled meal schedule.
+# MEAL_WINDOWS / BOOKING_CUTOFF are the defaults; WEEKDAY_SCHEDULES
+# and MESS_SCHEDULES (config.py) override them per weekday and per
+# mess. Each (mess, weekday) compiles once into a sorted table of
+# boundaries searched with bisect, and the slot for "now" is
+# memoized until the next boundary, so the booking and scan paths
+# get meal type, window state and cutoff state from one lookup.
+
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from config import MEAL_WINDOWS, BOOKING_CUTOFF, WEEKDAY_SCHEDULES, MESS_SCHEDULES
+from models import MealType
+
+
+# Breakpoint kinds: state changes AT a start, just AFTER an end / cutoff
+_AT = 0
+_AFTER = 2
+_PROBE = 1  # Query key sits between the two
+
+
+# ---------------------------------------------------------
+# SLOTS AND STATE
+# ---------------------------------------------------------
+
+@dataclass(frozen=True)
+class MealSlot:
+    """
+    Everything that holds between two consecutive boundaries.
+    """
+
+    meal_type: Optional[MealType]   # Active meal, else next bookable one
+    open_windows: frozenset         # Meals whose entry window is open
+    open_bookings: frozenset        # Meals whose booking cutoff hasn't passed
+
+
+@dataclass(frozen=True)
+class MealState:
+    moment: datetime
+    slot: MealSlot
+
+    @property
+    def day(self) -> date:
+        return self.moment.date()
+
+    @property
+    def meal_type(self) -> Optional[MealType]:
+        return self.slot.meal_type
+
+    @property
+    def window_open(self) -> bool:
+        return self.slot.meal_type in self.slot.open_windows
+
+    @property
+    def booking_open(self) -> bool:
+        return self.slot.meal_type in self.slot.open_bookings
+
+
+# ---------------------------------------------------------
+# EFFECTIVE WINDOWS (DEFAULTS + OVERRIDES)
+# ---------------------------------------------------------
+
+def _merge(windows: dict, overrides: dict):
+    for meal, fields in (overrides or {}).items():
+        windows[meal] = dict(windows.get(meal, {}), **fields)
+
+
+def effective_windows(mess_id: Optional[int], weekday: int) -> dict:
+    """
+    {meal: {"start", "end", "cutoff"}} in MEAL_WINDOWS order.
+    Later layers win: defaults, weekday, mess, mess + weekday.
+    """
+
+    windows = {
+        meal: {
+            "start": window["start"],
+            "end": window["end"],
+            "cutoff": BOOKING_CUTOFF[meal],
+        }
+        for meal, window in MEAL_WINDOWS.items()
+    }
+
+    _merge(windows, WEEKDAY_SCHEDULES.get(weekday))
+
+    if mess_id in MESS_SCHEDULES:
+        _merge(windows, MESS_SCHEDULES[mess_id].get("*"))
+        _merge(windows, MESS_SCHEDULES[mess_id].get(weekday))
+
+    return windows
+
+
+def _resolve_linear(windows: dict, now: time) -> MealSlot:
+    """
+    Reference rules (the original time_utils loops); only used
+    while compiling, once per boundary.
+    """
+
+    open_windows = frozenset(
+        MealType(meal) for meal, w in windows.items() if w["start"] <= now <= w["end"]
+    )
+    open_bookings = frozenset(
+        MealType(meal) for meal, w in windows.items() if now <= w["cutoff"]
+    )
+
+    meal_type = None
+
+    # Active meal window first
+    for meal, w in windows.items():
+        if w["start"] <= now <= w["end"]:
+            meal_type = MealType(meal)
+            break
+
+    # Else the upcoming meal, by booking cutoff order
+    if meal_type is None:
+        for meal, w in sorted(windows.items(), key=lambda item: item[1]["cutoff"]):
+            if now <= w["cutoff"]:
+                meal_type = MealType(meal)
+                break
+
+    return MealSlot(meal_type, open_windows, open_bookings)
+
+
+# ---------------------------------------------------------
+# COMPILED DAY
+# ---------------------------------------------------------
+
+class DaySchedule:
+    """
+    Boundaries for one (mess, weekday), sorted, with the slot that
+    holds from each boundary until the next one.
+    """
+
+    def __init__(self, windows: dict):
+        self.windows = windows
+
+        points = {(time.min, _AT)}
+        for w in windows.values():
+            points.add((w["start"], _AT))
+            points.add((w["end"], _AFTER))
+            points.add((w["cutoff"], _AFTER))
+
+        self.points = sorted(points)
+        self.slots = [
+            _resolve_linear(windows, _first_moment(point))
+            for point in self.points
+        ]
+
+    def index_at(self, now: time) -> int:
+        return bisect_right(self.points, (now, _PROBE)) - 1
+
+    def slot_at(self, now: time) -> MealSlot:
+        return self.slots[self.index_at(now)]
+
+    def bounds(self, day: date, index: int):
+        """
+        [start, end) datetimes of slot `index` on `day`.
+        """
+
+        start = _point_datetime(day, self.points[index])
+        if index + 1 < len(self.points):
+            end = _point_datetime(day, self.points[index + 1])
+        else:
+            end = datetime.combine(day + timedelta(days=1), time.min)
+        return start, end
+
+
+def _first_moment(point: tuple) -> time:
+    moment, kind = point
+    if kind == _AT or moment == time.max:
+        return moment
+    return (datetime.combine(date.min, moment) + timedelta(microseconds=1)).time()
+
+
+def _point_datetime(day: date, point: tuple) -> datetime:
+    moment, kind = point
+    start = datetime.combine(day, moment)
+    return start if kind == _AT else start + timedelta(microseconds=1)
+
+
+# ---------------------------------------------------------
+# CACHES
+# ---------------------------------------------------------
+
+_compiled = {}     # (mess_id or None, weekday) -> DaySchedule
+_current = {}      # mess_id or None -> (start, end, slot)
+_lock = threading.Lock()
+
+
+def day_schedule(mess_id: Optional[int], weekday: int) -> DaySchedule:
+
+    # Messes without overrides share the global schedule
+    key = (mess_id if mess_id in MESS_SCHEDULES else None, weekday)
+
+    schedule = _compiled.get(key)
+    if schedule is None:
+        with _lock:
+            schedule = _compiled.setdefault(key, DaySchedule(effective_windows(key[0], weekday)))
+    return schedule
+
+
+def reload_schedule():
+    """
+    Drop compiled tables (after changing the schedule config).
+    """
+
+    with _lock:
+        _compiled.clear()
+        _current.clear()
+
+
+# ---------------------------------------------------------
+# LOOKUPS
+# ---------------------------------------------------------
+
+def resolve(moment: datetime, mess_id: Optional[int] = None) -> MealState:
+    """
+    Meal state at `moment` (naive local time) for a mess.
+    Repeated calls inside the same slot skip the bisect.
+    """
+
+    key = mess_id if mess_id in MESS_SCHEDULES else None
+
+    cached = _current.get(key)
+    if cached and cached[0] <= moment < cached[1]:
+        return MealState(moment, cached[2])
+
+    schedule = day_schedule(key, moment.weekday())
+    index = schedule.index_at(moment.time())
+    start, end = schedule.bounds(moment.date(), index)
+    slot = schedule.slots[index]
+
+    _current[key] = (start, end, slot)
+
+    return MealState(moment, slot)
+
+
+def meal_window(meal_type: MealType, day: date, mess_id: Optional[int] = None) -> dict:
+    """
+    {"start", "end", "cutoff"} for one meal on one day.
+    """
+
+    return day_schedule(mess_id, day.weekday()).windows[MealType(meal_type).value]
+
+
+def has_window_ended(meal_type: MealType, moment: datetime, mess_id: Optional[int] = None) -> bool:
+    return moment.time() > meal_window(meal_type, moment.date(), mess_id)["end"]
+
+
+def overridden_mess_ids() -> set:
+    return set(MESS_SCHEDULES)
+
+
+def mess_scope(meal_type: MealType, day: date, predicate) -> tuple:
+    """
+    Which messes' window for this meal on `day` satisfies
+    predicate(window): (True if messes on the default schedule do,
+    {overridden mess ids that do}).
+    """
+
+    default = predicate(meal_window(meal_type, day))
+    mess_ids = {
+        mess_id for mess_id in MESS_SCHEDULES
+        if predicate(meal_window(meal_type, day, mess_id))
+    }
+    return default, mess_ids
+
+
+def in_scope(scope: tuple, mess_id: int) -> bool:
+    default, mess_ids = scope
+    if mess_id in MESS_SCHEDULES:
+        return mess_id in mess_ids
+    return default
+
+
+def window_end_times(meal_type: MealType) -> dict:
+    """
+    {end time: {weekdays}} over the global and every mess schedule,
+    for scheduling one sweep per distinct window end.
+    """
+
+    ends = {}
+    for mess_id in [None] + sorted(MESS_SCHEDULES):
+        for weekday in range(7):
+            end = meal_window(meal_type, _any_date(weekday), mess_id)["end"]
+            ends.setdefault(end, set()).add(weekday)
+    return ends
+
+
+def _any_date(weekday: int) -> date:
+    # 2024-01-01 was a Monday
+    return date(2024, 1, 1) + timedelta(days=weekday)
@@ -0,0 +1,73 @@
+# core/serialization.py
+#
+# Fast response path for the hot endpoints (FAST_SERIALIZATION).
+# For a response_model route FastAPI validates the return value into
+# the model, dumps it back to a dict, then json.dumps it (recent
+# FastAPI skips the dict, but only with the default response class).
+# Here a TypeAdapter built once per response type validates and
+# writes the JSON bytes in one pydantic-core pass, and the route
+# returns them as a FastJSONResponse, which FastAPI sends untouched.
+# response_model stays on the routes for the OpenAPI schema.
+#
+# JSON list responses of GZIP_MIN_BYTES or more are gzipped when
+# the client sends Accept-Encoding: gzip.
+
+import gzip
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from config import FAST_SERIALIZATION, GZIP_MIN_BYTES, GZIP_LEVEL
+
+
+@lru_cache(maxsize=None)
+def type_adapter(response_type) -> TypeAdapter:
+    """
+    One adapter (compiled validator + serializer) per response type.
+    """
+
+    return TypeAdapter(response_type)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON body already encoded by a TypeAdapter; sent as is.
+    """
+
+    media_type = "application/json"
+
+
+def json_response(response_type, content, request: Optional[Request] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    content: ORM rows, dicts or models matching response_type.
+    Pass `request` to allow gzip (list endpoints).
+    """
+
+    adapter = type_adapter(response_type)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+    headers = None
+    if (
+        request is not None
+        and GZIP_MIN_BYTES
+        and len(body) >= GZIP_MIN_BYTES
+        and "gzip" in request.headers.get("accept-encoding", "")
+    ):
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+
+    return FastJSONResponse(body, status_code=status_code, headers=headers)
+
+
+def respond(response_type, content, request: Optional[Request] = None):
+    """
+    Route return value: the encoded Response in fast mode, else
+    `content` for FastAPI's response_model handling.
+    """
+
+    if not FAST_SERIALIZATION:
+        return content
+
+    return json_response(response_type, content, request)
@@ -1,10 +1,12 @@
 # core/time_utils.py
 
-from datetime import datetime, date, time
+from datetime import datetime, date
 from typing import Optional
 
-from config import MEAL_WINDOWS, BOOKING_CUTOFF, ENABLE_TIME_OVERRIDE, SIMULATED_TIME
+from config import ENABLE_TIME_OVERRIDE, SIMULATED_TIME
 from models import MealType
+from core.metrics import timed
+from core.schedule import MealState, resolve, has_window_ended
 
 
 # ---------------------------------------------------------
@@ -23,61 +25,88 @@ def get_current_datetime() -> datetime:
     return datetime.now()
 
 
+def to_local_datetime(moment: datetime) -> datetime:
+    """
+    Naive local datetime (the clock MEAL_WINDOWS is written in).
+    Timezone-aware values are converted, naive ones kept as-is.
+    """
+
+    if moment.tzinfo is not None:
+        return moment.astimezone().replace(tzinfo=None)
+
+    return moment
+
+
+# ---------------------------------------------------------
+# CURRENT MEAL STATE (ONE CLOCK READ, ONE SCHEDULE LOOKUP)
+# ---------------------------------------------------------
+
+def get_meal_state(mess_id: Optional[int] = None) -> MealState:
+    """
+    Meal type, window state and cutoff state for right now.
+    mess_id picks up that mess's schedule overrides.
+    """
+
+    return resolve(get_current_datetime(), mess_id)
+
+
+def require_meal_type(state: MealState) -> MealType:
+    """
+    state.meal_type, or ValueError when no meal is active or upcoming.
+    """
+
+    if state.meal_type is None:
+        raise ValueError("No active or upcoming meal window.")
+    return state.meal_type
+
+
 # ---------------------------------------------------------
 # GET CURRENT MEAL TYPE
 # ---------------------------------------------------------
 
-def get_current_meal_type() -> MealType:
+@timed("time_utils.get_current_meal_type")
+def get_current_meal_type(mess_id: Optional[int] = None) -> MealType:
     """
     Determines current or upcoming meal type.
     """
 
-    now = get_current_datetime().time()
+    return require_meal_type(get_meal_state(mess_id))
 
-    # Check active meal window first
-    for meal, window in MEAL_WINDOWS.items():
-        if window["start"] <= now <= window["end"]:
-            return MealType(meal)
 
-    # If not active, check upcoming based on cutoff
-    for meal, cutoff in BOOKING_CUTOFF.items():
-        if now <= cutoff:
-            return MealType(meal)
+# ---------------------------------------------------------
+# GET MEAL TYPE AT A GIVEN TIME (BUFFERED SCANS)
+# ---------------------------------------------------------
 
-    raise ValueError("No active or upcoming meal window.")
+def get_meal_type_at(moment: datetime, mess_id: Optional[int] = None) -> MealType:
+    """
+    Same rules as get_current_meal_type, for any local datetime.
+    """
+
+    return require_meal_type(resolve(moment, mess_id))
 
 
 # ---------------------------------------------------------
 # CHECK IF WITHIN MEAL WINDOW (ENTRY VALIDATION)
 # ---------------------------------------------------------
 
-def is_within_meal_window(meal_type: MealType) -> bool:
-    now = get_current_datetime().time()
-    window = MEAL_WINDOWS[meal_type.value]
-
-    return window["start"] <= now <= window["end"]
+def is_within_meal_window(meal_type: MealType, mess_id: Optional[int] = None) -> bool:
+    return MealType(meal_type) in get_meal_state(mess_id).slot.open_windows
 
 
 # ---------------------------------------------------------
 # CHECK IF BOOKING ALLOWED (CUTOFF VALIDATION)
 # ---------------------------------------------------------
 
-def is_before_cutoff(meal_type: MealType) -> bool:
-    now = get_current_datetime().time()
-    cutoff = BOOKING_CUTOFF[meal_type.value]
-
-    return now <= cutoff
+def is_before_cutoff(meal_type: MealType, mess_id: Optional[int] = None) -> bool:
+    return MealType(meal_type) in get_meal_state(mess_id).slot.open_bookings
 
 
 # ---------------------------------------------------------
 # CHECK IF MEAL WINDOW HAS ENDED (FOR NO-SHOW)
 # ---------------------------------------------------------
 
-def has_meal_window_ended(meal_type: MealType) -> bool:
-    now = get_current_datetime().time()
-    window_end = MEAL_WINDOWS[meal_type.value]["end"]
-
-    return now > window_end
+def has_meal_window_ended(meal_type: MealType, mess_id: Optional[int] = None) -> bool:
+    return has_window_ended(meal_type, get_current_datetime(), mess_id)
 
 
 # ---------------------------------------------------------
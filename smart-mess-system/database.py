@@ -1,8 +1,26 @@
 # database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool, QueuePool
+from contextlib import contextmanager
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from core.metrics import instrument_engine
+from config import (
+    DB_ENGINE_PROFILE,
+    DB_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    SEED_DEMO_DATA
+)
 
 # ---------------------------------------------------------
 # DATABASE CONFIGURATION
@@ -11,20 +29,103 @@ from sqlalchemy.pool import StaticPool
 # SQLite database file
 DATABASE_URL = "sqlite:///./mess.db"
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Required for SQLite
-    poolclass=StaticPool  # Ensures single connection in hackathon setup
-)
+# Same file through aiosqlite, for the async request path
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./mess.db"
+
+# Held while a worker runs startup (schema, seed data)
+STARTUP_LOCK_FILE = "./mess.db.startup.lock"
+
+
+def _apply_wal_pragmas(dbapi_connection, connection_record):
+    """
+    Runs on every new pooled connection.
+    """
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DB_ENGINE_PROFILE):
+    """
+    Builds the engine for the configured profile (see config.py).
+    """
+
+    if profile == "static":
+        return create_engine(
+            url,
+            connect_args={"check_same_thread": False},  # Required for SQLite
+            poolclass=StaticPool  # Ensures single connection in hackathon setup
+        )
 
-# Session factory
+    if profile == "wal":
+        wal_engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,  # Connections move between pool threads
+                "timeout": DB_BUSY_TIMEOUT_MS / 1000
+            },
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW
+        )
+        event.listen(wal_engine, "connect", _apply_wal_pragmas)
+        return wal_engine
+
+    raise ValueError(f"Unknown DB_ENGINE_PROFILE: {profile}")
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, profile: str = DB_ENGINE_PROFILE):
+    """
+    Async (aiosqlite) engine with the same profiles as create_db_engine.
+    """
+
+    if profile == "static":
+        return create_async_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+
+    if profile == "wal":
+        wal_engine = create_async_engine(
+            url,
+            connect_args={"timeout": DB_BUSY_TIMEOUT_MS / 1000},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW
+        )
+        event.listen(wal_engine.sync_engine, "connect", _apply_wal_pragmas)
+        return wal_engine
+
+    raise ValueError(f"Unknown DB_ENGINE_PROFILE: {profile}")
+
+
+# Create engines
+# Sync: startup, scheduler and CLI tools. Async: API requests.
+engine = create_db_engine()
+async_engine = create_async_db_engine()
+
+# SQL count / duration for /metrics
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# Session factories
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+# expire_on_commit=False: attributes stay readable after commit
+# without an implicit (async) reload
+AsyncSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    bind=async_engine
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -33,78 +134,134 @@ Base = declarative_base()
 # DEPENDENCY FOR FASTAPI ROUTES
 # ---------------------------------------------------------
 
-def get_db():
+async def get_db():
     """
-    FastAPI dependency to get DB session.
+    FastAPI dependency to get an async DB session.
     Ensures proper opening and closing of DB session.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # ---------------------------------------------------------
 # DATABASE INITIALIZATION
 # ---------------------------------------------------------
 
-
-def init_db():
+def init_db(seed: bool = None):
     """
-    Call this once in main.py to create tables.
+    Brings the schema up to date (migrations.py), then seeds demo
+    data if SEED_DEMO_DATA (or seed=True). When the schema version
+    already matches this is a single query.
     """
 
-    Base.metadata.create_all(bind=engine)
+    from migrations import migrate
+
+    migrate()
+
+    if seed if seed is not None else SEED_DEMO_DATA:
+        with startup_lock():
+            seed_demo_data()
+
+
+# ---------------------------------------------------------
+# DEMO DATA (DEV ONLY, SEED_DEMO_DATA)
+# ---------------------------------------------------------
+
+def seed_demo_data():
+    """
+    Demo students, messes and a week of lunch history, each only
+    if its table is empty.
+    """
 
     from models import Student, Mess, MealIntent, BookingStatus, MealType
+    from services.rollup import backfill_meal_rollups
     from datetime import date, timedelta
 
     db = SessionLocal()
 
-    # ---------- DEMO STUDENTS ----------
-    if not db.query(Student).first():
+    try:
+        # ---------- DEMO STUDENTS ----------
+        if not db.query(Student).first():
+
+            student1 = Student(id=1, name="Rahul Kumar",hostel="Hostel A", year=2)
+            student2 = Student(id=2, name="Aman Singh",hostel="Hostel B", year=2)
+            student3 = Student(id=3, name="Priya Sharma", hostel="Hostel C", year=2)
+            student4 = Student(id=4, name="Karan Mehta", hostel="Hostel A", year=2)
+            student5 = Student(id=5, name="Neha Verma", hostel="Hostel B", year=2)
+            student6 = Student(id=6, name="Arjun Patel", hostel="Hostel C", year=2)
+
+            db.add_all([
+            student1, 
+            student2,
+            student3,
+            student4,
+            student5,
+            student6])
+            db.commit()
+
+        # ---------- DEMO MESSES ----------
+        if not db.query(Mess).first():
+            mess1 = Mess(id=1, name="Hostel A", allowed_year=2, max_capacity=200)
+            mess2 = Mess(id=2, name="Hostel B", allowed_year=2, max_capacity=180)
+            mess3 = Mess(id=3, name="Hostel C", allowed_year=2, max_capacity=150)
+
+
+            db.add_all([mess1, mess2, mess3])
+            db.commit()
 
-        student1 = Student(id=1, name="Rahul Kumar",hostel="Hostel A", year=2)
-        student2 = Student(id=2, name="Aman Singh",hostel="Hostel B", year=2)
-        student3 = Student(id=3, name="Priya Sharma", hostel="Hostel C", year=2)
-        student4 = Student(id=4, name="Karan Mehta", hostel="Hostel A", year=2)
-        student5 = Student(id=5, name="Neha Verma", hostel="Hostel B", year=2)
-        student6 = Student(id=6, name="Arjun Patel", hostel="Hostel C", year=2)
+        # ---------- DEMO HISTORY ----------
+        if not db.query(MealIntent).first():
 
-        db.add_all([
-        student1, 
-        student2,
-        student3,
-        student4,
-        student5,
-        student6])
-        db.commit()
+            for i in range(7):
+                demo_entry = MealIntent(
+                    student_id=1,
+                    mess_id=1,
+                    date=date.today() - timedelta(days=i),
+                    meal_type=MealType.lunch,
+                    status=BookingStatus.attended
+                )
+                db.add(demo_entry)
 
-    # ---------- DEMO MESSES ----------
-    if not db.query(Mess).first():
-        mess1 = Mess(id=1, name="Hostel A", allowed_year=2, max_capacity=200)
-        mess2 = Mess(id=2, name="Hostel B", allowed_year=2, max_capacity=180)
-        mess3 = Mess(id=3, name="Hostel C", allowed_year=2, max_capacity=150)
+            db.commit()
 
+            # Demo history is in the past: roll it up like closed meals
+            backfill_meal_rollups(db)
 
-        db.add_all([mess1, mess2, mess3])
-        db.commit()
+    finally:
+        db.close()
 
-    # ---------- DEMO HISTORY ----------
-    if not db.query(MealIntent).first():
 
-        for i in range(7):
-            demo_entry = MealIntent(
-                student_id=1,
-                mess_id=1,
-                date=date.today() - timedelta(days=i),
-                meal_type=MealType.lunch,
-                status=BookingStatus.attended
-            )
-            db.add(demo_entry)
+# ---------------------------------------------------------
+# STARTUP LOCK (uvicorn --workers N)
+# ---------------------------------------------------------
+
+@contextmanager
+def startup_lock(path: str = STARTUP_LOCK_FILE):
+    """
+    Exclusive lock across worker processes: the first worker creates
+    the schema and seed data, the others wait and then find it done.
+    Released by the OS if the holder dies.
+    """
 
-        db.commit()
+    with open(path, "a+b") as lock_file:
+        fd = lock_file.fileno()
 
-    db.close()
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # Gave up after ~10 s, keep waiting
+                    time.sleep(1)
 
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
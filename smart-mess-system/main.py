@@ -1,40 +1,28 @@
 # main.py
 
+import os
+import sys
+import time
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
 
-from database import init_db, SessionLocal
-from scheduler import start_scheduler
-from models import Student, Mess
+from database import init_db
+from scheduler import scheduler_election, stop_scheduler
+from services.capacity import rebuild_capacity_ledger
+from services.write_behind import write_behind
+from config import WEB_WORKERS, SCAN_WRITE_BEHIND, STARTUP_BUDGET_SECONDS
 
 # Routers
 from routers.auth import router as auth_router
 from routers.booking import router as booking_router
 from routers.scan import router as scan_router
 from routers.dashboard import router as dashboard_router
-from models import Student, Mess
-
-def seed_demo_data(db):
-    if db.query(Student).count() == 0:
-        students = [
-            Student(id=1, name="Rahul", year=1, hostel="H1"),
-            Student(id=2, name="Aman", year=1, hostel="H1"),
-            Student(id=3, name="Priya", year=2, hostel="H2"),
-            Student(id=4, name="Karan", year=2, hostel="H2"),
-            Student(id=5, name="Sneha", year=3, hostel="H3"),
-        ]
-        db.add_all(students)
-
-    if db.query(Mess).count() == 0:
-        messes = [
-            Mess(name="H1 Mess", year=1, capacity=3),
-            Mess(name="H2 Mess", year=2, capacity=3),
-            Mess(name="H3 Mess", year=3, capacity=3),
-        ]
-        db.add_all(messes)
-
-    db.commit()
+from routers.metrics import router as metrics_router
+from routers.admin import router as admin_router
+from core.metrics import MetricsMiddleware, observe_startup
+from core.admission import AdmissionMiddleware
 
 
 # ---------------------------------------------------------
@@ -56,57 +44,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-student rate limit + write concurrency limit (429 when saturated)
+app.add_middleware(AdmissionMiddleware)
+
+# Request latency + SQL per request, for /metrics (shed requests included)
+app.add_middleware(MetricsMiddleware)
+
 
 # ---------------------------------------------------------
-# DATABASE INIT + DEMO SEEDING
+# STARTUP EVENT
 # ---------------------------------------------------------
 
-def seed_demo_data():
-    """
-    Creates demo students and messes if DB is empty.
-    """
+# Runs in every worker (uvicorn --workers N). Migrations only when
+# the schema version is behind (under a file lock), demo data only
+# with SEED_DEMO_DATA, the scheduler only in the elected leader.
 
-    db: Session = SessionLocal()
+@app.on_event("startup")
+def startup_event():
+    start = time.perf_counter()
 
-    try:
-        if db.query(Student).count() == 0:
+    init_db()
 
-            students = [
-                Student(id=1, name="Rahul", year=1, hostel="H1"),
-                Student(id=2, name="Ankit", year=1, hostel="H1"),
-                Student(id=3, name="Priya", year=1, hostel="H2"),
-                Student(id=4, name="Sahil", year=2, hostel="H3"),
-                Student(id=5, name="Neha", year=2, hostel="H3"),
-            ]
+    # Per-worker, in-memory
+    rebuild_capacity_ledger()
 
-            db.add_all(students)
-            db.commit()
+    scheduler_election.start()
 
-        if db.query(Mess).count() == 0:
+    server_workers = _server_workers()
+    if server_workers is not None and server_workers != WEB_WORKERS:
+        print(
+            f"Warning: server runs {server_workers} worker(s) but WEB_WORKERS = {WEB_WORKERS}; "
+            "set it to match (booking ledger pre-check, stream resync)"
+        )
 
-            messes = [
-                Mess(id=1, name="H1 Mess", allowed_year=1, max_capacity=3),
-                Mess(id=2, name="H2 Mess", allowed_year=1, max_capacity=2),
-                Mess(id=3, name="H3 Mess", allowed_year=2, max_capacity=3),
-            ]
+    if WEB_WORKERS > 1 and SCAN_WRITE_BEHIND:
+        print("Warning: SCAN_WRITE_BEHIND dedupes pending scans per worker; use one worker")
 
-            db.add_all(messes)
-            db.commit()
+    duration = time.perf_counter() - start
+    observe_startup(duration)
+    if duration > STARTUP_BUDGET_SECONDS:
+        print(f"Warning: startup took {duration:.2f} s (budget {STARTUP_BUDGET_SECONDS} s)")
 
-    finally:
-        db.close()
+    print(f"Smart Mess System Started Successfully 🚀 ({duration * 1000:.0f} ms)")
 
 
-# ---------------------------------------------------------
-# STARTUP EVENT
-# ---------------------------------------------------------
+def _server_workers() -> Optional[int]:
+    """
+    Worker count uvicorn / gunicorn was started with (--workers, -w,
+    else WEB_CONCURRENCY). Spawned workers keep the parent's argv.
+    None when not started from either command line.
+    """
 
-@app.on_event("startup")
-def startup_event():
-    init_db()
-    seed_demo_data()
-    start_scheduler()
-    print("Smart Mess System Started Successfully 🚀")
+    if not any(name in sys.argv[0] for name in ("uvicorn", "gunicorn")):
+        return None
+
+    args = sys.argv[1:]
+    value = os.environ.get("WEB_CONCURRENCY", "1")
+    for i, arg in enumerate(args):
+        if arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        elif arg in ("--workers", "-w") and i + 1 < len(args):
+            value = args[i + 1]
+
+    return int(value) if value.isdigit() else None
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write-behind mode: write every acknowledged scan before exit
+    await write_behind.stop()
+    stop_scheduler()
 
 
 # ---------------------------------------------------------
@@ -117,6 +124,8 @@ app.include_router(auth_router)
 app.include_router(booking_router)
 app.include_router(scan_router)
 app.include_router(dashboard_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 
 # ---------------------------------------------------------
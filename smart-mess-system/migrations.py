@@ -0,0 +1,177 @@
+# migrations.py
+#
+# Versioned schema migrations. schema_version holds one row per
+# migration applied; MIGRATIONS below is the ordered list. On
+# startup migrate() reads the current version (one query) and,
+# only if it is behind, applies the missing migrations under the
+# startup file lock, each in its own transaction together with its
+# schema_version row.
+#
+# Changing models.py? create_all only creates missing tables, so a
+# new column, index or backfill on an existing table needs a new
+# entry at the end of MIGRATIONS. Never edit or reorder old ones.
+# Steps must be safe to re-run: SQLite commits some DDL on its own.
+#
+# From smart-mess-system/:
+#   python -m migrations          (apply pending migrations)
+#   python -m migrations status
+
+import re
+import sys
+import time
+
+from sqlalchemy import inspect, select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database import Base, engine, startup_lock
+from models import SchemaVersion
+
+
+# ---------------------------------------------------------
+# MIGRATION STEPS (fn(conn), run inside a transaction)
+# ---------------------------------------------------------
+
+def _create_tables(conn):
+    # Fresh DB: the whole current schema. Existing DB: missing tables only.
+    Base.metadata.create_all(bind=conn)
+
+
+# Columns added to models.py after their table existed:
+# (table, column, DDL). Monthly archive tables get them too.
+ADDED_COLUMNS = [
+    ("meal_intent", "walk_in", "BOOLEAN NOT NULL DEFAULT 0"),
+]
+
+
+def _add_columns(conn):
+    inspector = inspect(conn)
+    names = inspector.get_table_names()
+
+    for table, column, ddl in ADDED_COLUMNS:
+        pattern = re.compile(rf"^{table}(_\d{{4}}_\d{{2}})?$")
+
+        for name in filter(pattern.match, names):
+            if column not in {c["name"] for c in inspector.get_columns(name)}:
+                conn.exec_driver_sql(f"ALTER TABLE {name} ADD COLUMN {column} {ddl}")
+
+
+# Indexes replaced by a wider one in models.py
+OBSOLETE_INDEXES = [
+    "ix_diet_logs_student_meal",  # -> ix_diet_logs_student_meal_timestamp
+]
+
+
+def _sync_indexes(conn):
+    # Every index declared in models.py; no-op where present
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+    for name in OBSOLETE_INDEXES:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+def _backfill_student_stats(conn):
+    from services.student_stats import backfill_student_meal_stats
+
+    backfill_student_meal_stats(Session(bind=conn))
+
+
+def _backfill_meal_rollups(conn):
+    from services.rollup import backfill_meal_rollups
+
+    backfill_meal_rollups(Session(bind=conn))
+
+
+# (version, description, step). Append only.
+MIGRATIONS = [
+    (1, "create tables", _create_tables),
+    (2, "meal_intent.walk_in, incl. archive tables", _add_columns),
+    (3, "indexes from models.py, drop replaced ones", _sync_indexes),
+    (4, "backfill student_meal_stats from diet_logs", _backfill_student_stats),
+    (5, "backfill meal_rollup from meal_intent", _backfill_meal_rollups),
+    (6, "create write_behind_dead_letters", _create_tables),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ---------------------------------------------------------
+# APPLY
+# ---------------------------------------------------------
+
+def current_version() -> int:
+    """
+    Highest applied migration; 0 for a new (or pre-versioning) DB.
+    """
+
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(select(func.max(SchemaVersion.version))) or 0
+    except OperationalError:  # No schema_version table yet
+        return 0
+
+
+def migrate() -> list:
+    """
+    Applies pending migrations. Returns the versions applied
+    (empty when the schema is already current).
+    """
+
+    if current_version() == LATEST_VERSION:
+        return []
+
+    applied = []
+
+    # Several workers may start at once: one migrates, the others wait
+    with startup_lock():
+        version = current_version()
+
+        if version > LATEST_VERSION:
+            raise RuntimeError(
+                f"Database schema is v{version}, newer than this code (v{LATEST_VERSION})."
+            )
+
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+
+            start = time.perf_counter()
+            with engine.begin() as conn:
+                SchemaVersion.__table__.create(bind=conn, checkfirst=True)
+                step(conn)
+                conn.execute(SchemaVersion.__table__.insert().values(
+                    version=number,
+                    description=description
+                ))
+
+            applied.append(number)
+            print(f"Migration {number} ({description}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    return applied
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+def main(argv: list):
+    command = argv[1] if len(argv) > 1 else "migrate"
+    if command not in ("migrate", "status"):
+        print("Usage: python -m migrations [migrate|status]")
+        return 2
+
+    if command == "migrate":
+        applied = migrate()
+        print(f"Schema at v{LATEST_VERSION}" + (f", applied {applied}" if applied else ", nothing to do"))
+        return 0
+
+    version = current_version()
+    for number, description, _ in MIGRATIONS:
+        print(f"{'applied' if number <= version else 'pending':<8} {number:>3}  {description}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
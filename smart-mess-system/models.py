@@ -1,6 +1,6 @@
 # models.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Enum, UniqueConstraint, Index, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -77,9 +77,16 @@ class MealIntent(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Created by a scan without a booking (counted in meal_rollup)
+    walk_in = Column(Boolean, default=False, server_default=false(), nullable=False)
+
     # Prevent duplicate booking for same student + date + meal_type
+    # Composite index serves capacity, dashboard and no-show filters
+    # Student + (date, meal_type) index serves history pages (keyset)
     __table_args__ = (
         UniqueConstraint("student_id", "meal_type", "date", name="unique_student_meal_per_day"),
+        Index("ix_meal_intent_date_meal_mess_status", "date", "meal_type", "mess_id", "status"),
+        Index("ix_meal_intent_student_date_meal", "student_id", "date", "meal_type"),
     )
 
     # Relationships
@@ -102,6 +109,123 @@ class DietLog(Base):
     meal_type = Column(Enum(MealType), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Per-student meal lookups (history attended_at); day ranges (archival)
+    __table_args__ = (
+        Index("ix_diet_logs_student_meal_timestamp", "student_id", "meal_type", "timestamp"),
+        Index("ix_diet_logs_timestamp", "timestamp"),
+    )
+
     # Relationships
     student = relationship("Student", back_populates="diet_logs")
     mess = relationship("Mess", back_populates="diet_logs")
+
+
+# ---------------------------------------------------------
+# STUDENT MEAL STATS (RUNNING COUNTERS FROM DIET LOGS)
+# ---------------------------------------------------------
+
+class StudentMealStats(Base):
+    __tablename__ = "student_meal_stats"
+
+    # Updated in the same transaction as each DietLog insert
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+
+    total_meals = Column(Integer, nullable=False, default=0)
+    breakfast_count = Column(Integer, nullable=False, default=0)
+    lunch_count = Column(Integer, nullable=False, default=0)
+    dinner_count = Column(Integer, nullable=False, default=0)
+
+    last_meal_at = Column(DateTime, nullable=True)
+
+
+# ---------------------------------------------------------
+# SCAN RECEIPTS (IDEMPOTENT /scan/entry RETRIES)
+# ---------------------------------------------------------
+
+class ScanReceipt(Base):
+    __tablename__ = "scan_receipts"
+
+    # Idempotency-Key header, or derived from (student, mess, day, meal)
+    key = Column(String, primary_key=True)
+
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    mess_id = Column(Integer, ForeignKey("mess.id"), nullable=False)
+
+    # The original ScanResponse
+    message = Column(String, nullable=False)
+    status = Column(Enum(BookingStatus), nullable=False)
+    meal_type = Column(Enum(MealType), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+    # Written in the same transaction as the DietLog; pruned after the TTL
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+# ---------------------------------------------------------
+# WRITE-BEHIND DEAD LETTERS (ACKNOWLEDGED SCANS THAT FAILED TO WRITE)
+# ---------------------------------------------------------
+
+class WriteBehindDeadLetter(Base):
+    __tablename__ = "write_behind_dead_letters"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # The queued scan, as acknowledged (no foreign keys, so parking
+    # can't fail for the same reason the write did)
+    student_id = Column(Integer, nullable=False)
+    mess_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    meal_type = Column(Enum(MealType), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    walk_in = Column(Boolean, nullable=False)
+    receipt_key = Column(String, nullable=True)
+
+    error = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# ---------------------------------------------------------
+# MEAL ROLLUP (ONE ROW PER DATE / MESS / MEAL, FOR TRENDS)
+# ---------------------------------------------------------
+
+class MealRollup(Base):
+    __tablename__ = "meal_rollup"
+
+    date = Column(Date, primary_key=True)
+    mess_id = Column(Integer, ForeignKey("mess.id"), primary_key=True)
+    meal_type = Column(Enum(MealType), primary_key=True)
+
+    # Final counts, written with the no-show sweep when the window closes
+    booked = Column(Integer, nullable=False, default=0)      # Booked ahead (not walk-ins)
+    attended = Column(Integer, nullable=False, default=0)    # Includes walk-ins
+    no_show = Column(Integer, nullable=False, default=0)
+    walk_in = Column(Integer, nullable=False, default=0)
+
+    finalized_at = Column(DateTime, nullable=False)
+
+
+# ---------------------------------------------------------
+# LEADER LEASES (ONE SCHEDULER ACROSS WORKERS)
+# ---------------------------------------------------------
+
+class LeaderLease(Base):
+    __tablename__ = "leader_leases"
+
+    # One row per role, e.g. "scheduler"
+    name = Column(String, primary_key=True)
+
+    # Worker that owns the role until expires_at (UTC)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+# ---------------------------------------------------------
+# SCHEMA VERSION (ONE ROW PER APPLIED MIGRATION, migrations.py)
+# ---------------------------------------------------------
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
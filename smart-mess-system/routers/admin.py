@@ -0,0 +1,49 @@
+# routers/admin.py
+
+import io
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from schemas import RosterImportResponse
+from services.roster import import_roster
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+# Roster bodies larger than this spill to a temp file
+ROSTER_SPOOL_BYTES = 4 * 1024 * 1024
+
+
+# ---------------------------------------------------------
+# ROSTER IMPORT (CSV BODY)
+# ---------------------------------------------------------
+
+@router.post("/roster", response_model=RosterImportResponse)
+async def upload_roster(request: Request):
+    """
+    Body is the roster CSV itself (Content-Type: text/csv),
+    header row: id,name,year,hostel.
+    """
+
+    with tempfile.SpooledTemporaryFile(max_size=ROSTER_SPOOL_BYTES) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+
+        lines = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        try:
+            return await run_in_threadpool(_import, lines)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            lines.detach()
+
+
+def _import(lines) -> dict:
+    db = SessionLocal()
+    try:
+        return import_roster(db, lines)
+    finally:
+        db.close()
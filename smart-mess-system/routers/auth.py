@@ -1,10 +1,11 @@
 # routers/auth.py
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
 from models import Student
+from services.lookup_cache import get_cached_async
 from schemas import StudentResponse
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -15,13 +16,13 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 # ---------------------------------------------------------
 
 @router.post("/login", response_model=StudentResponse)
-def login(student_id: int, db: Session = Depends(get_db)):
+async def login(student_id: int, db: AsyncSession = Depends(get_db)):
     """
     Simple login using student ID.
     No password for hackathon simplicity.
     """
 
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await get_cached_async(db, Student, student_id)
 
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
@@ -34,9 +35,9 @@ def login(student_id: int, db: Session = Depends(get_db)):
 # ---------------------------------------------------------
 
 @router.get("/student/{student_id}", response_model=StudentResponse)
-def get_student(student_id: int, db: Session = Depends(get_db)):
+async def get_student(student_id: int, db: AsyncSession = Depends(get_db)):
 
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await get_cached_async(db, Student, student_id)
 
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
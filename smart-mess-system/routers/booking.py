@@ -1,16 +1,18 @@
 # routers/booking.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
-from schemas import BookingCreate, BookingResponse
-from services.validation import (
-    validate_student,
-    validate_mess,
-    validate_booking
-)
-from services.meal_logic import create_booking
+from config import HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX
+from schemas import BookingCreate, BookingResponse, BookingHistoryPage
+from services.validation import validate_student_async
+from services.booking_engine import book_meal_async
+from services.history import get_booking_history
+from core.serialization import respond
 
 
 router = APIRouter(prefix="/booking", tags=["Booking"])
@@ -21,33 +23,63 @@ router = APIRouter(prefix="/booking", tags=["Booking"])
 # ---------------------------------------------------------
 
 @router.post("/book", response_model=BookingResponse)
-def book_meal(request: BookingCreate, db: Session = Depends(get_db)):
+async def book_meal(request: BookingCreate, db: AsyncSession = Depends(get_db)):
 
     try:
-        # 1️⃣ Validate student
-        student = validate_student(db, request.student_id)
-
-        # 2️⃣ Validate mess
-        mess = validate_mess(db, request.mess_id)
-
-        # 3️⃣ Validate booking rules (cutoff, duplicate, capacity, year)
-        meal_type = validate_booking(db, student, mess)
-
-        # 4️⃣ Create booking record
-        new_booking = create_booking(
-            db=db,
-            student_id=student.id,
-            mess_id=mess.id,
-            meal_type=meal_type
-        )
+        # Eligibility, duplicate and capacity checks + insert, one statement
+        new_booking = await book_meal_async(db, request.student_id, request.mess_id)
 
-        return new_booking
+        return respond(BookingResponse, new_booking)
 
     except HTTPException as e:
         raise e
 
+    # SQLite write lock not granted within DB_BUSY_TIMEOUT_MS
+    except OperationalError:
+        raise HTTPException(
+            status_code=503,
+            detail="Database busy, retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail="Internal server error."
         )
+
+
+# ---------------------------------------------------------
+# BOOKING / ATTENDANCE HISTORY (CURSOR PAGINATED)
+# ---------------------------------------------------------
+
+@router.get("/history/{student_id}", response_model=BookingHistoryPage)
+async def booking_history(
+    student_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_MAX),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Newest meals first. Pass next_cursor back as ?cursor= for older ones.
+    """
+
+    await validate_student_async(db, student_id)
+
+    rows, next_cursor = await get_booking_history(db, student_id, limit, cursor)
+
+    return respond(BookingHistoryPage, {
+        "items": [
+            {
+                "booking_id": row.id,
+                "date": row.date,
+                "meal_type": row.meal_type,
+                "mess_id": row.mess_id,
+                "status": row.status,
+                "attended_at": row.attended_at
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor
+    }, request)
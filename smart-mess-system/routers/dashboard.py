@@ -1,22 +1,38 @@
 # routers/dashboard.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from database import get_db
-from models import Mess, Student, DietLog, MealType
+import asyncio
+import json
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db, AsyncSessionLocal
+from models import Student, StudentMealStats, MealIntent, BookingStatus, MealType
+from config import STREAM_KEEPALIVE_SECONDS, WEB_WORKERS, TRENDS_DEFAULT_DAYS, TRENDS_MAX_DAYS
 from schemas import (
     MessCountResponse,
     StudentSummaryResponse,
-    NoShowResponse
+    NoShowResponse,
+    TrendPoint,
+    MessTrendTotal,
+    TrendBucket,
+    ExportFormat
 )
 
 from services.capacity import (
-    get_booked_count,
-    get_attended_count,
-    get_remaining_capacity
+    get_meal_counts_by_mess_async,
+    get_effective_capacity
 )
 
+from services.occupancy import occupancy_broadcaster, RESYNC
+from services.lookup_cache import get_cached_async
+from services.export import EXPORT_FORMATS
+from services.rollup import get_trend_async, get_mess_totals_async
+from core.serialization import respond
 from core.time_utils import get_current_meal_type, get_today_date
 
 
@@ -28,34 +44,114 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 # ---------------------------------------------------------
 
 @router.get("/mess-counts", response_model=list[MessCountResponse])
-def get_mess_counts(db: Session = Depends(get_db)):
+async def get_mess_counts(request: Request, db: AsyncSession = Depends(get_db)):
 
     try:
         meal_type = get_current_meal_type()
-        results = []
+        return respond(list[MessCountResponse], await _build_mess_counts(db, meal_type), request)
+
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to fetch mess counts.")
 
-        mess_list = db.query(Mess).all()
 
-        for mess in mess_list:
+async def _build_mess_counts(db: AsyncSession, meal_type: MealType) -> list:
 
-            booked = get_booked_count(db, mess.id, meal_type)
-            attended = get_attended_count(db, mess.id, meal_type)
-            remaining = get_remaining_capacity(db, mess, meal_type)
+    results = []
 
-            results.append(
-                MessCountResponse(
-                    mess_id=mess.id,
-                    mess_name=mess.name,
-                    booked=booked,
-                    attended=attended,
-                    remaining_capacity=remaining
-                )
-            )
+    # Single aggregate query for all messes
+    for row in await get_meal_counts_by_mess_async(db, meal_type):
 
-        return results
+        results.append({
+            "mess_id": row.id,
+            "mess_name": row.name,
+            "booked": row.booked,
+            "attended": row.attended,
+            "remaining_capacity": get_effective_capacity(row) - row.booked
+        })
+
+    return results
+
+
+# ---------------------------------------------------------
+# LIVE MESS COUNTS (SERVER-SENT EVENTS)
+# ---------------------------------------------------------
+
+@router.get("/stream")
+async def stream_mess_counts(request: Request):
+    """
+    'snapshot' event with the current meal's counts, then 'delta'
+    events pushed by bookings, scans and the no-show sweep.
+    A new snapshot is sent when the current meal (or day) changes,
+    when this client fell too far behind to get every delta, and on
+    every keepalive when WEB_WORKERS > 1 (deltas only come from the
+    worker serving this stream).
+    """
+
+    async def events():
+        queue = occupancy_broadcaster.subscribe()
+        meal_type, day = None, None
+
+        try:
+            while not await request.is_disconnected():
+
+                current = _current_meal_or_none(), get_today_date()
+                if current != (meal_type, day):
+                    meal_type, day = current
+                    yield await _snapshot_event(meal_type, day)
+
+                try:
+                    delta = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if WEB_WORKERS > 1 and meal_type:
+                        yield await _snapshot_event(meal_type, day)
+                    else:
+                        yield ": keepalive\n\n"
+                    continue
+
+                if delta is RESYNC:
+                    yield await _snapshot_event(meal_type, day)
+
+                elif (
+                    meal_type
+                    and delta["meal_type"] == meal_type.value
+                    and delta["date"] == day.isoformat()
+                ):
+                    yield _sse("delta", delta)
+
+        finally:
+            occupancy_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to fetch mess counts.")
+
+def _current_meal_or_none() -> Optional[MealType]:
+    try:
+        return get_current_meal_type()
+    except ValueError:
+        return None
+
+
+async def _snapshot_event(meal_type: Optional[MealType], day: date) -> str:
+
+    messes = []
+    if meal_type:
+        # Short-lived session: don't hold a pooled connection for the stream
+        async with AsyncSessionLocal() as db:
+            messes = await _build_mess_counts(db, meal_type)
+
+    return _sse("snapshot", {
+        "date": day.isoformat(),
+        "meal_type": meal_type.value if meal_type else None,
+        "messes": messes
+    })
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 # ---------------------------------------------------------
@@ -63,39 +159,27 @@ def get_mess_counts(db: Session = Depends(get_db)):
 # ---------------------------------------------------------
 
 @router.get("/student-summary/{student_id}", response_model=StudentSummaryResponse)
-def get_student_summary(student_id: int, db: Session = Depends(get_db)):
+async def get_student_summary(student_id: int, db: AsyncSession = Depends(get_db)):
 
-    student = db.query(Student).filter(Student.id == student_id).first()
+    # Running counters, kept in step with diet_logs by mark_attendance
+    stats = await db.get(StudentMealStats, student_id)
+
+    if stats:
+        return respond(StudentSummaryResponse, stats)
+
+    # No meals yet
+    student = await get_cached_async(db, Student, student_id)
 
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    total_meals = db.query(DietLog).filter(
-        DietLog.student_id == student_id
-    ).count()
-
-    breakfast_count = db.query(DietLog).filter(
-        DietLog.student_id == student_id,
-        DietLog.meal_type == MealType.breakfast
-    ).count()
-
-    lunch_count = db.query(DietLog).filter(
-        DietLog.student_id == student_id,
-        DietLog.meal_type == MealType.lunch
-    ).count()
-
-    dinner_count = db.query(DietLog).filter(
-        DietLog.student_id == student_id,
-        DietLog.meal_type == MealType.dinner
-    ).count()
-
-    return StudentSummaryResponse(
-        student_id=student_id,
-        total_meals=total_meals,
-        breakfast_count=breakfast_count,
-        lunch_count=lunch_count,
-        dinner_count=dinner_count
-    )
+    return respond(StudentSummaryResponse, {
+        "student_id": student_id,
+        "total_meals": 0,
+        "breakfast_count": 0,
+        "lunch_count": 0,
+        "dinner_count": 0
+    })
 
 
 # ---------------------------------------------------------
@@ -103,29 +187,132 @@ def get_student_summary(student_id: int, db: Session = Depends(get_db)):
 # ---------------------------------------------------------
 
 @router.get("/no-shows", response_model=list[NoShowResponse])
-def get_no_shows(db: Session = Depends(get_db)):
+async def get_no_shows(request: Request, db: AsyncSession = Depends(get_db)):
 
     today = get_today_date()
     meal_type = get_current_meal_type()
 
-    from models import MealIntent, BookingStatus
+    # Student name joined in the same query; rows match NoShowResponse
+    records = await db.execute(
+        select(
+            MealIntent.student_id,
+            Student.name.label("student_name"),
+            MealIntent.meal_type,
+            MealIntent.date
+        ).join(
+            Student, Student.id == MealIntent.student_id
+        ).where(
+            MealIntent.date == today,
+            MealIntent.meal_type == meal_type,
+            MealIntent.status == BookingStatus.no_show
+        )
+    )
 
-    records = db.query(MealIntent).filter(
-        MealIntent.date == today,
-        MealIntent.meal_type == meal_type,
-        MealIntent.status == BookingStatus.no_show
-    ).all()
+    return respond(list[NoShowResponse], records.all(), request)
 
-    results = []
 
-    for record in records:
-        results.append(
-            NoShowResponse(
-                student_id=record.student_id,
-                student_name=record.student.name,
-                meal_type=record.meal_type,
-                date=record.date
-            )
-        )
+# ---------------------------------------------------------
+# TRENDS (DATE RANGES, FROM MEAL_ROLLUP)
+# ---------------------------------------------------------
 
-    return results
+@router.get("/trends", response_model=list[TrendPoint])
+async def get_trends(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: TrendBucket = TrendBucket.day,
+    mess_id: Optional[int] = None,
+    meal_type: Optional[MealType] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Totals per day / week / month, start/end inclusive (default:
+    the last TRENDS_DEFAULT_DAYS days). Only meals whose window
+    has closed are counted.
+    """
+
+    start, end = _trend_range(start, end)
+    rows = await get_trend_async(db, start, end, bucket.value, mess_id, meal_type)
+
+    return respond(list[TrendPoint], rows, request)
+
+
+@router.get("/trends/messes", response_model=list[MessTrendTotal])
+async def get_trends_by_mess(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    meal_type: Optional[MealType] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Totals per mess over the range, e.g. last month's no-shows.
+    """
+
+    start, end = _trend_range(start, end)
+    rows = await get_mess_totals_async(db, start, end, meal_type)
+
+    return respond(list[MessTrendTotal], rows, request)
+
+
+def _trend_range(start: Optional[date], end: Optional[date]) -> tuple:
+
+    end = end or get_today_date()
+    start = start or end - timedelta(days=TRENDS_DEFAULT_DAYS - 1)
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start.")
+
+    if (end - start).days >= TRENDS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {TRENDS_MAX_DAYS} days.")
+
+    return start, end
+
+
+# ---------------------------------------------------------
+# HISTORY EXPORT (BILLING, STREAMED)
+# ---------------------------------------------------------
+
+@router.get("/export/bookings")
+async def export_bookings(
+    format: ExportFormat = ExportFormat.csv,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    mess_id: Optional[int] = None,
+    student_id: Optional[int] = None
+):
+    """
+    meal_intent rows (hot + archived), start/end inclusive.
+    """
+
+    return _export("meal_intent", "bookings", format, start, end, mess_id, student_id)
+
+
+@router.get("/export/attendance")
+async def export_attendance(
+    format: ExportFormat = ExportFormat.csv,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    mess_id: Optional[int] = None,
+    student_id: Optional[int] = None
+):
+    """
+    diet_logs rows (hot + archived), filtered on the log timestamp.
+    """
+
+    return _export("diet_logs", "attendance", format, start, end, mess_id, student_id)
+
+
+def _export(hot_name: str, label: str, format: ExportFormat, start, end, mess_id, student_id):
+
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start.")
+
+    stream, media_type = EXPORT_FORMATS[format.value]
+    filename = f"{label}_{start or 'all'}_{end or 'all'}.{format.value}"
+
+    return StreamingResponse(
+        stream(hot_name, start=start, end=end, mess_id=mess_id, student_id=student_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
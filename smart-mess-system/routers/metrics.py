@@ -0,0 +1,102 @@
+# routers/metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import registry
+from services.lookup_cache import student_cache, mess_cache
+from services.scan_receipts import scan_receipt_cache
+from services.occupancy import occupancy_broadcaster
+from services.write_behind import write_behind
+from scheduler import last_sweeps, scheduler_election
+from core.admission import write_limiter, student_limiter
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+# ---------------------------------------------------------
+# SCRAPE-TIME VALUES (CACHES, STREAM, SCHEDULER, ADMISSION)
+# ---------------------------------------------------------
+
+def _collect_runtime():
+
+    for cache in (student_cache, mess_cache, scan_receipt_cache):
+        stats = cache.stats()
+        labels = {"cache": cache.name}
+        yield ("mess_lookup_cache_hits_total", "counter", "Lookup cache hits.", labels, stats["hits"])
+        yield ("mess_lookup_cache_misses_total", "counter", "Lookup cache misses.", labels, stats["misses"])
+        yield ("mess_lookup_cache_evictions_total", "counter", "Lookup cache LRU evictions.", labels, stats["evictions"])
+        yield ("mess_lookup_cache_entries", "gauge", "Entries currently cached.", labels, stats["size"])
+
+    yield (
+        "mess_stream_subscribers", "gauge",
+        "Open /dashboard/stream connections.",
+        {}, occupancy_broadcaster.subscriber_count
+    )
+
+    yield (
+        "mess_write_behind_queue_depth", "gauge",
+        "Scans acknowledged but not yet written (write-behind mode).",
+        {}, write_behind.depth
+    )
+    yield (
+        "mess_write_behind_failed_flushes_total", "counter",
+        "Write-behind flush attempts that failed.",
+        {}, write_behind.failed_flushes
+    )
+    yield (
+        "mess_write_behind_dead_letters_total", "counter",
+        "Acknowledged scans that could not be written, parked in write_behind_dead_letters.",
+        {}, write_behind.dead_lettered
+    )
+
+    yield (
+        "mess_admission_writes_in_flight", "gauge",
+        "Write requests holding a concurrency slot.",
+        {}, write_limiter.in_flight
+    )
+    yield (
+        "mess_admission_writes_waiting", "gauge",
+        "Write requests queued for a concurrency slot.",
+        {}, write_limiter.waiting
+    )
+    yield (
+        "mess_admission_tracked_students", "gauge",
+        "Per-student token buckets held.",
+        {}, student_limiter.tracked
+    )
+
+    yield (
+        "mess_scheduler_leader", "gauge",
+        "1 if this worker runs the scheduler jobs.",
+        {}, int(scheduler_election.is_leader)
+    )
+
+    for meal, sweep in last_sweeps.items():
+        labels = {"meal": meal}
+        yield (
+            "mess_no_show_last_sweep_timestamp_seconds", "gauge",
+            "When the last no-show sweep for this meal finished.",
+            labels, sweep["ran_at"].timestamp()
+        )
+        yield (
+            "mess_no_show_last_sweep_rows", "gauge",
+            "Rows marked no_show by the last sweep for this meal.",
+            labels, sweep["rows"]
+        )
+
+
+registry.register_collector(_collect_runtime)
+
+
+# ---------------------------------------------------------
+# PROMETHEUS ENDPOINT
+# ---------------------------------------------------------
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,12 +1,19 @@
 # routers/scan.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
-from schemas import ScanRequest, ScanResponse
-from services.validation import validate_scan
-from services.meal_logic import mark_attendance
+from schemas import ScanRequest, ScanResponse, ScanBatchItem, ScanBatchResult
+from services.validation import validate_scan_async, validate_scan_batch_async
+from services.meal_logic import mark_attendance_async, mark_attendance_batch_async
+from services.scan_receipts import scan_receipt_key, find_receipt_async
+from services.write_behind import enqueue_attendance
+from config import SCAN_BATCH_MAX_SIZE, SCAN_WRITE_BEHIND
+from core.serialization import respond
 
 
 router = APIRouter(prefix="/scan", tags=["Scan"])
@@ -17,24 +24,112 @@ router = APIRouter(prefix="/scan", tags=["Scan"])
 # ---------------------------------------------------------
 
 @router.post("/entry", response_model=ScanResponse)
-def scan_entry(request: ScanRequest, db: Session = Depends(get_db)):
+async def scan_entry(
+    request: ScanRequest,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retries (same Idempotency-Key header, or the same student, mess
+    and meal within a minute) get the original response back.
+    """
+
+    key = scan_receipt_key(request.student_id, request.mess_id, idempotency_key)
 
     try:
+        # 0️⃣ Retry of a scan that already succeeded
+        if key:
+            replay = await find_receipt_async(db, key, request.student_id, request.mess_id)
+            if replay:
+                return respond(ScanResponse, replay)
+
         # 1️⃣ Validate scan (booking exists, correct mess, not duplicate, window active)
-        booking, meal_type = validate_scan(
+        booking, meal_type = await validate_scan_async(
             db=db,
             student_id=request.student_id,
-            mess_id=request.mess_id
+            mess_id=request.mess_id,
+            commit_walk_in=not SCAN_WRITE_BEHIND
         )
 
-        # 2️⃣ Mark attendance + create DietLog
-        result = mark_attendance(
+        # 2️⃣ Mark attendance + create DietLog (queued in write-behind mode)
+        if SCAN_WRITE_BEHIND:
+            return respond(ScanResponse, await enqueue_attendance(booking, meal_type, key))
+
+        result = await mark_attendance_async(
             db=db,
             booking=booking,
-            meal_type=meal_type
+            meal_type=meal_type,
+            receipt_key=key
         )
 
-        return result
+        return respond(ScanResponse, result)
+
+    except HTTPException as e:
+        raise e
+
+    except IntegrityError:
+        # Concurrent retry won the race: its receipt is now stored
+        await db.rollback()
+        replay = key and await find_receipt_async(db, key, request.student_id, request.mess_id)
+        if replay:
+            return respond(ScanResponse, replay)
+        raise HTTPException(status_code=409, detail="Scan already in progress.")
+
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error."
+        )
+
+
+# ---------------------------------------------------------
+# BULK SCAN ENTRY (OFFLINE TURNSTILE FLUSH)
+# ---------------------------------------------------------
+
+@router.post("/entries", response_model=list[ScanBatchResult])
+async def scan_entries(entries: list[ScanBatchItem], request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Ingests buffered scans in one round trip and one transaction.
+    Returns one result per scan, in request order.
+    """
+
+    if len(entries) > SCAN_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {SCAN_BATCH_MAX_SIZE} scans per batch."
+        )
+
+    try:
+        # 1️⃣ Validate all scans with set-based lookups
+        validated = await validate_scan_batch_async(db=db, entries=entries)
+
+        # 2️⃣ Mark attendance for accepted scans in one commit
+        accepted = [
+            (booking, meal_type, scanned_at)
+            for booking, meal_type, scanned_at, error in validated
+            if error is None
+        ]
+        marked = iter(await mark_attendance_batch_async(db=db, accepted=accepted))
+
+        results = []
+        for entry, (booking, meal_type, _, error) in zip(entries, validated):
+            if error:
+                results.append({
+                    "student_id": entry.student_id,
+                    "mess_id": entry.mess_id,
+                    "success": False,
+                    "message": error,
+                    "meal_type": meal_type
+                })
+            else:
+                results.append({
+                    "student_id": entry.student_id,
+                    "mess_id": entry.mess_id,
+                    "success": True,
+                    **next(marked)
+                })
+
+        return respond(list[ScanBatchResult], results, request)
 
     except HTTPException as e:
         raise e
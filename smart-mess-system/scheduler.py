@@ -1,61 +1,232 @@
 # scheduler.py
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import update, and_, or_, false
 from sqlalchemy.orm import Session
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, time as dt_time
+import time
 
 from database import SessionLocal
 from models import MealIntent, BookingStatus, MealType
-from config import MEAL_WINDOWS, NO_SHOW_CHECK_INTERVAL
+from config import (
+    NO_SHOW_SWEEP_DELAY_SECONDS,
+    NO_SHOW_CATCH_UP_DAYS,
+    ARCHIVE_RUN_AT
+)
+from services.capacity import capacity_ledger
+from services.occupancy import publish_count_delta
+from core.metrics import observe_job
+from services.archive import archive_closed_days
+from services.scan_receipts import prune_scan_receipts
+from services.rollup import rollup_stmt
+from services.leader import LeaderElection, SCHEDULER_ROLE
+from core.schedule import (
+    has_window_ended,
+    window_end_times,
+    overridden_mess_ids,
+    mess_scope,
+    in_scope
+)
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
 
 
 # ---------------------------------------------------------
 # HELPER: CHECK IF MEAL WINDOW HAS ENDED
 # ---------------------------------------------------------
 
-def has_meal_window_ended(meal_type: MealType) -> bool:
+def has_meal_window_ended(meal_type: MealType, mess_id: int = None) -> bool:
     """
     Returns True if current time is past the end of meal window.
     """
-    now = datetime.now().time()
-    window_end = MEAL_WINDOWS[meal_type.value]["end"]
-    return now > window_end
+    return has_window_ended(meal_type, datetime.now(), mess_id)
+
+
+def _scope_clause(scope: tuple):
+    """
+    SQL filter for the messes in a mess_scope() result.
+    None when every mess is in scope.
+    """
+
+    if scope is None:
+        return None
+
+    default, mess_ids = scope
+    others = overridden_mess_ids() - set(mess_ids)
+
+    if default:
+        return MealIntent.mess_id.notin_(others) if others else None
+    return MealIntent.mess_id.in_(mess_ids) if mess_ids else false()
 
 
 # ---------------------------------------------------------
-# NO-SHOW UPDATE JOB
+# NO-SHOW SWEEP (ONE UPDATE PER MEAL)
 # ---------------------------------------------------------
 
-def update_no_shows():
+# Last sweep per meal: {"date", "rows", "duration_ms", "ran_at"}
+last_sweeps = {}
+
+
+def sweep_no_shows(meal_type: MealType, day: date, catch_up: bool = False, scope: tuple = None) -> int:
     """
-    Background task:
-    Marks all 'booked' entries as 'no_show'
-    if meal window has passed and they didn't attend.
+    Marks every still-'booked' row for this meal as 'no_show'
+    with a single UPDATE, and finalizes meal_rollup for the same
+    rows in the same transaction. scope (see core.schedule.mess_scope)
+    limits which messes are swept on `day`; catch_up also covers
+    every mess on the previous NO_SHOW_CATCH_UP_DAYS days.
+    Returns the number of rows changed.
     """
 
+    start = time.perf_counter()
     db: Session = SessionLocal()
 
     try:
-        today = date.today()
+        first_day = day - timedelta(days=NO_SHOW_CATCH_UP_DAYS) if catch_up else day
+        mess_filter = _scope_clause(scope)
 
-        # Get all bookings still marked as 'booked'
-        bookings = db.query(MealIntent).filter(
-            MealIntent.date == today,
-            MealIntent.status == BookingStatus.booked
-        ).all()
-
-        for booking in bookings:
-            if has_meal_window_ended(booking.meal_type):
-                booking.status = BookingStatus.no_show
+        if mess_filter is None:
+            day_filter = MealIntent.date.between(first_day, day)
+        else:
+            day_filter = and_(MealIntent.date == day, mess_filter)
+            if catch_up:
+                day_filter = or_(
+                    MealIntent.date.between(first_day, day - timedelta(days=1)),
+                    day_filter
+                )
 
+        result = db.execute(
+            update(MealIntent).where(
+                day_filter,
+                MealIntent.meal_type == meal_type,
+                MealIntent.status == BookingStatus.booked
+            ).values(
+                status=BookingStatus.no_show
+            ).execution_options(
+                synchronize_session=False
+            )
+        )
+        db.execute(rollup_stmt(day_filter, MealIntent.meal_type == meal_type))
         db.commit()
+        rows = result.rowcount
+
+        # Give the seats back to the capacity ledger
+        freed = capacity_ledger.release_meal(
+            day, meal_type, scope and (lambda mess_id: in_scope(scope, mess_id))
+        )
+
+        for mess_id, seats in freed.items():
+            publish_count_delta(mess_id, day, meal_type, booked=-seats)
 
     except Exception as e:
         print("Scheduler error:", e)
+        return 0
+
+    finally:
+        db.close()
+
+    duration_ms = (time.perf_counter() - start) * 1000
+    observe_job(
+        f"no_show_catch_up_{meal_type.value}" if catch_up else f"no_show_sweep_{meal_type.value}",
+        duration_ms / 1000,
+        rows
+    )
+    last_sweeps[meal_type.value] = {
+        "date": day,
+        "rows": rows,
+        "duration_ms": round(duration_ms, 2),
+        "ran_at": datetime.now()
+    }
+
+    return rows
+
+
+def sweep_meal_job(meal_type: str, window_end: dt_time):
+    """
+    Cron job, fires right after a meal window ends.
+    Sweeps the messes whose window ended at window_end today.
+    """
+
+    today = date.today()
+    scope = mess_scope(meal_type, today, lambda window: window["end"] == window_end)
+
+    sweep_no_shows(MealType(meal_type), today, scope=scope)
+
+
+# ---------------------------------------------------------
+# CATCH-UP FOR MISSED WINDOWS (AFTER RESTART)
+# ---------------------------------------------------------
+
+def update_no_shows():
+    """
+    Sweeps every window that has already closed:
+    today's ended meals plus recent days (NO_SHOW_CATCH_UP_DAYS).
+    """
+
+    now = datetime.now()
+    today = now.date()
+
+    for meal_type in MealType:
+        # Today only where the window has already ended
+        ended = mess_scope(meal_type, today, lambda window: now.time() > window["end"])
+        sweep_no_shows(meal_type, today, catch_up=True, scope=ended)
+
+    capacity_ledger.prune(today)
+
+
+# ---------------------------------------------------------
+# ARCHIVE CLOSED DAYS (HOT TABLES STAY A CONSTANT SIZE)
+# ---------------------------------------------------------
+
+def archive_job():
+    """
+    Daily cron job, see services/archive.py.
+    """
+
+    start = time.perf_counter()
+    db: Session = SessionLocal()
+
+    try:
+        moved = archive_closed_days(db)
+    except Exception as e:
+        print("Archive error:", e)
+        return
+
+    finally:
+        db.close()
+
+    observe_job("archive", time.perf_counter() - start, sum(moved.values()))
+
+
+def _day_of_week(weekdays: set) -> str:
+    if len(weekdays) == 7:
+        return "*"
+    return ",".join(WEEKDAYS[day] for day in sorted(weekdays))
+
+
+# ---------------------------------------------------------
+# PRUNE EXPIRED SCAN RECEIPTS
+# ---------------------------------------------------------
+
+def prune_receipts_job():
+    """
+    Hourly cron job, see services/scan_receipts.py.
+    """
+
+    start = time.perf_counter()
+    db: Session = SessionLocal()
+
+    try:
+        deleted = prune_scan_receipts(db)
+    except Exception as e:
+        print("Receipt prune error:", e)
+        return
 
     finally:
         db.close()
 
+    observe_job("prune_scan_receipts", time.perf_counter() - start, deleted)
+
 
 # ---------------------------------------------------------
 # START SCHEDULER
@@ -65,12 +236,90 @@ scheduler = BackgroundScheduler()
 
 def start_scheduler():
     """
-    Starts the background scheduler.
-    Should be called once from main.py
+    Starts (or resumes) the background scheduler.
+    Called by scheduler_election when this worker becomes leader.
     """
+
+    # Windows that closed while the app was down
+    update_no_shows()
+
+    # One sweep per meal per distinct window end (weekday / mess overrides)
+    for meal_type in MealType:
+        meal = meal_type.value
+        ends = window_end_times(meal_type)
+
+        for window_end, weekdays in sorted(ends.items()):
+            fire_at = datetime.combine(date.today(), window_end) + timedelta(
+                seconds=NO_SHOW_SWEEP_DELAY_SECONDS
+            )
+            job_id = f"no_show_sweep_{meal}"
+            if len(ends) > 1:
+                job_id += f"_{window_end.strftime('%H%M')}"
+
+            scheduler.add_job(
+                sweep_meal_job,
+                "cron",
+                day_of_week=_day_of_week(weekdays),
+                hour=fire_at.hour,
+                minute=fire_at.minute,
+                second=fire_at.second,
+                args=[meal, window_end],
+                id=job_id,
+                replace_existing=True,
+                coalesce=True,
+                misfire_grace_time=3600
+            )
+
+    scheduler.add_job(
+        archive_job,
+        "cron",
+        hour=ARCHIVE_RUN_AT.hour,
+        minute=ARCHIVE_RUN_AT.minute,
+        id="archive_closed_days",
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=6 * 3600
+    )
+
     scheduler.add_job(
-        update_no_shows,
-        "interval",
-        seconds=NO_SHOW_CHECK_INTERVAL
+        prune_receipts_job,
+        "cron",
+        minute=15,
+        id="prune_scan_receipts",
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=3600
     )
-    scheduler.start()
+
+    if scheduler.running:
+        scheduler.resume()
+    else:
+        scheduler.start()
+
+
+def pause_scheduler():
+    """
+    Leadership lost: jobs stay registered but stop firing.
+    """
+
+    if scheduler.running:
+        scheduler.pause()
+
+
+# ---------------------------------------------------------
+# LEADER ELECTION (ONE SCHEDULER ACROSS WORKERS)
+# ---------------------------------------------------------
+
+# Every worker runs the election; only the leader runs the jobs
+scheduler_election = LeaderElection(SCHEDULER_ROLE, start_scheduler, pause_scheduler)
+
+
+def stop_scheduler():
+    """
+    Call on shutdown: hands leadership over, then stops the scheduler.
+    """
+
+    scheduler_election.stop()
+
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
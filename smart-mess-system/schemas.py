@@ -22,6 +22,17 @@ class BookingStatus(str, Enum):
     no_show = "no_show"
 
 
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+class TrendBucket(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
 # ---------------------------------------------------------
 # STUDENT SCHEMAS
 # ---------------------------------------------------------
@@ -86,6 +97,20 @@ class BookingResponse(BaseModel):
         from_attributes = True
 
 
+class BookingHistoryItem(BaseModel):
+    booking_id: int
+    date: date
+    meal_type: MealType
+    mess_id: int
+    status: BookingStatus
+    attended_at: Optional[datetime] = None
+
+
+class BookingHistoryPage(BaseModel):
+    items: List[BookingHistoryItem]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page
+
+
 # ---------------------------------------------------------
 # QR SCAN ENTRY SCHEMAS
 # ---------------------------------------------------------
@@ -102,6 +127,22 @@ class ScanResponse(BaseModel):
     timestamp: datetime
 
 
+class ScanBatchItem(BaseModel):
+    student_id: int
+    mess_id: int
+    scanned_at: Optional[datetime] = None  # Device time; defaults to now
+
+
+class ScanBatchResult(BaseModel):
+    student_id: int
+    mess_id: int
+    success: bool
+    message: str
+    status: Optional[BookingStatus] = None
+    meal_type: Optional[MealType] = None
+    timestamp: Optional[datetime] = None
+
+
 # ---------------------------------------------------------
 # DASHBOARD SCHEMAS
 # ---------------------------------------------------------
@@ -120,6 +161,7 @@ class StudentSummaryResponse(BaseModel):
     breakfast_count: int
     lunch_count: int
     dinner_count: int
+    last_meal_at: Optional[datetime] = None
 
 
 class NoShowResponse(BaseModel):
@@ -127,3 +169,37 @@ class NoShowResponse(BaseModel):
     student_name: str
     meal_type: MealType
     date: date
+
+
+class TrendPoint(BaseModel):
+    period: date              # First day of the day / week / month
+    booked: int
+    attended: int
+    no_show: int
+    walk_in: int
+
+
+class MessTrendTotal(BaseModel):
+    mess_id: int
+    mess_name: str
+    booked: int
+    attended: int
+    no_show: int
+    walk_in: int
+
+
+# ---------------------------------------------------------
+# ADMIN SCHEMAS
+# ---------------------------------------------------------
+
+class RosterRowError(BaseModel):
+    line: int
+    error: str
+
+
+class RosterImportResponse(BaseModel):
+    inserted: int
+    updated: int
+    unchanged: int
+    rejected: int
+    errors: List[RosterRowError]
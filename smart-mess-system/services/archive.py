@@ -0,0 +1,286 @@
+# services/archive.py
+#
+# Hot/cold split for the two tables that grow every meal.
+# Closed days older than ARCHIVE_AFTER_DAYS move out of meal_intent
+# and diet_logs into per-month tables (meal_intent_2026_01, ...),
+# one day per transaction, so the hot tables stay a constant size.
+#
+# Readers that need all history (student stats backfill/check)
+# use meal_intent_source() / diet_logs_source(): hot UNION ALL cold.
+#
+# One-off maintenance, run from smart-mess-system/:
+#   python -m services.archive run
+#   python -m services.archive status
+
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (
+    Table, Column, Index, MetaData, select, insert, delete, func, union_all, inspect, and_
+)
+from sqlalchemy.orm import Session
+
+from models import MealIntent, DietLog
+from config import ARCHIVE_AFTER_DAYS, NO_SHOW_CATCH_UP_DAYS
+from core.metrics import timed
+
+
+# Archive tables are created on demand; they are not part of Base
+archive_metadata = MetaData()
+
+HOT_TABLES = {
+    "meal_intent": MealIntent.__table__,
+    "diet_logs": DietLog.__table__,
+}
+
+# Index columns per archive table (history lookups are per student)
+ARCHIVE_INDEXES = {
+    "meal_intent": ("student_id", "date"),
+    "diet_logs": ("student_id", "timestamp"),
+}
+
+
+# ---------------------------------------------------------
+# ARCHIVE TABLES (ONE PER HOT TABLE PER MONTH)
+# ---------------------------------------------------------
+
+def archive_table_name(hot_name: str, day: date) -> str:
+    return f"{hot_name}_{day.year:04d}_{day.month:02d}"
+
+
+def _archive_table(hot_name: str, name: str) -> Table:
+    """
+    Same columns as the hot table; no foreign keys or unique
+    constraints (rows are immutable once archived).
+    """
+
+    if name in archive_metadata.tables:
+        return archive_metadata.tables[name]
+
+    hot = HOT_TABLES[hot_name]
+    table = Table(
+        name,
+        archive_metadata,
+        *[
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+            for c in hot.columns
+        ]
+    )
+    Index(f"ix_{name}_lookup", *[table.c[col] for col in ARCHIVE_INDEXES[hot_name]])
+
+    return table
+
+
+def list_archive_tables(db: Session, hot_name: str) -> list:
+    """
+    Existing archive tables for `hot_name`, oldest month first.
+    """
+
+    pattern = re.compile(rf"^{hot_name}_\d{{4}}_\d{{2}}$")
+    names = inspect(db.connection()).get_table_names()
+
+    return [
+        _archive_table(hot_name, name)
+        for name in sorted(names)
+        if pattern.match(name)
+    ]
+
+
+# ---------------------------------------------------------
+# HOT + COLD READERS
+# ---------------------------------------------------------
+
+def source_tables(db: Session, hot_name: str, start: date = None, end: date = None) -> list:
+    """
+    Archive tables whose month overlaps [start, end] (oldest first),
+    then the hot table. For AsyncSession use db.run_sync().
+    """
+
+    first_month = archive_table_name(hot_name, start) if start else None
+    last_month = archive_table_name(hot_name, end) if end else None
+
+    tables = [
+        table for table in list_archive_tables(db, hot_name)
+        if (first_month is None or table.name >= first_month)
+        and (last_month is None or table.name <= last_month)
+    ]
+
+    return tables + [HOT_TABLES[hot_name]]
+
+
+def _source(db: Session, hot_name: str):
+    hot = HOT_TABLES[hot_name]
+    cold = source_tables(db, hot_name)[:-1]
+
+    if not cold:
+        return hot
+
+    columns = [c.name for c in hot.columns]
+    return union_all(
+        select(*[hot.c[name] for name in columns]),
+        *[select(*[table.c[name] for name in columns]) for table in cold]
+    ).subquery(hot_name)
+
+
+def meal_intent_source(db: Session):
+    """
+    Selectable over every meal_intent row, hot and archived.
+    Same column names as MealIntent.__table__.
+    """
+
+    return _source(db, "meal_intent")
+
+
+def diet_logs_source(db: Session):
+    return _source(db, "diet_logs")
+
+
+# ---------------------------------------------------------
+# MOVE ONE DAY
+# ---------------------------------------------------------
+
+def _day_filter(hot_name: str, day: date):
+    hot = HOT_TABLES[hot_name]
+
+    if hot_name == "meal_intent":
+        return hot.c.date == day
+
+    start = datetime.combine(day, datetime.min.time())
+    return and_(hot.c.timestamp >= start, hot.c.timestamp < start + timedelta(days=1))
+
+
+def _archive_day_stmts(hot_name: str, table: Table, day: date):
+    """
+    (INSERT INTO archive SELECT ..., DELETE FROM hot) for one day.
+    """
+
+    hot = HOT_TABLES[hot_name]
+    columns = [c.name for c in hot.columns]
+    day_filter = _day_filter(hot_name, day)
+
+    return (
+        insert(table).from_select(
+            columns,
+            select(*[hot.c[name] for name in columns]).where(day_filter)
+        ),
+        delete(hot).where(day_filter)
+    )
+
+
+def _archive_day(db: Session, hot_name: str, day: date) -> int:
+    """
+    Copies one day into its month table and deletes it from the
+    hot table, in one transaction. Returns rows moved.
+    """
+
+    table = _archive_table(hot_name, archive_table_name(hot_name, day))
+    table.create(bind=db.get_bind(), checkfirst=True)
+
+    copy_stmt, delete_stmt = _archive_day_stmts(hot_name, table, day)
+
+    try:
+        db.execute(copy_stmt)
+        moved = db.execute(delete_stmt).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return moved
+
+
+def _oldest_hot_day(db: Session, hot_name: str):
+    hot = HOT_TABLES[hot_name]
+
+    if hot_name == "meal_intent":
+        return db.scalar(select(func.min(hot.c.date)))
+
+    oldest = db.scalar(select(func.min(hot.c.timestamp)))
+    return oldest.date() if oldest else None
+
+
+def archive_cutoff(today: date) -> date:
+    """
+    First day that stays hot. Never inside the no-show catch-up
+    range, so the sweep only ever touches hot rows.
+    """
+
+    keep_days = max(ARCHIVE_AFTER_DAYS, NO_SHOW_CATCH_UP_DAYS + 1)
+    return today - timedelta(days=keep_days)
+
+
+# ---------------------------------------------------------
+# ARCHIVE JOB
+# ---------------------------------------------------------
+
+@timed("archive.archive_closed_days")
+def archive_closed_days(db: Session, today: date = None) -> dict:
+    """
+    Moves every day before archive_cutoff() out of the hot tables.
+    Returns {hot table: rows moved}.
+    """
+
+    cutoff = archive_cutoff(today or date.today())
+    moved = {}
+
+    for hot_name in HOT_TABLES:
+        moved[hot_name] = 0
+        day = _oldest_hot_day(db, hot_name)
+
+        while day is not None and day < cutoff:
+            moved[hot_name] += _archive_day(db, hot_name, day)
+            day += timedelta(days=1)
+
+    return moved
+
+
+def archive_status(db: Session) -> dict:
+    """
+    {table name: row count} for the hot tables and every archive table.
+    """
+
+    counts = {}
+    for hot_name, hot in HOT_TABLES.items():
+        counts[hot_name] = db.scalar(select(func.count()).select_from(hot))
+        for table in list_archive_tables(db, hot_name):
+            counts[table.name] = db.scalar(select(func.count()).select_from(table))
+
+    return counts
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+def main(argv: list):
+    from database import SessionLocal, init_db
+
+    command = argv[1] if len(argv) > 1 else ""
+    if command not in ("run", "status"):
+        print("Usage: python -m services.archive run|status")
+        return 2
+
+    init_db()
+    db = SessionLocal()
+
+    try:
+        if command == "run":
+            start = time.perf_counter()
+            moved = archive_closed_days(db)
+            elapsed = time.perf_counter() - start
+            print(", ".join(f"{rows} {name}" for name, rows in moved.items())
+                  + f" rows archived in {elapsed:.1f} s")
+            return 0
+
+        for name, rows in archive_status(db).items():
+            print(f"{name:<24} {rows:>10}")
+        return 0
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,122 @@
+# services/booking_engine.py
+#
+# Single-statement booking. Eligibility (student and mess exist,
+# year matches), the capacity check and the insert run as one
+#   INSERT INTO meal_intent ... SELECT ... WHERE booked < capacity
+#   ON CONFLICT DO NOTHING RETURNING ...
+# so there is no gap between counting seats and taking one.
+# Duplicates are caught by unique_student_meal_per_day. Only when
+# no row comes back do we look up why (diagnose_booking_failure_async),
+# to return the usual HTTP error.
+#
+# The in-memory capacity ledger stays as a pre-check: once a mess
+# is known to be full, requests are refused without queueing for
+# SQLite's write lock. Single worker only: with WEB_WORKERS > 1 each
+# worker's ledger misses the others' scans and the leader's sweeps,
+# so it could report a mess full that still has seats.
+
+from datetime import datetime
+
+from sqlalchemy import select, func, literal, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import WEB_WORKERS
+from models import Student, Mess, MealIntent, BookingStatus, MealType
+from services.capacity import capacity_ledger, effective_capacity_expr, get_effective_capacity
+from services.lookup_cache import get_cached_async
+from services.occupancy import publish_count_delta
+from services.validation import diagnose_booking_failure_async
+from core.time_utils import get_meal_state, require_meal_type
+from core.metrics import timed, stage_timer
+
+
+BOOKING_COLUMNS = ("student_id", "mess_id", "meal_type", "date", "status", "created_at")
+
+
+# ---------------------------------------------------------
+# THE STATEMENT
+# ---------------------------------------------------------
+
+def book_stmt(student_id: int, mess_id: int, meal_type: MealType, day, now: datetime):
+    """
+    Inserts the booking only if every rule holds; RETURNING the new
+    row, or nothing.
+    """
+
+    intents = MealIntent.__table__
+    students = Student.__table__
+    messes = Mess.__table__
+
+    booked = select(func.count()).select_from(intents).where(
+        intents.c.date == day,
+        intents.c.meal_type == meal_type,
+        intents.c.mess_id == messes.c.id,
+        intents.c.status == BookingStatus.booked
+    ).scalar_subquery()
+
+    source = select(
+        students.c.id,
+        messes.c.id,
+        literal(meal_type, intents.c.meal_type.type),
+        literal(day, intents.c.date.type),
+        literal(BookingStatus.booked, intents.c.status.type),
+        literal(now, intents.c.created_at.type)
+    ).select_from(
+        students.join(messes, true())
+    ).where(
+        students.c.id == student_id,
+        messes.c.id == mess_id,
+        students.c.year == messes.c.allowed_year,
+        booked < effective_capacity_expr(messes)
+    )
+
+    return sqlite_insert(intents).from_select(
+        BOOKING_COLUMNS, source
+    ).on_conflict_do_nothing().returning(
+        *intents.c
+    )
+
+
+def _current_meal(mess_id: int):
+    state = get_meal_state(mess_id)
+    return require_meal_type(state), state.day
+
+
+def _known_full(mess, mess_id: int, meal_type: MealType, day) -> bool:
+    if WEB_WORKERS > 1:
+        return False
+
+    return mess is not None and capacity_ledger.count(mess_id, day, meal_type) >= get_effective_capacity(mess)
+
+
+def _booked(row):
+    # Ledger / live counts follow the DB once the row is committed
+    capacity_ledger.reserve(row.mess_id, row.date, row.meal_type)
+    publish_count_delta(row.mess_id, row.date, row.meal_type, booked=1)
+    return row
+
+
+# ---------------------------------------------------------
+# BOOK
+# ---------------------------------------------------------
+
+@timed("booking_engine.book_meal")
+async def book_meal_async(db: AsyncSession, student_id: int, mess_id: int):
+
+    meal_type, today = _current_meal(mess_id)
+
+    if _known_full(await get_cached_async(db, Mess, mess_id), mess_id, meal_type, today):
+        await diagnose_booking_failure_async(db, student_id, mess_id, meal_type, today)
+
+    if db.in_transaction():
+        await db.rollback()
+
+    with stage_timer("booking_engine.book_meal.insert"):
+        row = (await db.execute(book_stmt(student_id, mess_id, meal_type, today, datetime.utcnow()))).first()
+        await db.commit()
+
+    if row is None:
+        await diagnose_booking_failure_async(db, student_id, mess_id, meal_type, today)
+
+    return _booked(row)
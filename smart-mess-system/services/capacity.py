@@ -1,50 +1,211 @@
 # services/capacity.py
 
+import threading
+from sqlalchemy import select, func, case, and_, cast, Integer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from typing import Optional
 
 from models import MealIntent, BookingStatus, Mess, MealType
 from config import ALLOW_BUFFER, BUFFER_PERCENTAGE
+from core.metrics import timed
 
 
 # ---------------------------------------------------------
-# GET TOTAL BOOKED COUNT
+# CAPACITY LEDGER (IN-MEMORY BOOKED SEAT COUNTS)
 # ---------------------------------------------------------
 
-def get_booked_count(
-    db: Session,
-    mess_id: int,
-    meal_type: MealType
-) -> int:
+class CapacityLedger:
+    """
+    Tracks 'booked' seats per (mess_id, date, meal_type).
+    Reserve/release are atomic, so two concurrent bookings
+    can never both take the last seat.
+    Rebuilt from the DB once at startup.
+    """
 
-    today = date.today()
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._booked = {}
+
+    def rebuild(self, db: Session):
+        """
+        Reloads booked counts for today and later from meal_intent.
+        """
+
+        rows = db.query(
+            MealIntent.mess_id,
+            MealIntent.date,
+            MealIntent.meal_type,
+            func.count(MealIntent.id)
+        ).filter(
+            MealIntent.date >= date.today(),
+            MealIntent.status == BookingStatus.booked
+        ).group_by(
+            MealIntent.mess_id,
+            MealIntent.date,
+            MealIntent.meal_type
+        ).all()
+
+        with self._lock:
+            self._booked = {
+                (mess_id, day, MealType(meal_type)): count
+                for mess_id, day, meal_type, count in rows
+            }
+
+    def count(self, mess_id: int, day: date, meal_type: MealType) -> int:
+        return self._booked.get((mess_id, day, MealType(meal_type)), 0)
+
+    def reserve(
+        self,
+        mess_id: int,
+        day: date,
+        meal_type: MealType,
+        capacity: Optional[int] = None
+    ) -> bool:
+        """
+        Takes one seat if fewer than `capacity` are booked.
+        No capacity means the seat is always taken (walk-ins).
+        """
+
+        key = (mess_id, day, MealType(meal_type))
+
+        with self._lock:
+            booked = self._booked.get(key, 0)
+            if capacity is not None and booked >= capacity:
+                return False
+            self._booked[key] = booked + 1
+            return True
+
+    def release(
+        self,
+        mess_id: int,
+        day: date,
+        meal_type: MealType,
+        count: int = 1
+    ):
+        key = (mess_id, day, MealType(meal_type))
+
+        with self._lock:
+            remaining = self._booked.get(key, 0) - count
+            if remaining > 0:
+                self._booked[key] = remaining
+            else:
+                self._booked.pop(key, None)
+
+    def release_meal(self, day: date, meal_type: MealType, mess_filter=None) -> dict:
+        """
+        Frees every seat for one meal on one day (window closed).
+        mess_filter(mess_id) -> bool limits which messes are freed.
+        Returns {mess_id: seats freed}.
+        """
+
+        meal_type = MealType(meal_type)
+
+        with self._lock:
+            keys = [
+                k for k in self._booked
+                if k[1] == day and k[2] == meal_type
+                and (mess_filter is None or mess_filter(k[0]))
+            ]
+            return {key[0]: self._booked.pop(key) for key in keys}
+
+    def prune(self, before: date):
+        """
+        Drops counters for days that are already over.
+        """
+
+        with self._lock:
+            for key in [k for k in self._booked if k[1] < before]:
+                del self._booked[key]
+
+
+capacity_ledger = CapacityLedger()
+
+
+@timed("capacity.rebuild_capacity_ledger")
+def rebuild_capacity_ledger():
+    """
+    Call once at startup, after the DB is initialized.
+    """
 
-    return db.query(MealIntent).filter(
-        MealIntent.mess_id == mess_id,
-        MealIntent.meal_type == meal_type,
-        MealIntent.date == today,
-        MealIntent.status == BookingStatus.booked
-    ).count()
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        capacity_ledger.rebuild(db)
+    finally:
+        db.close()
 
 
 # ---------------------------------------------------------
 # GET ATTENDED COUNT
 # ---------------------------------------------------------
 
+@timed("capacity.get_attended_count")
 def get_attended_count(
     db: Session,
     mess_id: int,
     meal_type: MealType
 ) -> int:
 
-    today = date.today()
-
-    return db.query(MealIntent).filter(
+    return db.scalar(select(func.count(MealIntent.id)).where(
         MealIntent.mess_id == mess_id,
         MealIntent.meal_type == meal_type,
-        MealIntent.date == today,
+        MealIntent.date == date.today(),
         MealIntent.status == BookingStatus.attended
-    ).count()
+    ))
+
+
+# ---------------------------------------------------------
+# BOOKED + ATTENDED PER MESS (SINGLE AGGREGATE QUERY)
+# ---------------------------------------------------------
+
+def _meal_counts_by_mess_stmt(meal_type: MealType):
+    """
+    One GROUP BY over today's meal_intent rows for this meal,
+    outer-joined to mess so empty messes still show up.
+    Rows: (id, name, max_capacity, booked, attended).
+    """
+
+    today = date.today()
+
+    booked = func.coalesce(func.sum(
+        case((MealIntent.status == BookingStatus.booked, 1), else_=0)
+    ), 0)
+    attended = func.coalesce(func.sum(
+        case((MealIntent.status == BookingStatus.attended, 1), else_=0)
+    ), 0)
+
+    return select(
+        Mess.id,
+        Mess.name,
+        Mess.max_capacity,
+        booked.label("booked"),
+        attended.label("attended")
+    ).outerjoin(
+        MealIntent,
+        and_(
+            MealIntent.mess_id == Mess.id,
+            MealIntent.date == today,
+            MealIntent.meal_type == meal_type
+        )
+    ).group_by(
+        Mess.id
+    ).order_by(
+        Mess.id
+    )
+
+
+@timed("capacity.get_meal_counts_by_mess")
+def get_meal_counts_by_mess(db: Session, meal_type: MealType) -> list:
+    return db.execute(_meal_counts_by_mess_stmt(meal_type)).all()
+
+
+@timed("capacity.get_meal_counts_by_mess")
+async def get_meal_counts_by_mess_async(db: AsyncSession, meal_type: MealType) -> list:
+    result = await db.execute(_meal_counts_by_mess_stmt(meal_type))
+    return result.all()
 
 
 # ---------------------------------------------------------
@@ -64,41 +225,25 @@ def get_effective_capacity(mess: Mess) -> int:
     return mess.max_capacity
 
 
-# ---------------------------------------------------------
-# GET REMAINING CAPACITY
-# ---------------------------------------------------------
-
-def get_remaining_capacity(
-    db: Session,
-    mess: Mess,
-    meal_type: MealType
-) -> int:
+def effective_capacity_expr(messes):
+    """
+    get_effective_capacity() as a SQL expression over the mess table.
+    """
 
-    booked = get_booked_count(db, mess.id, meal_type)
-    effective_capacity = get_effective_capacity(mess)
+    if ALLOW_BUFFER:
+        return messes.c.max_capacity + cast(messes.c.max_capacity * BUFFER_PERCENTAGE, Integer)
 
-    return effective_capacity - booked
+    return messes.c.max_capacity
 
 
 # ---------------------------------------------------------
-# ENFORCE CAPACITY LIMIT
+# CAPACITY REACHED (book_stmt INSERTED NOTHING)
 # ---------------------------------------------------------
 
-def enforce_capacity(
-    db: Session,
-    mess: Mess,
-    meal_type: MealType
-):
-    """
-    Raises exception if capacity reached.
-    """
-
-    remaining = get_remaining_capacity(db, mess, meal_type)
+def raise_capacity_reached():
+    from fastapi import HTTPException
 
-    if remaining <= 0:
-        from fastapi import HTTPException
-
-        raise HTTPException(
-            status_code=400,
-            detail="Mess capacity reached."
-        )
+    raise HTTPException(
+        status_code=400,
+        detail="Mess capacity reached."
+    )
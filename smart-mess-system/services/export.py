@@ -0,0 +1,145 @@
+# services/export.py
+#
+# Streaming exports of booking (meal_intent) and attendance
+# (diet_logs) history, hot and archived, as CSV or NDJSON.
+#
+# Rows are read per source table in keyset chunks of
+# EXPORT_CHUNK_ROWS, each in its own short read transaction
+# (streamed with yield_per), so memory stays flat and no
+# transaction stays open for the whole export.
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from enum import Enum
+
+from sqlalchemy import select, and_
+
+from database import AsyncSessionLocal
+from config import EXPORT_CHUNK_ROWS, EXPORT_BATCH_ROWS
+from services.archive import source_tables
+
+
+EXPORT_COLUMNS = {
+    "meal_intent": ("id", "student_id", "mess_id", "meal_type", "date", "status", "created_at"),
+    "diet_logs": ("id", "student_id", "mess_id", "meal_type", "timestamp"),
+}
+
+
+# ---------------------------------------------------------
+# FILTERS
+# ---------------------------------------------------------
+
+def _filters(table, start: date = None, end: date = None, mess_id: int = None, student_id: int = None):
+    """
+    start / end are inclusive days.
+    """
+
+    filters = []
+
+    if "date" in table.c:
+        if start:
+            filters.append(table.c.date >= start)
+        if end:
+            filters.append(table.c.date <= end)
+    else:
+        if start:
+            filters.append(table.c.timestamp >= datetime.combine(start, datetime.min.time()))
+        if end:
+            filters.append(table.c.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+    if mess_id is not None:
+        filters.append(table.c.mess_id == mess_id)
+    if student_id is not None:
+        filters.append(table.c.student_id == student_id)
+
+    return filters
+
+
+# ---------------------------------------------------------
+# ROW STREAM
+# ---------------------------------------------------------
+
+async def iter_export_rows(hot_name: str, **filters):
+    """
+    Yields lists of row tuples (at most EXPORT_BATCH_ROWS each)
+    in id order within each table, archive months first.
+    """
+
+    columns = EXPORT_COLUMNS[hot_name]
+
+    async with AsyncSessionLocal() as db:
+        tables = await db.run_sync(
+            lambda sync_db: source_tables(sync_db, hot_name, filters.get("start"), filters.get("end"))
+        )
+
+    for table in tables:
+        where = _filters(table, **filters)
+        last_id = 0
+
+        while True:
+            stmt = select(*[table.c[name] for name in columns]).where(
+                and_(table.c.id > last_id, *where)
+            ).order_by(
+                table.c.id
+            ).limit(
+                EXPORT_CHUNK_ROWS
+            ).execution_options(
+                yield_per=EXPORT_BATCH_ROWS
+            )
+
+            # One short read transaction per chunk
+            fetched = 0
+            async with AsyncSessionLocal() as db:
+                result = await db.stream(stmt)
+                async for batch in result.partitions():
+                    fetched += len(batch)
+                    last_id = batch[-1][0]
+                    yield batch
+
+            if fetched < EXPORT_CHUNK_ROWS:
+                break
+
+
+# ---------------------------------------------------------
+# FORMATS
+# ---------------------------------------------------------
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+async def stream_csv(hot_name: str, **filters):
+    columns = EXPORT_COLUMNS[hot_name]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    async for batch in iter_export_rows(hot_name, **filters):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+
+
+async def stream_ndjson(hot_name: str, **filters):
+    columns = EXPORT_COLUMNS[hot_name]
+
+    async for batch in iter_export_rows(hot_name, **filters):
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row)))) + "\n"
+            for row in batch
+        )
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
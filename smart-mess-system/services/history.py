@@ -0,0 +1,152 @@
+# services/history.py
+#
+# Per-student meal history with keyset (cursor) pagination on
+# (date, meal order), newest first. meal_type is stored as its name,
+# so meals are ordered by MEAL_ORDER (breakfast, lunch, dinner), not
+# alphabetically. Each page is one index range read on
+# ix_meal_intent_student_date_meal, so page N costs the same as
+# page 1. Archived months are read after the hot table runs out,
+# with the same cursor.
+
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, case, or_, null
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import MealIntent, DietLog, MealType
+from services.archive import source_tables
+from core.metrics import timed
+
+
+# ---------------------------------------------------------
+# CURSOR ("<date>_<meal>", e.g. "2026-09-03_lunch")
+# ---------------------------------------------------------
+
+def encode_cursor(day: date, meal_type: MealType) -> str:
+    return f"{day.isoformat()}_{MealType(meal_type).value}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        day, meal = cursor.split("_", 1)
+        return date.fromisoformat(day), MealType(meal)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+# ---------------------------------------------------------
+# ONE SOURCE (HOT TABLES OR ONE ARCHIVED MONTH)
+# ---------------------------------------------------------
+
+# Position of each meal within a day
+MEAL_ORDER = {meal: position for position, meal in enumerate(MealType)}
+
+
+def _meal_order(intents):
+    return case(
+        *((intents.c.meal_type == meal, position) for meal, position in MEAL_ORDER.items())
+    )
+
+
+def _page_stmt(intents, logs, student_id: int, after: Optional[tuple], limit: int):
+    """
+    Bookings older than `after`, each with the time it was attended
+    (the student's DietLog for that meal and day, if any).
+    """
+
+    if logs is not None:
+        attended_at = select(func.max(logs.c.timestamp)).where(
+            logs.c.student_id == intents.c.student_id,
+            logs.c.meal_type == intents.c.meal_type,
+            logs.c.timestamp >= intents.c.date,
+            logs.c.timestamp < func.date(intents.c.date, "+1 day")
+        ).scalar_subquery()
+    else:
+        attended_at = null()
+
+    stmt = select(
+        intents.c.id,
+        intents.c.date,
+        intents.c.meal_type,
+        intents.c.mess_id,
+        intents.c.status,
+        attended_at.label("attended_at")
+    ).where(
+        intents.c.student_id == student_id
+    )
+
+    meal_order = _meal_order(intents)
+
+    if after:
+        day, meal_type = after
+        # date <= day first, so the index range still applies
+        stmt = stmt.where(
+            intents.c.date <= day,
+            or_(intents.c.date < day, meal_order < MEAL_ORDER[meal_type])
+        )
+
+    return stmt.order_by(
+        intents.c.date.desc(),
+        meal_order.desc()
+    ).limit(limit)
+
+
+def _archived_sources(sync_db, before: Optional[date]) -> list:
+    """
+    (meal_intent month, diet_logs month or None) pairs, newest first,
+    for months on or before the cursor day.
+    """
+
+    logs_by_name = {t.name: t for t in source_tables(sync_db, "diet_logs")[:-1]}
+    months = source_tables(sync_db, "meal_intent", end=before)[:-1]
+
+    pairs = []
+    for intents in reversed(months):
+        suffix = intents.name[len("meal_intent"):]
+        pairs.append((intents, logs_by_name.get("diet_logs" + suffix)))
+
+    return pairs
+
+
+# ---------------------------------------------------------
+# HISTORY PAGE
+# ---------------------------------------------------------
+
+@timed("history.get_booking_history")
+async def get_booking_history(
+    db: AsyncSession,
+    student_id: int,
+    limit: int,
+    cursor: Optional[str] = None
+):
+    """
+    Returns (rows, next_cursor). next_cursor is None on the last page.
+    """
+
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = list(await db.execute(
+        _page_stmt(MealIntent.__table__, DietLog.__table__, student_id, after, limit)
+    ))
+
+    # Hot table exhausted: continue into archived months
+    if len(rows) < limit:
+        oldest = (rows[-1].date, rows[-1].meal_type) if rows else after
+        sources = await db.run_sync(
+            lambda sync_db: _archived_sources(sync_db, oldest[0] if oldest else None)
+        )
+
+        for intents, logs in sources:
+            rows += list(await db.execute(
+                _page_stmt(intents, logs, student_id, oldest, limit - len(rows))
+            ))
+            if len(rows) >= limit:
+                break
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].meal_type)
+
+    return rows, next_cursor
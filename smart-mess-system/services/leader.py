@@ -0,0 +1,189 @@
+# services/leader.py
+#
+# Scheduler leader election for uvicorn --workers N. Every worker
+# runs a LeaderElection thread that tries, every
+# LEADER_RENEW_SECONDS, to take or renew the "scheduler" row in
+# leader_leases with one conditional upsert:
+#
+#   INSERT ... ON CONFLICT(name) DO UPDATE ...
+#   WHERE holder = me OR expires_at < now
+#
+# Exactly one worker holds an unexpired lease and runs scheduler.py
+# jobs. If the leader dies (or stops renewing), its lease expires
+# after LEADER_LEASE_SECONDS and the next worker to try takes over,
+# running the no-show catch-up first. A clean shutdown gives the
+# lease up at once.
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import SessionLocal
+from models import LeaderLease
+from config import LEADER_LEASE_SECONDS, LEADER_RENEW_SECONDS
+
+
+SCHEDULER_ROLE = "scheduler"
+
+
+def worker_id() -> str:
+    """
+    host:pid plus a random suffix, so a recycled pid is a new holder.
+    """
+
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# ---------------------------------------------------------
+# LEASE STATEMENTS
+# ---------------------------------------------------------
+
+def _claim_stmt(role: str, holder: str, now: datetime):
+    """
+    Takes the role if free / expired, renews it if already ours.
+    RETURNING the holder only when the row was written.
+    """
+
+    table = LeaderLease.__table__
+    stmt = sqlite_insert(table).values(
+        name=role,
+        holder=holder,
+        expires_at=now + timedelta(seconds=LEADER_LEASE_SECONDS)
+    )
+
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"holder": stmt.excluded.holder, "expires_at": stmt.excluded.expires_at},
+        where=(table.c.holder == stmt.excluded.holder) | (table.c.expires_at < now)
+    ).returning(table.c.holder)
+
+
+def claim_lease(role: str, holder: str) -> bool:
+    """
+    True if `holder` owns `role` for the next LEADER_LEASE_SECONDS.
+    """
+
+    db = SessionLocal()
+    try:
+        owner = db.execute(_claim_stmt(role, holder, datetime.utcnow())).scalar()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return owner == holder
+
+
+def release_lease(role: str, holder: str):
+    """
+    Expires our lease now, so another worker can take over at once.
+    """
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(LeaderLease)
+            .where(LeaderLease.name == role, LeaderLease.holder == holder)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------
+# ELECTION LOOP (ONE THREAD PER WORKER)
+# ---------------------------------------------------------
+
+class LeaderElection:
+    """
+    Calls on_elected() when this worker becomes leader for `role`
+    and on_deposed() when it stops being leader (lease lost or
+    not renewed in time).
+    """
+
+    def __init__(self, role: str, on_elected: Callable, on_deposed: Callable):
+        self.role = role
+        self.holder = worker_id()
+        self.is_leader = False
+        self._on_elected = on_elected
+        self._on_deposed = on_deposed
+        self._valid_until = 0.0          # monotonic, end of our last renewed lease
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"leader-{self.role}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(LEADER_RENEW_SECONDS)
+
+    def tick(self):
+        """
+        One take-over / renew attempt.
+        """
+
+        started = time.monotonic()
+
+        try:
+            owned = claim_lease(self.role, self.holder)
+        except Exception as e:
+            print(f"Leader lease error ({self.role}):", e)
+            # DB busy: keep leading only while the last lease still holds
+            owned = self.is_leader and started < self._valid_until
+
+        else:
+            if owned:
+                self._valid_until = started + LEADER_LEASE_SECONDS
+
+        if owned and not self.is_leader:
+            self.is_leader = True
+            print(f"Worker {self.holder} is now {self.role} leader")
+            self._call(self._on_elected)
+
+        elif not owned and self.is_leader:
+            self.is_leader = False
+            print(f"Worker {self.holder} lost {self.role} leadership")
+            self._call(self._on_deposed)
+
+    def _call(self, callback: Callable):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Leader callback error ({self.role}):", e)
+
+    def stop(self):
+        """
+        Call on shutdown: stops the loop and hands the role over.
+        """
+
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+        if self.is_leader:
+            self.is_leader = False
+            self._call(self._on_deposed)
+            try:
+                release_lease(self.role, self.holder)
+            except Exception as e:
+                print(f"Leader lease release error ({self.role}):", e)
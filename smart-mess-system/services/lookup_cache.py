@@ -0,0 +1,222 @@
+# services/lookup_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Student, Mess
+from config import LOOKUP_CACHE_TTL_SECONDS, STUDENT_CACHE_SIZE, MESS_CACHE_SIZE
+from core.metrics import timed
+
+
+# ---------------------------------------------------------
+# CACHED ROWS (IMMUTABLE, SAFE TO SHARE ACROSS REQUESTS)
+# ---------------------------------------------------------
+
+@dataclass(frozen=True)
+class CachedStudent:
+    id: int
+    name: str
+    year: int
+    hostel: str
+
+
+@dataclass(frozen=True)
+class CachedMess:
+    id: int
+    name: str
+    allowed_year: int
+    max_capacity: int
+
+
+def _student_row(student: Student) -> CachedStudent:
+    return CachedStudent(student.id, student.name, student.year, student.hostel)
+
+
+def _mess_row(mess: Mess) -> CachedMess:
+    return CachedMess(mess.id, mess.name, mess.allowed_year, mess.max_capacity)
+
+
+# ---------------------------------------------------------
+# BOUNDED LRU + TTL CACHE
+# ---------------------------------------------------------
+
+class LookupCache:
+    """
+    Thread-safe LRU with a per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """
+        Drops one key, or everything when key is None.
+        """
+
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+student_cache = LookupCache("student", STUDENT_CACHE_SIZE, LOOKUP_CACHE_TTL_SECONDS)
+mess_cache = LookupCache("mess", MESS_CACHE_SIZE, LOOKUP_CACHE_TTL_SECONDS)
+
+
+# Model -> (cache, row snapshot)
+_CACHES = {
+    Student: (student_cache, _student_row),
+    Mess: (mess_cache, _mess_row),
+}
+
+
+# ---------------------------------------------------------
+# READ-THROUGH LOOKUPS
+# ---------------------------------------------------------
+
+@timed("lookup_cache.get_cached")
+def get_cached(db: Session, model, key: int):
+    """
+    Cached snapshot of Student/Mess `key`, loading it on a miss.
+    None if the row does not exist.
+    """
+
+    cache, to_row = _CACHES[model]
+    cached = cache.get(key)
+    if cached is None:
+        row = db.get(model, key)
+        if row:
+            cached = to_row(row)
+            cache.set(key, cached)
+    return cached
+
+
+@timed("lookup_cache.get_cached")
+async def get_cached_async(db: AsyncSession, model, key: int):
+    cache, to_row = _CACHES[model]
+    cached = cache.get(key)
+    if cached is None:
+        row = await db.get(model, key)
+        if row:
+            cached = to_row(row)
+            cache.set(key, cached)
+    return cached
+
+
+# ---------------------------------------------------------
+# BULK LOOKUPS (SCAN BATCHES): ONE IN-QUERY FOR MISSES ONLY
+# ---------------------------------------------------------
+
+def _split_hits(cache: LookupCache, keys: set):
+    found = {}
+    for key in keys:
+        cached = cache.get(key)
+        if cached is not None:
+            found[key] = cached
+    return found, keys - found.keys()
+
+
+def _store(cache: LookupCache, to_row, found: dict, rows):
+    for row in rows:
+        found[row.id] = to_row(row)
+        cache.set(row.id, found[row.id])
+    return found
+
+
+@timed("lookup_cache.get_many_cached")
+def get_many_cached(db: Session, model, keys: set) -> dict:
+    """
+    {id: snapshot} for the ids that exist.
+    """
+
+    cache, to_row = _CACHES[model]
+    found, missing = _split_hits(cache, keys)
+    if not missing:
+        return found
+    return _store(cache, to_row, found, db.scalars(select(model).where(model.id.in_(missing))))
+
+
+@timed("lookup_cache.get_many_cached")
+async def get_many_cached_async(db: AsyncSession, model, keys: set) -> dict:
+    cache, to_row = _CACHES[model]
+    found, missing = _split_hits(cache, keys)
+    if not missing:
+        return found
+    return _store(cache, to_row, found, await db.scalars(select(model).where(model.id.in_(missing))))
+
+
+# ---------------------------------------------------------
+# INVALIDATION
+# ---------------------------------------------------------
+
+def invalidate_student(student_id: Optional[int] = None):
+    """
+    Call after writes that bypass the ORM (bulk UPDATE/INSERT).
+    No id clears the whole student cache.
+    """
+
+    student_cache.invalidate(student_id)
+
+
+def invalidate_mess(mess_id: Optional[int] = None):
+    mess_cache.invalidate(mess_id)
+
+
+# ORM writes invalidate automatically
+@event.listens_for(Student, "after_update")
+@event.listens_for(Student, "after_delete")
+def _on_student_write(mapper, connection, target):
+    invalidate_student(target.id)
+
+
+@event.listens_for(Mess, "after_update")
+@event.listens_for(Mess, "after_delete")
+def _on_mess_write(mapper, connection, target):
+    invalidate_mess(target.id)
@@ -1,49 +1,76 @@
 # services/meal_logic.py
 
 from sqlalchemy.orm import Session
-from datetime import date, datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import Optional
 
 from models import MealIntent, DietLog, BookingStatus, MealType
+from services.capacity import capacity_ledger
+from services.student_stats import meal_stats_increment_stmt, meal_stats_increment_stmts
+from services.occupancy import publish_count_delta
+from services.scan_receipts import stage_receipt, remember_receipt
+from services.rollup import closed_meals_rollup_stmt
+from core.metrics import timed, stage_timer
+
+
+ATTENDANCE_MARKED = "Attendance marked successfully."
 
 
 # ---------------------------------------------------------
-# CREATE BOOKING RECORD
+# MARK ATTENDANCE (SCAN SUCCESS)
 # ---------------------------------------------------------
 
-def create_booking(
+@timed("meal_logic.mark_attendance")
+def mark_attendance(
     db: Session,
-    student_id: int,
-    mess_id: int,
-    meal_type: MealType
-) -> MealIntent:
-
-    today = date.today()
+    booking: MealIntent,
+    meal_type: MealType,
+    receipt_key: Optional[str] = None
+):
+    """
+    receipt_key: also store the response for /scan/entry retries
+    (services/scan_receipts.py), in the same commit.
+    """
 
-    new_booking = MealIntent(
-        student_id=student_id,
-        mess_id=mess_id,
-        meal_type=meal_type,
-        date=today,
-        status=BookingStatus.booked
-    )
+    was_booked, new_log = _stage_attendance(db, booking, meal_type, receipt_key)
 
-    db.add(new_booking)
-    db.commit()
-    db.refresh(new_booking)
+    with stage_timer("meal_logic.mark_attendance.commit"):
+        # Student summary counters, same transaction as the log
+        db.execute(meal_stats_increment_stmt(booking.student_id, meal_type, new_log.timestamp))
+        db.commit()
 
-    return new_booking
+    with stage_timer("meal_logic.mark_attendance.refresh"):
+        db.refresh(booking)
 
+    return _attendance_result(booking, meal_type, new_log, was_booked, receipt_key)
 
-# ---------------------------------------------------------
-# MARK ATTENDANCE (SCAN SUCCESS)
-# ---------------------------------------------------------
 
-def mark_attendance(
-    db: Session,
+@timed("meal_logic.mark_attendance")
+async def mark_attendance_async(
+    db: AsyncSession,
     booking: MealIntent,
-    meal_type: MealType
+    meal_type: MealType,
+    receipt_key: Optional[str] = None
 ):
 
+    was_booked, new_log = _stage_attendance(db, booking, meal_type, receipt_key)
+
+    with stage_timer("meal_logic.mark_attendance.commit"):
+        # Student summary counters, same transaction as the log
+        await db.execute(meal_stats_increment_stmt(booking.student_id, meal_type, new_log.timestamp))
+        await db.commit()
+
+    with stage_timer("meal_logic.mark_attendance.refresh"):
+        await db.refresh(booking)
+
+    return _attendance_result(booking, meal_type, new_log, was_booked, receipt_key)
+
+
+def _stage_attendance(db, booking: MealIntent, meal_type: MealType, receipt_key: Optional[str] = None):
+
+    was_booked = booking.status == BookingStatus.booked
+
     # Update booking status
     booking.status = BookingStatus.attended
 
@@ -56,43 +83,146 @@ def mark_attendance(
     )
 
     db.add(new_log)
-    db.commit()
-    db.refresh(booking)
 
-    return {
-        "message": "Attendance marked successfully.",
+    if receipt_key:
+        stage_receipt(db, receipt_key, booking, meal_type, new_log, ATTENDANCE_MARKED)
+
+    return was_booked, new_log
+
+
+def _attendance_result(
+    booking: MealIntent,
+    meal_type: MealType,
+    new_log: DietLog,
+    was_booked: bool,
+    receipt_key: Optional[str] = None
+):
+
+    # Seat no longer counts as 'booked'
+    if was_booked:
+        capacity_ledger.release(booking.mess_id, booking.date, meal_type)
+
+    publish_count_delta(
+        booking.mess_id,
+        booking.date,
+        meal_type,
+        booked=-1 if was_booked else 0,
+        attended=1
+    )
+
+    result = {
+        "message": ATTENDANCE_MARKED,
         "status": booking.status,
         "meal_type": meal_type,
         "timestamp": new_log.timestamp
     }
 
+    if receipt_key:
+        remember_receipt(receipt_key, booking, result)
+
+    return result
+
 
 # ---------------------------------------------------------
-# GET MESS BOOKING COUNT
+# MARK ATTENDANCE IN BULK (BUFFERED SCANS)
 # ---------------------------------------------------------
 
-def get_mess_booking_count(
-    db: Session,
-    mess_id: int,
-    meal_type: MealType
-) -> int:
+@timed("meal_logic.mark_attendance_batch")
+async def mark_attendance_batch_async(db: AsyncSession, accepted: list) -> list:
+    """
+    accepted: (booking, meal_type, scanned_at) from validate_scan_batch_async.
+    Writes every DietLog and status change in one transaction.
+    """
+
+    changes, logs, results = _stage_attendance_batch(db, accepted)
+
+    try:
+        for stmt in meal_stats_increment_stmts(logs):
+            await db.execute(stmt)
+        rollup = _closed_meals_rollup(changes)
+        if rollup is not None:
+            await db.flush()  # Status changes and walk-ins first
+            await db.execute(rollup)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    _apply_batch_changes(changes)
+
+    return results
+
+
+def _stage_attendance_batch(db, accepted: list):
+
+    changes = []
+    logs = []
+    results = []
+
+    for booking, meal_type, scanned_at in accepted:
+
+        # Only persisted 'booked' rows hold a ledger seat;
+        # walk-ins created by the batch have no id yet
+        was_booked = booking.id is not None and booking.status == BookingStatus.booked
+        changes.append((booking, was_booked))
+
+        booking.status = BookingStatus.attended
+
+        new_log = DietLog(
+            student_id=booking.student_id,
+            mess_id=booking.mess_id,
+            meal_type=meal_type,
+            timestamp=scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+        )
+        db.add(new_log)
+        logs.append(new_log)
+
+        results.append({
+            "message": ATTENDANCE_MARKED,
+            "status": BookingStatus.attended,
+            "meal_type": meal_type,
+            "timestamp": new_log.timestamp
+        })
+
+    return changes, logs, results
+
+
+def _closed_meals_rollup(changes: list):
+    # Old scanned_at: the meal may already be swept and rolled up
+    return closed_meals_rollup_stmt(
+        (booking.date, booking.mess_id, booking.meal_type) for booking, _ in changes
+    )
+
+
+def _apply_batch_changes(changes: list):
+    """
+    After commit: free ledger seats and push count deltas.
+    """
 
-    today = date.today()
+    for booking, was_booked in changes:
+        if was_booked:
+            capacity_ledger.release(booking.mess_id, booking.date, booking.meal_type)
 
-    return db.query(MealIntent).filter(
-        MealIntent.mess_id == mess_id,
-        MealIntent.meal_type == meal_type,
-        MealIntent.date == today,
-        MealIntent.status == BookingStatus.booked
-    ).count()
+        publish_count_delta(
+            booking.mess_id,
+            booking.date,
+            booking.meal_type,
+            booked=-1 if was_booked else 0,
+            attended=1
+        )
 
 
 # ---------------------------------------------------------
 # MARK NO-SHOW MANUALLY (Optional Utility)
 # ---------------------------------------------------------
 
+@timed("meal_logic.mark_no_show")
 def mark_no_show(db: Session, booking: MealIntent):
+    was_booked = booking.status == BookingStatus.booked
     booking.status = BookingStatus.no_show
     db.commit()
     db.refresh(booking)
+    if was_booked:
+        capacity_ledger.release(booking.mess_id, booking.date, booking.meal_type)
+        publish_count_delta(booking.mess_id, booking.date, booking.meal_type, booked=-1)
     return booking
@@ -0,0 +1,106 @@
+# services/occupancy.py
+
+import asyncio
+import threading
+from datetime import date
+
+from models import MealType
+from config import STREAM_QUEUE_SIZE
+from core.metrics import timed
+
+
+# ---------------------------------------------------------
+# OCCUPANCY BROADCASTER (IN-PROCESS FAN-OUT)
+# ---------------------------------------------------------
+
+class OccupancyBroadcaster:
+    """
+    Fans out per-mess count deltas to every /dashboard/stream client.
+    publish() is safe from request handlers and the scheduler thread;
+    each subscriber gets events on its own event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Call from the subscriber's event loop.
+        """
+
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Loop already closed; client is gone
+                self.unsubscribe(queue)
+
+
+# Queued instead of the deltas a slow client missed; the stream
+# answers it with a fresh snapshot
+RESYNC = {"resync": True}
+
+
+def _offer(queue: asyncio.Queue, event: dict):
+    """
+    Deltas are additive, so a slow client can't just skip one:
+    when its queue is full the backlog is dropped for RESYNC.
+    """
+
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+        return
+
+    queue.put_nowait(event)
+
+
+occupancy_broadcaster = OccupancyBroadcaster()
+
+
+# ---------------------------------------------------------
+# PUBLISH COUNT CHANGES
+# ---------------------------------------------------------
+
+@timed("occupancy.publish_count_delta")
+def publish_count_delta(
+    mess_id: int,
+    day: date,
+    meal_type: MealType,
+    booked: int = 0,
+    attended: int = 0
+):
+    """
+    Remaining capacity moves opposite to booked.
+    """
+
+    if not occupancy_broadcaster.subscriber_count:
+        return
+
+    occupancy_broadcaster.publish({
+        "mess_id": mess_id,
+        "date": day.isoformat(),
+        "meal_type": MealType(meal_type).value,
+        "booked": booked,
+        "attended": attended,
+        "remaining_capacity": -booked,
+    })
@@ -0,0 +1,286 @@
+# services/rollup.py
+#
+# meal_rollup: final booked / attended / no_show / walk-in counts
+# per (date, mess, meal). Written by the no-show sweep in the same
+# transaction that closes the window (scheduler.py), and rewritten by
+# any later write to a closed meal, so trend queries read one row
+# per mess per meal instead of every intent.
+#
+# One-off maintenance, run from smart-mess-system/:
+#   python -m services.rollup backfill
+#   python -m services.rollup check
+
+import sys
+import time
+from datetime import date, datetime
+
+from sqlalchemy import select, func, case, literal, Date, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import MealIntent, MealRollup, Mess, BookingStatus, MealType
+from services.archive import meal_intent_source
+from core.metrics import timed
+from core.schedule import has_window_ended
+from core.time_utils import get_current_datetime
+
+
+ROLLUP_COUNTS = ("booked", "attended", "no_show", "walk_in")
+
+
+# ---------------------------------------------------------
+# BUILD ROLLUPS FROM MEAL_INTENT
+# ---------------------------------------------------------
+
+def _counts_stmt(source, *criteria):
+    """
+    (date, mess_id, meal_type, booked, attended, no_show, walk_in)
+    per group of `source` rows (MealIntent columns).
+    """
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    return select(
+        source.c.date,
+        source.c.mess_id,
+        source.c.meal_type,
+        count_if(source.c.walk_in == False),  # noqa: E712
+        count_if(source.c.status == BookingStatus.attended),
+        count_if(source.c.status == BookingStatus.no_show),
+        count_if(source.c.walk_in == True),  # noqa: E712
+        literal(datetime.utcnow(), MealRollup.finalized_at.type)
+    ).where(
+        *criteria
+    ).group_by(
+        source.c.date,
+        source.c.mess_id,
+        source.c.meal_type
+    )
+
+
+def rollup_stmt(*criteria, source=None):
+    """
+    Upserts meal_rollup for every (date, mess, meal) matching
+    `criteria` (MealIntent columns, or `source`'s). Run it in the
+    transaction that closes those meals.
+    """
+
+    source = MealIntent.__table__ if source is None else source
+    table = MealRollup.__table__
+
+    stmt = sqlite_insert(table).from_select(
+        ["date", "mess_id", "meal_type", *ROLLUP_COUNTS, "finalized_at"],
+        _counts_stmt(source, *criteria)
+    )
+
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.date, table.c.mess_id, table.c.meal_type],
+        set_={
+            **{name: stmt.excluded[name] for name in ROLLUP_COUNTS},
+            "finalized_at": stmt.excluded.finalized_at,
+        }
+    )
+
+
+def closed_meals_rollup_stmt(keys):
+    """
+    Re-rolls the (date, mess_id, meal_type) `keys` whose window has
+    already closed, for writes that land after the no-show sweep
+    (late /scan/entries batches, write-behind flushes). None if every
+    meal is still open. Run it in the same transaction as the write.
+    """
+
+    now = get_current_datetime()
+
+    closed = [
+        and_(MealIntent.date == day, MealIntent.mess_id == mess_id, MealIntent.meal_type == meal_type)
+        for day, mess_id, meal_type in set(keys)
+        if day < now.date() or (day == now.date() and has_window_ended(meal_type, now, mess_id))
+    ]
+
+    return rollup_stmt(or_(*closed)) if closed else None
+
+
+@timed("rollup.backfill_meal_rollups")
+def backfill_meal_rollups(db: Session, before: date = None) -> int:
+    """
+    Rolls up every day before `before` (default today), hot and
+    archived, in one transaction. Returns rows written.
+    """
+
+    source = meal_intent_source(db)
+    before = before or date.today()
+
+    try:
+        rows = db.execute(rollup_stmt(source.c.date < before, source=source)).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return rows
+
+
+# ---------------------------------------------------------
+# TREND QUERIES (READ ROLLUPS ONLY)
+# ---------------------------------------------------------
+
+def _period(bucket: str):
+    """
+    First day of the bucket containing meal_rollup.date.
+    """
+
+    if bucket == "day":
+        return MealRollup.date
+    if bucket == "week":
+        return func.date(MealRollup.date, "weekday 0", "-6 days", type_=Date)  # Monday
+    if bucket == "month":
+        return func.date(MealRollup.date, "start of month", type_=Date)
+
+    raise ValueError(f"Unknown trend bucket: {bucket}")
+
+
+def _totals():
+    return [func.sum(getattr(MealRollup, name)).label(name) for name in ROLLUP_COUNTS]
+
+
+def _range_filter(start: date, end: date, mess_id: int = None, meal_type: MealType = None):
+    criteria = [MealRollup.date.between(start, end)]
+
+    if mess_id is not None:
+        criteria.append(MealRollup.mess_id == mess_id)
+    if meal_type is not None:
+        criteria.append(MealRollup.meal_type == meal_type)
+
+    return and_(*criteria)
+
+
+def _trend_stmt(start: date, end: date, bucket: str, mess_id: int = None, meal_type: MealType = None):
+    period = _period(bucket).label("period")
+
+    return select(
+        period, *_totals()
+    ).where(
+        _range_filter(start, end, mess_id, meal_type)
+    ).group_by(
+        period
+    ).order_by(
+        period
+    )
+
+
+def _mess_totals_stmt(start: date, end: date, meal_type: MealType = None):
+    return select(
+        Mess.id.label("mess_id"), Mess.name.label("mess_name"), *_totals()
+    ).join(
+        MealRollup, MealRollup.mess_id == Mess.id
+    ).where(
+        _range_filter(start, end, meal_type=meal_type)
+    ).group_by(
+        Mess.id
+    ).order_by(
+        Mess.id
+    )
+
+
+@timed("rollup.get_trend")
+async def get_trend_async(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    bucket: str = "day",
+    mess_id: int = None,
+    meal_type: MealType = None
+) -> list:
+    """
+    Rows (period, booked, attended, no_show, walk_in), one per
+    bucket with data, oldest first.
+    """
+
+    result = await db.execute(_trend_stmt(start, end, bucket, mess_id, meal_type))
+    return result.all()
+
+
+@timed("rollup.get_mess_totals")
+async def get_mess_totals_async(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    meal_type: MealType = None
+) -> list:
+    """
+    Rows (mess_id, mess_name, booked, attended, no_show, walk_in)
+    per mess over the whole range.
+    """
+
+    result = await db.execute(_mess_totals_stmt(start, end, meal_type))
+    return result.all()
+
+
+# ---------------------------------------------------------
+# CONSISTENCY CHECK
+# ---------------------------------------------------------
+
+@timed("rollup.check_meal_rollups")
+def check_meal_rollups(db: Session, before: date = None) -> list:
+    """
+    Compares meal_rollup with a fresh count over meal_intent (hot
+    and archived) for days before `before`.
+    Returns (date, mess_id, meal_type, expected, actual) per mismatch.
+    """
+
+    source = meal_intent_source(db)
+    before = before or date.today()
+
+    expected = {
+        tuple(row[:3]): tuple(row[3:7])
+        for row in db.execute(_counts_stmt(source, source.c.date < before))
+    }
+    actual = {
+        (row.date, row.mess_id, row.meal_type): tuple(getattr(row, name) for name in ROLLUP_COUNTS)
+        for row in db.scalars(select(MealRollup).where(MealRollup.date < before))
+    }
+
+    return [
+        (*key, expected.get(key), actual.get(key))
+        for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1], k[2].value))
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+def main(argv: list):
+    from database import SessionLocal, init_db
+
+    command = argv[1] if len(argv) > 1 else ""
+    if command not in ("backfill", "check"):
+        print("Usage: python -m services.rollup backfill|check")
+        return 2
+
+    init_db()
+    db = SessionLocal()
+
+    try:
+        if command == "backfill":
+            start = time.perf_counter()
+            rows = backfill_meal_rollups(db)
+            print(f"{rows} rollup rows written in {time.perf_counter() - start:.1f} s")
+            return 0
+
+        mismatches = check_meal_rollups(db)
+        for day, mess_id, meal_type, expected, actual in mismatches[:20]:
+            print(f"{day} mess {mess_id} {meal_type.value}: expected {expected}, stored {actual}")
+        print(f"{len(mismatches)} mismatched rollup rows")
+        return 1 if mismatches else 0
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
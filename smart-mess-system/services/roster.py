@@ -0,0 +1,199 @@
+# services/roster.py
+#
+# Semester roster import: a CSV of students (id, name, year, hostel)
+# upserted into `students` in chunks of ROSTER_CHUNK_ROWS, one
+# transaction and one executemany INSERT ... ON CONFLICT per chunk.
+# Rows that already match the table are skipped, and updated
+# students are dropped from the lookup cache.
+#
+# From smart-mess-system/:
+#   python -m services.roster roster.csv
+# or POST the file body to /admin/roster.
+
+import csv
+import sys
+import time
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import Student
+from config import ROSTER_CHUNK_ROWS, ROSTER_MAX_ERRORS
+from services.lookup_cache import invalidate_student
+from core.metrics import timed
+
+
+ROSTER_COLUMNS = ("id", "name", "year", "hostel")
+
+
+# ---------------------------------------------------------
+# PARSE ONE ROW
+# ---------------------------------------------------------
+
+def parse_roster_row(row: dict) -> dict:
+    """
+    Clean Student values from one CSV row. Raises ValueError.
+    """
+
+    try:
+        student_id = int(row["id"])
+        year = int(row["year"])
+    except (TypeError, ValueError):
+        raise ValueError("id and year must be integers")
+
+    name = (row["name"] or "").strip()
+    hostel = (row["hostel"] or "").strip()
+
+    if student_id <= 0 or year <= 0:
+        raise ValueError("id and year must be positive")
+    if not name or not hostel:
+        raise ValueError("name and hostel are required")
+
+    return {"id": student_id, "name": name, "year": year, "hostel": hostel}
+
+
+# ---------------------------------------------------------
+# UPSERT ONE CHUNK
+# ---------------------------------------------------------
+
+def _upsert_stmt():
+    table = Student.__table__
+    stmt = sqlite_insert(table)
+
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={
+            "name": stmt.excluded.name,
+            "year": stmt.excluded.year,
+            "hostel": stmt.excluded.hostel,
+        }
+    )
+
+
+def _upsert_chunk(db: Session, rows: list, report: dict):
+    """
+    Writes the new / changed rows of one chunk in one transaction.
+    """
+
+    table = Student.__table__
+    ids = {row["id"] for row in rows}
+
+    current = {
+        r.id: (r.name, r.year, r.hostel)
+        for r in db.execute(
+            select(table.c.id, table.c.name, table.c.year, table.c.hostel).where(table.c.id.in_(ids))
+        )
+    }
+
+    changed = []
+    updated_ids = set()
+
+    for row in rows:
+        values = (row["name"], row["year"], row["hostel"])
+        existing = current.get(row["id"])
+
+        if existing == values:
+            report["unchanged"] += 1
+            continue
+
+        if existing is None:
+            report["inserted"] += 1
+        else:
+            report["updated"] += 1
+            updated_ids.add(row["id"])
+
+        current[row["id"]] = values
+        changed.append(row)
+
+    if not changed:
+        return
+
+    try:
+        db.execute(_upsert_stmt(), changed)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for student_id in updated_ids:
+        invalidate_student(student_id)
+
+
+# ---------------------------------------------------------
+# IMPORT
+# ---------------------------------------------------------
+
+@timed("roster.import_roster")
+def import_roster(db: Session, lines) -> dict:
+    """
+    lines: any iterable of CSV text lines (an open file works).
+    Returns {"inserted", "updated", "unchanged", "rejected", "errors"};
+    errors lists the first ROSTER_MAX_ERRORS rejected rows.
+    Raises ValueError if the header is missing a column.
+    """
+
+    reader = csv.DictReader(lines)
+    missing = [col for col in ROSTER_COLUMNS if col not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Roster CSV is missing columns: {', '.join(missing)}")
+
+    report = {"inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "errors": []}
+    chunk = []
+
+    for row in reader:
+        try:
+            chunk.append(parse_roster_row(row))
+        except ValueError as e:
+            report["rejected"] += 1
+            if len(report["errors"]) < ROSTER_MAX_ERRORS:
+                report["errors"].append({"line": reader.line_num, "error": str(e)})
+            continue
+
+        if len(chunk) >= ROSTER_CHUNK_ROWS:
+            _upsert_chunk(db, chunk, report)
+            chunk = []
+
+    if chunk:
+        _upsert_chunk(db, chunk, report)
+
+    return report
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+def main(argv: list):
+    from database import SessionLocal, init_db
+
+    if len(argv) != 2:
+        print("Usage: python -m services.roster <roster.csv>")
+        return 2
+
+    init_db()
+    db = SessionLocal()
+
+    try:
+        start = time.perf_counter()
+        with open(argv[1], newline="", encoding="utf-8-sig") as f:
+            report = import_roster(db, f)
+        elapsed = time.perf_counter() - start
+
+    except (OSError, ValueError) as e:
+        print("Roster import failed:", e)
+        return 1
+
+    finally:
+        db.close()
+
+    print(f"{report['inserted']} inserted, {report['updated']} updated, "
+          f"{report['unchanged']} unchanged, {report['rejected']} rejected in {elapsed:.1f} s")
+    for error in report["errors"]:
+        print(f"  line {error['line']}: {error['error']}")
+
+    return 0 if not report["rejected"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,160 @@
+# services/scan_receipts.py
+#
+# Replay cache for /scan/entry. A successful scan stores its
+# ScanResponse under an idempotency key, in the same transaction
+# as the DietLog. A retry with the same key (turnstile timeout)
+# gets that response back from memory, or from scan_receipts after
+# a restart / on another worker, without validation or writes.
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ScanReceipt, MealIntent, DietLog, MealType
+from config import SCAN_RECEIPT_TTL_SECONDS, SCAN_RECEIPT_CACHE_SIZE, SCAN_RETRY_WINDOW_SECONDS
+from services.lookup_cache import LookupCache
+from core.time_utils import get_meal_state, require_meal_type
+from core.metrics import timed
+
+
+@dataclass(frozen=True)
+class CachedReceipt:
+    student_id: int
+    mess_id: int
+    response: dict
+
+
+scan_receipt_cache = LookupCache("scan_receipt", SCAN_RECEIPT_CACHE_SIZE, SCAN_RECEIPT_TTL_SECONDS)
+
+
+# ---------------------------------------------------------
+# KEYS
+# ---------------------------------------------------------
+
+def scan_receipt_key(student_id: int, mess_id: int, idempotency_key: Optional[str] = None) -> Optional[str]:
+    """
+    The client's key if sent, else one scan per (student, mess,
+    day, meal). None outside any meal (nothing to replay).
+    Derived keys only replay within SCAN_RETRY_WINDOW_SECONDS, so a
+    deliberate second scan later still gets "Already marked".
+    """
+
+    if idempotency_key:
+        return f"key:{idempotency_key}"
+
+    try:
+        state = get_meal_state(mess_id)
+        meal_type = require_meal_type(state)
+    except ValueError:
+        return None
+
+    return f"scan:{student_id}:{mess_id}:{state.day.isoformat()}:{meal_type.value}"
+
+
+# ---------------------------------------------------------
+# REPLAY
+# ---------------------------------------------------------
+
+def _receipt_row(receipt: ScanReceipt) -> CachedReceipt:
+    return CachedReceipt(receipt.student_id, receipt.mess_id, {
+        "message": receipt.message,
+        "status": receipt.status,
+        "meal_type": receipt.meal_type,
+        "timestamp": receipt.timestamp,
+    })
+
+
+def _replay(key: str, cached: Optional[CachedReceipt], student_id: int, mess_id: int) -> Optional[dict]:
+    if cached is None:
+        return None
+
+    if key.startswith("scan:"):
+        retry_since = datetime.utcnow() - timedelta(seconds=SCAN_RETRY_WINDOW_SECONDS)
+        if cached.response["timestamp"] < retry_since:
+            return None
+
+    if (cached.student_id, cached.mess_id) != (student_id, mess_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Idempotency key already used for a different scan."
+        )
+
+    return cached.response
+
+
+def _expired(receipt: ScanReceipt) -> bool:
+    return receipt.created_at < datetime.utcnow() - timedelta(seconds=SCAN_RECEIPT_TTL_SECONDS)
+
+
+@timed("scan_receipts.find_receipt")
+async def find_receipt_async(db: AsyncSession, key: str, student_id: int, mess_id: int) -> Optional[dict]:
+    """
+    The original ScanResponse for `key`, or None if it hasn't been
+    seen within SCAN_RECEIPT_TTL_SECONDS. 409 if the key belongs to
+    another student / mess.
+    """
+
+    cached = scan_receipt_cache.get(key)
+
+    if cached is None:
+        receipt = await db.get(ScanReceipt, key)
+        if receipt and not _expired(receipt):
+            cached = _receipt_row(receipt)
+            scan_receipt_cache.set(key, cached)
+
+    return _replay(key, cached, student_id, mess_id)
+
+
+# ---------------------------------------------------------
+# RECORD (SAME TRANSACTION AS THE ATTENDANCE)
+# ---------------------------------------------------------
+
+def stage_receipt(db, key: str, booking: MealIntent, meal_type: MealType, log: DietLog, message: str):
+    """
+    Adds the receipt to the session; the caller commits it with the log.
+    """
+
+    db.add(ScanReceipt(
+        key=key,
+        student_id=booking.student_id,
+        mess_id=booking.mess_id,
+        message=message,
+        status=booking.status,
+        meal_type=meal_type,
+        timestamp=log.timestamp
+    ))
+
+
+def remember_receipt(key: str, booking: MealIntent, response: dict):
+    """
+    Call after the commit, so memory never holds an unwritten receipt.
+    """
+
+    scan_receipt_cache.set(key, CachedReceipt(booking.student_id, booking.mess_id, dict(response)))
+
+
+# ---------------------------------------------------------
+# PRUNE (SCHEDULER)
+# ---------------------------------------------------------
+
+@timed("scan_receipts.prune_scan_receipts")
+def prune_scan_receipts(db: Session) -> int:
+    """
+    Deletes receipts past the TTL. Returns rows deleted.
+    """
+
+    cutoff = datetime.utcnow() - timedelta(seconds=SCAN_RECEIPT_TTL_SECONDS)
+
+    try:
+        deleted = db.execute(delete(ScanReceipt).where(ScanReceipt.created_at < cutoff)).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return deleted
@@ -0,0 +1,212 @@
+# services/student_stats.py
+#
+# Running per-student meal counters (student_meal_stats),
+# so the student summary is one primary-key lookup.
+#
+# One-off maintenance, run from smart-mess-system/:
+#   python -m services.student_stats backfill
+#   python -m services.student_stats check
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import DietLog, StudentMealStats, MealType
+from core.metrics import timed
+from services.archive import diet_logs_source
+
+
+MEAL_COUNT_COLUMNS = {
+    MealType.breakfast: "breakfast_count",
+    MealType.lunch: "lunch_count",
+    MealType.dinner: "dinner_count",
+}
+
+
+# ---------------------------------------------------------
+# INCREMENT (SAME TRANSACTION AS THE DIET LOG)
+# ---------------------------------------------------------
+
+def meal_stats_increment_stmt(
+    student_id: int,
+    meal_type: MealType,
+    meal_at: datetime,
+    count: int = 1
+):
+    """
+    Upsert that adds `count` meals of this type for the student.
+    Execute it in the session that inserts the DietLog rows.
+    """
+
+    table = StudentMealStats.__table__
+    meal_column = MEAL_COUNT_COLUMNS[MealType(meal_type)]
+
+    values = {
+        "student_id": student_id,
+        "total_meals": count,
+        "breakfast_count": 0,
+        "lunch_count": 0,
+        "dinner_count": 0,
+        "last_meal_at": meal_at,
+    }
+    values[meal_column] = count
+
+    stmt = sqlite_insert(table).values(**values)
+
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.student_id],
+        set_={
+            "total_meals": table.c.total_meals + count,
+            meal_column: table.c[meal_column] + count,
+            "last_meal_at": func.max(
+                func.coalesce(table.c.last_meal_at, stmt.excluded.last_meal_at),
+                stmt.excluded.last_meal_at
+            ),
+        }
+    )
+
+
+def meal_stats_increment_stmts(logs: list) -> list:
+    """
+    One upsert per (student, meal type) for a batch of DietLog rows.
+    """
+
+    grouped = {}
+    for log in logs:
+        key = (log.student_id, MealType(log.meal_type))
+        count, latest = grouped.get(key, (0, log.timestamp))
+        grouped[key] = (count + 1, max(latest, log.timestamp))
+
+    return [
+        meal_stats_increment_stmt(student_id, meal_type, latest, count)
+        for (student_id, meal_type), (count, latest) in grouped.items()
+    ]
+
+
+# ---------------------------------------------------------
+# AGGREGATE FROM DIET LOGS (SOURCE OF TRUTH)
+# ---------------------------------------------------------
+
+def _diet_log_totals_stmt(logs=None):
+    """
+    Per-student totals over `logs` (default: hot diet_logs only;
+    pass diet_logs_source(db) to include archived months).
+    """
+
+    logs = DietLog.__table__ if logs is None else logs
+
+    def meal_sum(meal_type: MealType):
+        return func.sum(case((logs.c.meal_type == meal_type, 1), else_=0))
+
+    return select(
+        logs.c.student_id,
+        func.count(logs.c.id).label("total_meals"),
+        meal_sum(MealType.breakfast).label("breakfast_count"),
+        meal_sum(MealType.lunch).label("lunch_count"),
+        meal_sum(MealType.dinner).label("dinner_count"),
+        func.max(logs.c.timestamp).label("last_meal_at")
+    ).group_by(
+        logs.c.student_id
+    )
+
+
+# ---------------------------------------------------------
+# BACKFILL
+# ---------------------------------------------------------
+
+@timed("student_stats.backfill_student_meal_stats")
+def backfill_student_meal_stats(db: Session) -> int:
+    """
+    Rebuilds student_meal_stats from diet_logs (hot and archived)
+    in one transaction.
+    Returns the number of students written.
+    """
+
+    db.execute(delete(StudentMealStats))
+    result = db.execute(
+        insert(StudentMealStats).from_select(
+            [
+                "student_id",
+                "total_meals",
+                "breakfast_count",
+                "lunch_count",
+                "dinner_count",
+                "last_meal_at",
+            ],
+            _diet_log_totals_stmt(diet_logs_source(db))
+        )
+    )
+    db.commit()
+
+    return result.rowcount
+
+
+# ---------------------------------------------------------
+# CONSISTENCY CHECK
+# ---------------------------------------------------------
+
+@timed("student_stats.check_student_meal_stats")
+def check_student_meal_stats(db: Session) -> list:
+    """
+    Compares the counters with diet_logs.
+    Returns (student_id, expected, actual) for every mismatch.
+    """
+
+    fields = ("total_meals", "breakfast_count", "lunch_count", "dinner_count")
+
+    expected = {
+        row.student_id: tuple(getattr(row, f) for f in fields)
+        for row in db.execute(_diet_log_totals_stmt(diet_logs_source(db)))
+    }
+    actual = {
+        row.student_id: tuple(getattr(row, f) for f in fields)
+        for row in db.scalars(select(StudentMealStats))
+    }
+
+    empty = (0, 0, 0, 0)
+    mismatches = []
+    for student_id in sorted(expected.keys() | actual.keys()):
+        want = expected.get(student_id, empty)
+        got = actual.get(student_id, empty)
+        if want != got:
+            mismatches.append((student_id, dict(zip(fields, want)), dict(zip(fields, got))))
+
+    return mismatches
+
+
+# ---------------------------------------------------------
+# CLI
+# ---------------------------------------------------------
+
+def main(argv: list):
+    from database import SessionLocal, init_db
+
+    command = argv[1] if len(argv) > 1 else ""
+    if command not in ("backfill", "check"):
+        print("Usage: python -m services.student_stats backfill|check")
+        return 2
+
+    init_db()
+    db = SessionLocal()
+
+    try:
+        if command == "backfill":
+            written = backfill_student_meal_stats(db)
+            print(f"Backfilled stats for {written} students.")
+            return 0
+
+        mismatches = check_student_meal_stats(db)
+        for student_id, want, got in mismatches:
+            print(f"Student {student_id}: expected {want}, found {got}")
+        print(f"{len(mismatches)} mismatched student(s).")
+        return 1 if mismatches else 0
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,15 +1,28 @@
 # services/validation.py
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
 from models import Student, Mess, MealIntent, BookingStatus, MealType
-from services.capacity import enforce_capacity
+from services.capacity import capacity_ledger, raise_capacity_reached
+from services.occupancy import publish_count_delta
+from core.metrics import timed, stage_timer
+from services.lookup_cache import (
+    CachedStudent,
+    CachedMess,
+    get_cached,
+    get_cached_async,
+    get_many_cached,
+    get_many_cached_async
+)
 from core.time_utils import (
-    get_current_meal_type,
-    is_before_cutoff,
-    is_within_meal_window,
-    get_today_date
+    get_meal_state,
+    require_meal_type,
+    get_meal_type_at,
+    get_current_datetime,
+    to_local_datetime
 )
 
 
@@ -17,8 +30,19 @@ from core.time_utils import (
 # VALIDATE STUDENT
 # ---------------------------------------------------------
 
-def validate_student(db: Session, student_id: int) -> Student:
-    student = db.query(Student).filter(Student.id == student_id).first()
+# Student / Mess rows come from the lookup cache (no query when warm)
+
+@timed("validation.validate_student")
+def validate_student(db: Session, student_id: int) -> CachedStudent:
+    student = get_cached(db, Student, student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+
+@timed("validation.validate_student")
+async def validate_student_async(db: AsyncSession, student_id: int) -> CachedStudent:
+    student = await get_cached_async(db, Student, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     return student
@@ -28,8 +52,17 @@ def validate_student(db: Session, student_id: int) -> Student:
 # VALIDATE MESS
 # ---------------------------------------------------------
 
-def validate_mess(db: Session, mess_id: int) -> Mess:
-    mess = db.query(Mess).filter(Mess.id == mess_id).first()
+@timed("validation.validate_mess")
+def validate_mess(db: Session, mess_id: int) -> CachedMess:
+    mess = get_cached(db, Mess, mess_id)
+    if not mess:
+        raise HTTPException(status_code=404, detail="Mess not found")
+    return mess
+
+
+@timed("validation.validate_mess")
+async def validate_mess_async(db: AsyncSession, mess_id: int) -> CachedMess:
+    mess = await get_cached_async(db, Mess, mess_id)
     if not mess:
         raise HTTPException(status_code=404, detail="Mess not found")
     return mess
@@ -39,7 +72,7 @@ def validate_mess(db: Session, mess_id: int) -> Mess:
 # VALIDATE YEAR ELIGIBILITY
 # ---------------------------------------------------------
 
-def validate_year(student: Student, mess: Mess):
+def validate_year(student: CachedStudent, mess: CachedMess):
     if student.year != mess.allowed_year:
         raise HTTPException(
             status_code=400,
@@ -48,41 +81,50 @@ def validate_year(student: Student, mess: Mess):
 
 
 # ---------------------------------------------------------
-# VALIDATE BOOKING FLOW
+# BOOKING LOOKUP (STUDENT + MEAL + DAY)
 # ---------------------------------------------------------
 
-def validate_booking(db: Session, student: Student, mess: Mess):
+def _booking_lookup_stmt(student_id: int, meal_type: MealType, day):
+    return select(MealIntent).where(
+        MealIntent.student_id == student_id,
+        MealIntent.meal_type == meal_type,
+        MealIntent.date == day
+    ).limit(1)
 
-    meal_type = get_current_meal_type()
-    today = get_today_date()
 
-    # Cutoff check
-    # if not is_before_cutoff(meal_type):
-    #     raise HTTPException(
-    #         status_code=400,
-    #         detail=f"Booking closed for {meal_type.value}."
-    #     )
+def _current_meal(mess_id: int):
+    """
+    (meal type, day) for this mess from one schedule lookup.
+    Timed as the same stage as get_current_meal_type.
+    """
+
+    with stage_timer("time_utils.get_current_meal_type"):
+        state = get_meal_state(mess_id)
+        return require_meal_type(state), state.day
 
-    # Duplicate booking check
-    existing = db.query(MealIntent).filter(
-        MealIntent.student_id == student.id,
-        MealIntent.meal_type == meal_type,
-        MealIntent.date == today
-    ).first()
 
-    if existing:
+# ---------------------------------------------------------
+# WHY DID AN ATOMIC BOOKING INSERT NOTHING? (booking_engine)
+# ---------------------------------------------------------
+
+@timed("validation.diagnose_booking_failure")
+async def diagnose_booking_failure_async(db: AsyncSession, student_id: int, mess_id: int, meal_type: MealType, day):
+    """
+    Raises the HTTPException for the first booking rule that fails.
+    If every rule holds, the mess was full.
+    """
+
+    student = await validate_student_async(db, student_id)
+    mess = await validate_mess_async(db, mess_id)
+
+    if await db.scalar(_booking_lookup_stmt(student_id, meal_type, day)):
         raise HTTPException(
             status_code=400,
             detail="You have already booked this meal."
         )
 
-    # Year validation
     validate_year(student, mess)
-
-    # Capacity enforcement (delegated to capacity service)
-    enforce_capacity(db, mess, meal_type)
-
-    return meal_type
+    raise_capacity_reached()
 
 
 # ---------------------------------------------------------
@@ -140,29 +182,80 @@ def validate_booking(db: Session, student: Student, mess: Mess):
 #     #     )
 
 #     return booking, meal_type
+@timed("validation.validate_scan")
 def validate_scan(db: Session, student_id: int, mess_id: int):
 
-    meal_type = get_current_meal_type()
-    today = get_today_date()
+    meal_type, today = _current_meal(mess_id)
 
-    booking = db.query(MealIntent).filter(
-        MealIntent.student_id == student_id,
-        MealIntent.date == today,
-        MealIntent.meal_type == meal_type
-    ).first()
+    validate_student(db, student_id)
+    validate_mess(db, mess_id)
+
+    with stage_timer("validation.validate_scan.lookup"):
+        booking = db.scalar(_booking_lookup_stmt(student_id, meal_type, today))
 
     # DEMO MODE — Auto create booking if missing
     if not booking:
-        booking = MealIntent(
-            student_id=student_id,
-            mess_id=mess_id,
-            date=today,
-            meal_type=meal_type,
-            status=BookingStatus.booked
-        )
-        db.add(booking)
-        db.commit()
-        db.refresh(booking)
+        booking = _walk_in_booking(student_id, mess_id, today, meal_type)
+        with stage_timer("validation.validate_scan.walk_in_commit"):
+            db.add(booking)
+            db.commit()
+            db.refresh(booking)
+
+        # Walk-in seat, not limited by capacity
+        capacity_ledger.reserve(mess_id, today, meal_type)
+        publish_count_delta(mess_id, today, meal_type, booked=1)
+
+    _check_not_attended(booking)
+
+    return booking, meal_type
+
+
+@timed("validation.validate_scan")
+async def validate_scan_async(db: AsyncSession, student_id: int, mess_id: int, commit_walk_in: bool = True):
+    """
+    commit_walk_in=False (write-behind mode) returns walk-in bookings
+    unsaved; the write-behind flush inserts them, and the queue takes
+    their seat once they are enqueued.
+    """
+
+    meal_type, today = _current_meal(mess_id)
+
+    await validate_student_async(db, student_id)
+    await validate_mess_async(db, mess_id)
+
+    with stage_timer("validation.validate_scan.lookup"):
+        booking = await db.scalar(_booking_lookup_stmt(student_id, meal_type, today))
+
+    # DEMO MODE — Auto create booking if missing
+    if not booking:
+        booking = _walk_in_booking(student_id, mess_id, today, meal_type)
+        if commit_walk_in:
+            with stage_timer("validation.validate_scan.walk_in_commit"):
+                db.add(booking)
+                await db.commit()
+                await db.refresh(booking)
+
+            # Walk-in seat, not limited by capacity
+            capacity_ledger.reserve(mess_id, today, meal_type)
+            publish_count_delta(mess_id, today, meal_type, booked=1)
+
+    _check_not_attended(booking)
+
+    return booking, meal_type
+
+
+def _walk_in_booking(student_id: int, mess_id: int, day, meal_type: MealType) -> MealIntent:
+    return MealIntent(
+        student_id=student_id,
+        mess_id=mess_id,
+        date=day,
+        meal_type=meal_type,
+        status=BookingStatus.booked,
+        walk_in=True
+    )
+
+
+def _check_not_attended(booking: MealIntent):
 
     # Prevent double attendance
     if booking.status == BookingStatus.attended:
@@ -171,4 +264,116 @@ def validate_scan(db: Session, student_id: int, mess_id: int):
             detail="Already marked as attended."
         )
 
-    return booking, meal_type
+
+# ---------------------------------------------------------
+# VALIDATE SCAN BATCH (BUFFERED TURNSTILE SCANS)
+# ---------------------------------------------------------
+
+@timed("validation.validate_scan_batch")
+def validate_scan_batch(db: Session, entries: list):
+    """
+    Set-based validate_scan for many scans at once.
+    Returns (booking, meal_type, scanned_at, error) per entry, in order.
+    Walk-in bookings are added to the session but not committed.
+    """
+
+    resolved = _resolve_scan_times(entries)
+    student_ids, mess_ids, bookings_stmt = _scan_batch_lookups(entries, resolved)
+
+    return _match_scan_batch(
+        db,
+        resolved,
+        get_many_cached(db, Student, student_ids).keys(),
+        get_many_cached(db, Mess, mess_ids).keys(),
+        db.scalars(bookings_stmt).all()
+    )
+
+
+@timed("validation.validate_scan_batch")
+async def validate_scan_batch_async(db: AsyncSession, entries: list):
+
+    resolved = _resolve_scan_times(entries)
+    student_ids, mess_ids, bookings_stmt = _scan_batch_lookups(entries, resolved)
+
+    return _match_scan_batch(
+        db,
+        resolved,
+        (await get_many_cached_async(db, Student, student_ids)).keys(),
+        (await get_many_cached_async(db, Mess, mess_ids)).keys(),
+        (await db.scalars(bookings_stmt)).all()
+    )
+
+
+def _resolve_scan_times(entries: list) -> list:
+    """
+    Resolve meal + day for every scan from its own timestamp.
+    """
+
+    now = get_current_datetime()
+
+    resolved = []
+    for entry in entries:
+        scanned_at = to_local_datetime(entry.scanned_at or now)
+        try:
+            meal_type = get_meal_type_at(scanned_at, entry.mess_id)
+        except ValueError as e:
+            meal_type = None
+            error = str(e)
+        else:
+            error = None
+        resolved.append((entry, scanned_at, meal_type, error))
+
+    return resolved
+
+
+def _scan_batch_lookups(entries: list, resolved: list):
+
+    student_ids = {entry.student_id for entry in entries}
+    mess_ids = {entry.mess_id for entry in entries}
+    days = {scanned_at.date() for _, scanned_at, _, _ in resolved}
+
+    return (
+        student_ids,
+        mess_ids,
+        select(MealIntent).where(
+            MealIntent.student_id.in_(student_ids),
+            MealIntent.date.in_(days)
+        )
+    )
+
+
+def _match_scan_batch(db, resolved: list, known_students: set, known_messes: set, existing: list):
+
+    bookings = {(b.student_id, b.date, b.meal_type): b for b in existing}
+
+    accepted_keys = set()
+    results = []
+    for entry, scanned_at, meal_type, error in resolved:
+
+        if error is None and entry.student_id not in known_students:
+            error = "Student not found"
+        elif error is None and entry.mess_id not in known_messes:
+            error = "Mess not found"
+
+        if error:
+            results.append((None, meal_type, scanned_at, error))
+            continue
+
+        key = (entry.student_id, scanned_at.date(), meal_type)
+        booking = bookings.get(key)
+
+        # DEMO MODE — Auto create booking if missing
+        if not booking:
+            booking = _walk_in_booking(entry.student_id, entry.mess_id, scanned_at.date(), meal_type)
+            db.add(booking)
+            bookings[key] = booking
+
+        # Prevent double attendance (also within this batch)
+        if booking.status == BookingStatus.attended or key in accepted_keys:
+            results.append((None, meal_type, scanned_at, "Already marked as attended."))
+            continue
+
+        accepted_keys.add(key)
+        results.append((booking, meal_type, scanned_at, None))
+
+    return results
@@ -0,0 +1,371 @@
+# services/write_behind.py
+#
+# Optional write-behind mode for /scan/entry (SCAN_WRITE_BEHIND).
+# A scan is acknowledged right after validation; its attendance
+# (meal_intent status, DietLog, student stats, scan receipt) is
+# queued and written by one background task, every
+# WRITE_BEHIND_FLUSH_MS or WRITE_BEHIND_MAX_BATCH scans, in one
+# transaction. SQLite then pays one fsync per batch, not per scan.
+#
+# A scan that is queued but not yet written is "pending": a second
+# scan for the same student and meal is refused from memory. The
+# queue is bounded; when full, callers wait up to
+# WRITE_BEHIND_ENQUEUE_TIMEOUT_SECONDS and then get a 503.
+# A retry of a pending scan (same receipt key) gets the same
+# response; the receipt is only replayable from memory once written.
+# Walk-ins take their ledger seat when enqueued, not in validation.
+# A scan that still fails after WRITE_BEHIND_RETRIES is parked in
+# write_behind_dead_letters (counted in /metrics); if even that
+# fails it stays queued for the next flush.
+# stop() (app shutdown) flushes whatever is left.
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import AsyncSessionLocal
+from models import MealIntent, DietLog, ScanReceipt, WriteBehindDeadLetter, BookingStatus, MealType
+from config import (
+    WRITE_BEHIND_FLUSH_MS,
+    WRITE_BEHIND_MAX_BATCH,
+    WRITE_BEHIND_QUEUE_SIZE,
+    WRITE_BEHIND_ENQUEUE_TIMEOUT_SECONDS,
+    WRITE_BEHIND_RETRIES
+)
+from services.capacity import capacity_ledger
+from services.occupancy import publish_count_delta
+from services.student_stats import meal_stats_increment_stmts
+from services.scan_receipts import remember_receipt
+from services.meal_logic import ATTENDANCE_MARKED
+from services.rollup import closed_meals_rollup_stmt
+from core.metrics import observe_job, timed
+
+
+@dataclass(frozen=True)
+class QueuedScan:
+    student_id: int
+    mess_id: int
+    day: date
+    meal_type: MealType
+    timestamp: datetime          # DietLog time (UTC)
+    was_booked: bool             # Held a capacity ledger seat
+    walk_in: bool                # No booking: the flush inserts the row
+    receipt_key: Optional[str]
+    response: dict
+
+
+# ---------------------------------------------------------
+# QUEUE + FLUSHER
+# ---------------------------------------------------------
+
+class WriteBehindQueue:
+
+    def __init__(self):
+        self._queue = None
+        self._task = None
+        self._pending = {}       # (student_id, day, meal_type) -> QueuedScan, not yet written
+        self._held = []          # Failed scans that couldn't be parked either, retried next flush
+        self._busy = False       # Worker holds a batch taken off the queue
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_worker(self):
+        # Bound to the running event loop on first use
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue(maxsize=WRITE_BEHIND_QUEUE_SIZE)
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, scan: QueuedScan) -> dict:
+        """
+        Queues the scan; returns the response to acknowledge it with
+        (the pending scan's own, for a retry of it).
+        """
+
+        self._ensure_worker()
+
+        key = (scan.student_id, scan.day, scan.meal_type)
+        queued = self._pending.get(key)
+        if queued:
+            if scan.receipt_key and (queued.receipt_key, queued.mess_id) == (scan.receipt_key, scan.mess_id):
+                return queued.response
+            raise HTTPException(status_code=400, detail="Already marked as attended.")
+
+        # Reserve the key before waiting, so a concurrent duplicate is refused
+        self._pending[key] = scan
+        try:
+            await asyncio.wait_for(self._queue.put(scan), WRITE_BEHIND_ENQUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self._pending.pop(key, None)
+            raise HTTPException(
+                status_code=503,
+                detail="Scan queue full, retry shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+        # Walk-in seat (not limited by capacity), taken only once queued
+        # so a replayed, duplicate or refused scan never holds one
+        if scan.walk_in:
+            capacity_ledger.reserve(scan.mess_id, scan.day, scan.meal_type)
+            publish_count_delta(scan.mess_id, scan.day, scan.meal_type, booked=1)
+
+        return scan.response
+
+    async def _run(self):
+        while True:
+            batch, self._held = self._held or [await self._queue.get()], []
+            self._busy = True
+            deadline = time.monotonic() + WRITE_BEHIND_FLUSH_MS / 1000
+
+            while len(batch) < WRITE_BEHIND_MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush_with_retry(batch)
+            self._busy = False
+
+    async def _flush_with_retry(self, batch: list):
+        # Scans were already acknowledged: retry transient failures
+        # (lock timeouts), then isolate any scan that can never be written
+        failed = []
+        for attempt in range(WRITE_BEHIND_RETRIES):
+            try:
+                await flush_scans(batch)
+                break
+            except Exception as e:
+                self.failed_flushes += 1
+                print("Write-behind flush error:", e)
+                await asyncio.sleep(0.05 * 2 ** attempt)
+        else:
+            for scan in batch:
+                try:
+                    await flush_scans([scan])
+                except Exception as e:
+                    failed.append((scan, repr(e)))
+
+        if failed:
+            try:
+                await park_scans(failed)
+                self.dead_lettered += len(failed)
+                print(f"Write-behind parked {len(failed)} scans in write_behind_dead_letters")
+            except Exception as e:
+                # Still acknowledged and pending: retried on the next flush
+                print("Write-behind dead-letter error:", e)
+                self._held = [scan for scan, _ in failed]
+
+        held = set(map(id, self._held))
+        for scan in batch:
+            if id(scan) not in held:
+                self._pending.pop((scan.student_id, scan.day, scan.meal_type), None)
+        self.flushed += len(batch) - len(held)
+
+    async def stop(self):
+        """
+        Flushes everything still queued. Call on shutdown.
+        """
+
+        if self._task is None:
+            return
+
+        # Let the worker drain; only cancel it while it holds nothing
+        while (self._busy or not self._queue.empty()) and not self._task.done():
+            await asyncio.sleep(WRITE_BEHIND_FLUSH_MS / 1000)
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Anything enqueued while the worker was being cancelled
+        batch, self._held = self._held, []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await self._flush_with_retry(batch)
+        if self._held:
+            print(f"Write-behind lost {len(self._held)} scans on shutdown")
+
+        self._queue = None
+
+
+write_behind = WriteBehindQueue()
+
+
+@timed("write_behind.enqueue_attendance")
+async def enqueue_attendance(booking: MealIntent, meal_type: MealType, receipt_key: Optional[str] = None) -> dict:
+    """
+    Write-behind mark_attendance_async: queues the write and returns
+    the same ScanResponse. `booking` may be an unsaved walk-in.
+    """
+
+    timestamp = datetime.utcnow()
+    response = {
+        "message": ATTENDANCE_MARKED,
+        "status": BookingStatus.attended,
+        "meal_type": meal_type,
+        "timestamp": timestamp
+    }
+
+    return await write_behind.put(QueuedScan(
+        student_id=booking.student_id,
+        mess_id=booking.mess_id,
+        day=booking.date,
+        meal_type=MealType(meal_type),
+        timestamp=timestamp,
+        was_booked=booking.status == BookingStatus.booked,
+        walk_in=bool(booking.walk_in),
+        receipt_key=receipt_key,
+        response=response
+    ))
+
+
+# ---------------------------------------------------------
+# ONE FLUSH = ONE TRANSACTION
+# ---------------------------------------------------------
+
+def _attended_upsert_stmt():
+    """
+    Marks the booking attended, or inserts it (walk-ins), keyed on
+    unique_student_meal_per_day.
+    """
+
+    table = MealIntent.__table__
+    stmt = sqlite_insert(table)
+
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.student_id, table.c.meal_type, table.c.date],
+        set_={"status": BookingStatus.attended}
+    )
+
+
+async def flush_scans(batch: list):
+    """
+    Writes a batch of queued scans in one commit, then applies the
+    in-memory side effects (capacity ledger, live counts).
+    """
+
+    start = time.perf_counter()
+
+    logs = [
+        DietLog(
+            student_id=scan.student_id,
+            mess_id=scan.mess_id,
+            meal_type=scan.meal_type,
+            timestamp=scan.timestamp
+        )
+        for scan in batch
+    ]
+    receipts = [
+        {
+            "key": scan.receipt_key,
+            "student_id": scan.student_id,
+            "mess_id": scan.mess_id,
+            "message": scan.response["message"],
+            "status": BookingStatus.attended,
+            "meal_type": scan.meal_type,
+            "timestamp": scan.timestamp,
+            "created_at": datetime.utcnow(),
+        }
+        for scan in batch if scan.receipt_key
+    ]
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(_attended_upsert_stmt(), [
+                {
+                    "student_id": scan.student_id,
+                    "mess_id": scan.mess_id,
+                    "meal_type": scan.meal_type,
+                    "date": scan.day,
+                    "status": BookingStatus.attended,
+                    "created_at": scan.timestamp,
+                    "walk_in": scan.walk_in,
+                }
+                for scan in batch
+            ])
+            await db.execute(insert(DietLog.__table__), [
+                {
+                    "student_id": log.student_id,
+                    "mess_id": log.mess_id,
+                    "meal_type": log.meal_type,
+                    "timestamp": log.timestamp,
+                }
+                for log in logs
+            ])
+            for stmt in meal_stats_increment_stmts(logs):
+                await db.execute(stmt)
+            # Flushed after the no-show sweep: refresh the closed meals
+            rollup = closed_meals_rollup_stmt(
+                (scan.day, scan.mess_id, scan.meal_type) for scan in batch
+            )
+            if rollup is not None:
+                await db.execute(rollup)
+            if receipts:
+                await db.execute(
+                    sqlite_insert(ScanReceipt.__table__).on_conflict_do_nothing(),
+                    receipts
+                )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    for scan in batch:
+        if scan.receipt_key:
+            remember_receipt(scan.receipt_key, scan, scan.response)
+        if scan.was_booked:
+            capacity_ledger.release(scan.mess_id, scan.day, scan.meal_type)
+        publish_count_delta(
+            scan.mess_id,
+            scan.day,
+            scan.meal_type,
+            booked=-1 if scan.was_booked else 0,
+            attended=1
+        )
+
+    observe_job("write_behind_flush", time.perf_counter() - start, len(batch))
+
+
+async def park_scans(failed: list):
+    """
+    Records (scan, error) pairs that could not be written in
+    write_behind_dead_letters, in one commit.
+    """
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(insert(WriteBehindDeadLetter.__table__), [
+                {
+                    "student_id": scan.student_id,
+                    "mess_id": scan.mess_id,
+                    "date": scan.day,
+                    "meal_type": scan.meal_type,
+                    "timestamp": scan.timestamp,
+                    "walk_in": scan.walk_in,
+                    "receipt_key": scan.receipt_key,
+                    "error": error,
+                    "created_at": datetime.utcnow(),
+                }
+                for scan, error in failed
+            ])
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise